@@ -0,0 +1,57 @@
+"""Measure how much memory a large number of ArticleInfo instances take up,
+as they would be held by the listing caches.
+
+Usage: python benchmarks/articleinfo.py [number of infos]
+
+yawt must be importable (installed, or on the PYTHONPATH).
+"""
+import sys
+import tracemalloc
+
+from yawt.article import ArticleInfo
+
+
+CATEGORIES = ['reading', 'cooking', 'cooking/indian', 'travel/europe']
+
+
+def _make_infos(count, extra):
+    infos = []
+    for num in range(count):
+        category = CATEGORIES[num % len(CATEGORIES)]
+        slug = 'post{0}'.format(num)
+        info = ArticleInfo(fullname=category + '/' + slug,
+                           category=category,
+                           slug=slug,
+                           extension='txt',
+                           create_time=1420070400.0 + num,
+                           modified_time=1420070400.0 + num)
+        if extra:
+            info.tags = ['tag{0}'.format(num % 50),
+                         'tag{0}'.format(num % 7)]
+            info.author = 'Dude User'
+        infos.append(info)
+    return infos
+
+
+def _measure(count, extra):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    infos = _make_infos(count, extra)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    used = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return len(infos), used
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print('{0} infos'.format(count))
+    for extra, label in [(False, 'fixed fields only'),
+                         (True, 'with tags and author')]:
+        count, used = _measure(count, extra)
+        print('{0}: {1:.1f}MB, {2:.0f} bytes per info'
+              .format(label, used / (1024.0 * 1024.0), used / float(count)))
+
+
+if __name__ == '__main__':
+    main()
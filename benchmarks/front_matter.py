@@ -0,0 +1,116 @@
+"""Compare make_article against the previous, frontmatter.load based, way of
+reading articles.
+
+Usage: python benchmarks/front_matter.py [number of articles]
+
+yawt must be importable (installed, or on the PYTHONPATH).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import frontmatter
+import pytz
+import yaml
+
+import yawt.article
+from yawt.article import make_article
+from yawt.utils import save_file
+
+
+META_TYPES = {'tags': 'list', 'create_time': 'iso8601'}
+
+# the kind of header micropost writes
+SIMPLE_POST = """---
+create_time: 2015-01-{day:02d}T10:00:00.123456
+tags: tag{tag1},tag{tag2}
+---
+
+Article number {num}.
+"""
+
+# a header yaml has to parse
+YAML_POST = """---
+title: "Article {num}"
+create_time: 2015-01-{day:02d}T10:00:00
+tags: tag{tag1},tag{tag2}
+related: [post{tag1}, post{tag2}]
+---
+
+Article number {num}.
+"""
+
+
+class _Handler(frontmatter.YAMLHandler):
+    def __init__(self, loader):
+        super(_Handler, self).__init__()
+        self.loader = loader
+
+    def load(self, fm, **kwargs):
+        return yaml.load(fm, Loader=self.loader)
+
+
+def _old_load_post(loader):
+    """The way yawt.article._load_post used to read posts"""
+    def load_post(filename, article, meta_types, stat=None):
+        post = frontmatter.load(filename, handler=_Handler(loader))
+        for key in post.keys():
+            if isinstance(post[key], datetime) and not post[key].tzinfo:
+                post[key] = pytz.utc.localize(post[key])
+        article.content = post.content
+        for key in post.keys():
+            value = post[key]
+            if meta_types.get(key) == 'list':
+                value = [x.strip() for x in value.split(',')]
+            elif meta_types.get(key) == 'iso8601':
+                epoch = datetime(1970, 1, 1, tzinfo=pytz.utc)
+                value = int((value-epoch).total_seconds())
+            setattr(article.info, key, value)
+    return load_post
+
+
+def _make_site(count, template):
+    root = tempfile.mkdtemp()
+    for num in range(count):
+        post = template.format(day=num % 28 + 1, tag1=num % 50, tag2=num % 7,
+                               num=num)
+        save_file(os.path.join(root, 'post{0}.txt'.format(num)), post)
+    return root
+
+
+def _time(load_post, root, count):
+    saved = yawt.article._load_post
+    if load_post:
+        yawt.article._load_post = load_post
+    try:
+        start = time.time()
+        for num in range(count):
+            make_article('post{0}'.format(num),
+                         os.path.join(root, 'post{0}.txt'.format(num)),
+                         META_TYPES)
+        return time.time() - start
+    finally:
+        yawt.article._load_post = saved
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    runs = [('frontmatter.load, SafeLoader', _old_load_post(yaml.SafeLoader)),
+            ('fast parser', None)]
+    print('{0} articles'.format(count))
+    for label, template in [('simple headers', SIMPLE_POST),
+                            ('yaml headers', YAML_POST)]:
+        root = _make_site(count, template)
+        try:
+            for name, load_post in runs:
+                elapsed = _time(load_post, root, count)
+                print('{0}, {1}: {2:.2f}s'.format(label, name, elapsed))
+        finally:
+            shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compare the time it takes a cold worker and a warm (snapshot loading) worker
+to come up and serve their first collection page.
+
+Usage: python benchmarks/startup.py [number of articles]
+
+yawt must be importable (installed, or on the PYTHONPATH).
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import yawt
+from yawt.cli import Walk
+from yawt.utils import save_file
+
+
+CATEGORIES = ['reading', 'cooking', 'cooking/indian', 'travel/europe']
+
+POST = """---
+create_time: 2015-01-{day:02d}T00:00:00
+tags: {tags}
+---
+
+Article number {num}.
+"""
+
+
+class Config(object):
+    YAWT_META_TYPES = {'tags': 'list', 'create_time': 'iso8601'}
+    YAWT_COLLECTIONS_SORT_FIELD = 'create_time'
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.categories.YawtCategoryCounter',
+                       'yawtext.tagging.YawtTagCounter',
+                       'yawtext.archives.YawtArchiveCounter',
+                       'yawtext.collections.YawtCollections',
+                       'yawtext.postings.YawtPostings']
+
+
+class SnapshotConfig(Config):
+    YAWT_EXTENSIONS = Config.YAWT_EXTENSIONS + ['yawtext.snapshot.YawtSnapshot']
+
+
+def _make_site(count):
+    root = tempfile.mkdtemp()
+    save_file(os.path.join(root, 'templates/article_list.html'), 'list')
+    for num in range(count):
+        category = CATEGORIES[num % len(CATEGORIES)]
+        tags = 'tag{0},tag{1}'.format(num % 50, num % 7)
+        post = POST.format(day=num % 28 + 1, tags=tags, num=num)
+        save_file(os.path.join(root, 'content', category,
+                               'post{0}.txt'.format(num)), post)
+    return root
+
+
+def _walk(root):
+    app = yawt.create_app(root, config=SnapshotConfig())
+    with app.test_request_context():
+        app.preprocess_request()
+        Walk().run()
+
+
+def _first_request(root, config):
+    start = time.time()
+    app = yawt.create_app(root, config=config)
+    app.test_client().get('/cooking/')
+    return time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    root = _make_site(count)
+    try:
+        _walk(root)
+        cold = _first_request(root, Config())
+        warm = _first_request(root, SnapshotConfig())
+        print('{0} articles'.format(count))
+        print('cold worker: {0:.1f}ms'.format(cold * 1000))
+        print('warm worker: {0:.1f}ms'.format(warm * 1000))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
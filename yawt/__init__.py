@@ -3,6 +3,7 @@ import importlib
 import logging
 import os
 import re
+import sys
 
 import jinja2
 from flask import Flask
@@ -21,11 +22,15 @@ YAWT_ARTICLE_TEMPLATE = 'article'
 YAWT_ARTICLE_EXTENSIONS = ['txt']
 YAWT_EXTENSIONS = []
 YAWT_META_TYPES = {}
+YAWT_WALK_MEMORY_BUDGET = None
+
+
+_CONTENT_TYPE_KEY = re.compile('YAWT_CONTENT_TYPE_(.*)')
 
 
 def _get_content_types(config):
     def _extract_type(key):
-        match = re.compile('YAWT_CONTENT_TYPE_(.*)').match(key)
+        match = _CONTENT_TYPE_KEY.match(key)
         if match:
             return (match.group(1).lower(), config[match.group(0)])
         return None
@@ -81,12 +86,13 @@ def _load_extensions(app, extension_info):
 
 
 def _configure(root_dir, app, config, extension_info):
-    import sys
-    old_path = sys.path
-    sys.path.append(root_dir)
+    # the site's own modules (config, extensions) are imported from root_dir,
+    # and may import more later, so it stays on sys.path; but only once, so
+    # that creating many apps doesn't keep making it longer
+    if root_dir not in sys.path:
+        sys.path.append(root_dir)
     _configure_app(app, config)
     _load_extensions(app, extension_info)
-    sys.path = old_path
 
 
 def _setup_templates(root_dir, app):
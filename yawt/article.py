@@ -1,11 +1,73 @@
 """Most things relating to article definitions reside here"""
+import mmap
 import os
+import re
+import sys
 
 import frontmatter
 import pytz
+import yaml
 from datetime import datetime
+from yaml.constructor import SafeConstructor
+from yaml.nodes import ScalarNode
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
-from yawt.utils import base_and_ext, ReprMixin, EqMixin
+from yawt.utils import base_and_ext, format_value
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+_YAML_BOUNDARY = re.compile(r"^-{3,}\s*$", re.MULTILINE)
+_YAML_BOUNDARY_BYTES = re.compile(br"^-{3,}\s*$", re.MULTILINE)
+_NON_SPACE_BYTES = re.compile(br"\S")
+
+# posts at least this big have their headers read through mmap, and their
+# content left on disk until it's asked for
+LAZY_CONTENT_SIZE = 64 * 1024
+
+# a "key: value" header line, with a value not starting with anything yaml
+# treats specially
+_SIMPLE_LINE = re.compile(r"^([A-Za-z_][\w-]*):[ \t]+(\w[^#]*?)\s*$")
+_SIMPLE_INT = re.compile(r"^(?:0|[1-9][0-9]*)$")
+# plain words yaml turns into booleans or None
+_YAML_WORDS = frozenset(['yes', 'no', 'true', 'false', 'on', 'off', 'null'])
+_CONSTRUCTOR = SafeConstructor()
+_COMPLEX = object()
+
+
+# the category ancestor chains handed out so far, keyed by category
+_CATEGORY_CHAINS = {}
+
+# info fields whose values repeat across lots of articles
+INTERNED_FIELDS = ('category', 'slug', 'extension', 'author')
+
+
+def category_chain(category):
+    """Return a tuple of category and its progressively more general parent
+    categories, e.g. ('cooking/indian', 'cooking').  The same tuple is
+    shared by every article in the category."""
+    chain = _CATEGORY_CHAINS.get(category)
+    if chain is None:
+        category = sys.intern(category)
+        if '/' in category:
+            chain = (category,) + category_chain(category.rsplit('/', 1)[0])
+        else:
+            chain = (category,)
+        _CATEGORY_CHAINS[category] = chain
+    return chain
+
+
+def intern_value(value):
+    """Intern value, if it's a string, or the strings in it, if it's a list
+    of strings.  Anything else is returned as is."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list) and all(isinstance(v, str) for v in value):
+        return [sys.intern(v) for v in value]
+    return value
 
 
 def _set_attributes(article_info, meta, meta_types):
@@ -18,71 +80,351 @@ def _set_attributes(article_info, meta, meta_types):
 
 def _convert(mtype, value):
     if mtype == 'list':
-        return [x.strip() for x in value.split(',')]
+        return [sys.intern(x.strip()) for x in value.split(',')]
     elif mtype == 'iso8601':
-        epoch = datetime(1970, 1, 1, tzinfo=pytz.utc)
-        return int((value-epoch).total_seconds())
+        return int((value-EPOCH).total_seconds())
     else:
         return value
 
 
-def _load_post(filename, article, meta_types):
-    post = frontmatter.load(filename)
-    for key in post.keys():
-        if isinstance(post[key], datetime) and not post[key].tzinfo:
+def _simple_value(value):
+    """Return what yaml would make of a plain value, if it's simple enough
+    for us to tell, otherwise _COMPLEX"""
+    if ': ' in value or value.endswith(':') or value.lower() in _YAML_WORDS:
+        return _COMPLEX
+    if value[0].isdigit():
+        if _SIMPLE_INT.match(value):
+            return int(value)
+        if SafeConstructor.timestamp_regexp.match(value):
+            node = ScalarNode('tag:yaml.org,2002:timestamp', value)
+            return _CONSTRUCTOR.construct_yaml_timestamp(node)
+        # floats, octal, sexagesimal and friends
+        return _COMPLEX
+    return value
+
+
+def _parse_simple_header(header):
+    """Parse a header made up of nothing but "key: value" lines, like the
+    ones micropost writes, without going through yaml.  Returns None if the
+    header is any more complicated than that."""
+    metadata = {}
+    for line in header.splitlines():
+        if not line.strip():
+            continue
+        match = _SIMPLE_LINE.match(line)
+        if not match or match.group(1).lower() in _YAML_WORDS:
+            return None
+        value = _simple_value(match.group(2))
+        if value is _COMPLEX:
+            return None
+        metadata[match.group(1)] = value
+    return metadata
+
+
+def parse_post(text):
+    """Split the text of a post into its (yaml) front matter metadata and
+    content, the same way frontmatter.loads does, but quicker"""
+    text = text.strip()
+    if not _YAML_BOUNDARY.match(text):
+        # no front matter, or some other flavour of it
+        post = frontmatter.loads(text)
+        return post.metadata, post.content
+    try:
+        _, header, content = _YAML_BOUNDARY.split(text, 2)
+    except ValueError:
+        return {}, text
+    return _parse_header(header), content.strip()
+
+
+def _parse_header(header):
+    metadata = _parse_simple_header(header)
+    if metadata is None:
+        metadata = yaml.load(header, Loader=SafeLoader)
+        if not isinstance(metadata, dict):
+            metadata = {}
+    return metadata
+
+
+def _find_header(buf):
+    """Return the front matter header in buf (bytes, or an mmap of them) and
+    where the content starts, or None if there isn't a (yaml) header"""
+    start = _NON_SPACE_BYTES.search(buf)
+    if not start:
+        return None
+    opening = _YAML_BOUNDARY_BYTES.match(buf, start.start())
+    if not opening:
+        return None
+    closing = _YAML_BOUNDARY_BYTES.search(buf, opening.end())
+    if not closing:
+        return None
+    return buf[opening.end():closing.start()], closing.end()
+
+
+def read_header(filename):
+    """Read just the front matter metadata of the post in filename, without
+    reading in the content.  Returns the metadata, and a LazyContent for the
+    content, or None if the post doesn't look like it has a yaml header."""
+    with open(filename, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return None
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            found = _find_header(buf)
+        finally:
+            buf.close()
+    if found is None:
+        return None
+    header, offset = found
+    metadata = _parse_header(header.decode('utf-8'))
+    return metadata, LazyContent(filename, offset, stat)
+
+
+class LazyContent(object):
+    """The content of a post, left in its file (from offset on) until it's
+    loaded"""
+    __slots__ = ('filename', 'offset', 'mtime', 'size')
+
+    def __init__(self, filename, offset, stat):
+        self.filename = filename
+        self.offset = offset
+        self.mtime = stat.st_mtime
+        self.size = stat.st_size
+
+    def load(self):
+        """Read and decode the content"""
+        with open(self.filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_mtime != self.mtime or stat.st_size != self.size:
+                # the post has changed under us, so start from scratch
+                return parse_post(f.read().decode('utf-8'))[1]
+            f.seek(self.offset)
+            return f.read().decode('utf-8').strip()
+
+
+def _load_post(filename, article, meta_types, stat=None):
+    lazy = None
+    size = stat.st_size if stat else os.path.getsize(filename)
+    if size >= LAZY_CONTENT_SIZE:
+        lazy = read_header(filename)
+    if lazy:
+        metadata, content = lazy
+    else:
+        with open(filename, encoding='utf-8') as f:
+            metadata, content = parse_post(f.read())
+    for key, value in metadata.items():
+        if isinstance(value, datetime) and not value.tzinfo:
             # no timezone means UTC
-            post[key] = pytz.utc.localize(post[key])
-    article.content = post.content
-    _set_attributes(article.info, post.metadata, meta_types)
+            metadata[key] = value.replace(tzinfo=pytz.utc)
+    article.content = content
+    _set_attributes(article.info, metadata, meta_types)
 
 
-def _fetch_file_metadata(filename):
-    stat = os.stat(filename)
+def _fetch_file_metadata(filename, stat=None):
+    stat = stat or os.stat(filename)
     mtime = ctime = stat.st_mtime  # epoch time in seconds
     return {'create_time': ctime, 'modified_time': mtime}
 
 
-def make_article(fullname, filename, meta_types=None):
+def make_article(fullname, filename, meta_types=None, file_metadata=None,
+                 stat=None):
     """Construct an Article instance.  Fullname and filename are
     self-evident.  Metatypes directs how to convert certain pieces
-    of metadata"""
+    of metadata.  File_metadata, if supplied, is a function returning the
+    create_time, modified_time (and possibly author) for filename, or None if
+    it doesn't know them, in which case they're taken from the file (using
+    stat, if the caller already has it)."""
     info = ArticleInfo()
     info.fullname = fullname
-    info.category = os.path.dirname(fullname)
-    info.slug = os.path.basename(fullname)
-    info.extension = base_and_ext(filename)[1]
+    info.category = sys.intern(os.path.dirname(fullname))
+    info.slug = sys.intern(os.path.basename(fullname))
+    info.extension = sys.intern(base_and_ext(filename)[1])
 
-    file_metadata = _fetch_file_metadata(filename)
-    info.create_time = file_metadata['create_time']
-    info.modified_time = file_metadata['modified_time']
+    metadata = file_metadata(filename) if file_metadata else None
+    if metadata is None:
+        metadata = _fetch_file_metadata(filename, stat)
+    info.create_time = metadata['create_time']
+    info.modified_time = metadata['modified_time']
+    if metadata.get('author'):
+        info.author = sys.intern(metadata['author'])
 
     article = Article()
     article.info = info
-    _load_post(filename, article, meta_types or {})
+    _load_post(filename, article, meta_types or {}, stat)
     return article
 
 
-class ArticleInfo(ReprMixin, EqMixin):
+# the tuples of extra metadata names in use, so that infos with the same
+# names share them
+_EXTRA_KEYS = {(): ()}
+
+
+def _shared_keys(keys):
+    return _EXTRA_KEYS.setdefault(keys, keys)
+
+
+class ArticleInfo(object):
     """Basically an Article header.  Carries information about the article
-    without the content
+    without the content.
+
+    Lots of these are held in memory at once, so the fixed fields live in
+    slots, and any other metadata (from the front matter, or added by
+    plugins) is kept as a tuple of values alongside a tuple of (interned)
+    names shared with every other info having the same names.  Times are
+    kept as integer epoch seconds.
     """
+    __slots__ = ('fullname', 'category', 'slug', 'extension',
+                 'create_time', 'modified_time',
+                 '_extra_keys', '_extra_values')
+
+    FIELDS = __slots__[:-2]
+    TIME_FIELDS = ('create_time', 'modified_time')
+
     def __init__(self, **kwargs):
-        self.fullname = kwargs.get('fullname', '')
-        self.category = kwargs.get('category', '')
-        self.slug = kwargs.get('slug', '')
-        self.extension = kwargs.get('extension', '')
-        self.create_time = kwargs.get('create_time')
-        self.modified_time = kwargs.get('modified_time')
+        self._extra_keys = ()
+        self._extra_values = ()
+        for field in self.FIELDS:
+            setattr(self, field,
+                    kwargs.pop(field, None if field in self.TIME_FIELDS else ''))
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    def _extras(self):
+        try:
+            return self._extra_keys, self._extra_values
+        except AttributeError:
+            # unpickled from a summary saved before we had slots
+            return (), ()
+
+    @property
+    def extra(self):
+        """A dict of the metadata beyond the fixed fields"""
+        return dict(zip(*self._extras()))
+
+    def __getattr__(self, name):
+        # only called when name isn't a (set) slot
+        if name in self.__slots__:
+            raise AttributeError(name)
+        keys, values = self._extras()
+        try:
+            return values[keys.index(name)]
+        except ValueError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        if name in self.__slots__:
+            if name in self.TIME_FIELDS and isinstance(value, float):
+                value = int(value)
+            object.__setattr__(self, name, value)
+            return
+        keys, values = self._extras()
+        try:
+            i = keys.index(name)
+            values = values[:i] + (value,) + values[i+1:]
+        except ValueError:
+            keys = _shared_keys(keys + (sys.intern(name),))
+            values = values + (value,)
+        self._extra_keys = keys
+        self._extra_values = values
+
+    def __delattr__(self, name):
+        if name in self.__slots__:
+            object.__delattr__(self, name)
+            return
+        keys, values = self._extras()
+        try:
+            i = keys.index(name)
+        except ValueError:
+            raise AttributeError(name)
+        self._extra_keys = _shared_keys(keys[:i] + keys[i+1:])
+        self._extra_values = values[:i] + values[i+1:]
+
+    def __getstate__(self):
+        state = self.extra
+        for field in self.FIELDS:
+            state[field] = getattr(self, field)
+        return state
+
+    def __setstate__(self, state):
+        # intern the repetitive stuff as we decode, as the infos from a
+        # summary hold their own copies of it
+        for key, value in state.items():
+            if key == 'categories' and value:
+                value = category_chain(value[0])
+            elif key in INTERNED_FIELDS or isinstance(value, list):
+                value = intern_value(value)
+            setattr(self, key, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, ArticleInfo):
+            return False
+        if any(getattr(self, field) != getattr(other, field)
+               for field in self.FIELDS):
+            return False
+        if self._extras()[0] is other._extras()[0]:
+            return self._extras()[1] == other._extras()[1]
+        return self.extra == other.extra
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        items = [(field, getattr(self, field)) for field in self.FIELDS]
+        items += sorted(zip(*self._extras()))
+        attrstr = ", ".join("{0}={1}".format(k, format_value(v))
+                            for k, v in items)
+        return "ArticleInfo({0})".format(attrstr)
 
     def under(self, base):
         """Return True if the article is filed under base"""
         return self.fullname.startswith(base)
 
 
-class Article(ReprMixin, EqMixin):
+class Article(object):
     """The main article class, basically just combining an info instance and
-    content
+    content.  The content may be a LazyContent, in which case it's only read
+    in when first used.
     """
+    __slots__ = ('info', '_content')
+
     def __init__(self):
         self.info = ArticleInfo()
         self.content = ""
+
+    @property
+    def content(self):
+        """The article content"""
+        if isinstance(self._content, LazyContent):
+            self._content = self._content.load()
+        return self._content
+
+    @content.setter
+    def content(self, content):
+        self._content = content
+
+    def content_loaded(self):
+        """True if the content has been read in"""
+        return not isinstance(self._content, LazyContent)
+
+    def __getstate__(self):
+        return {'info': self.info, 'content': self.content}
+
+    def __setstate__(self, state):
+        self.info = state['info']
+        self.content = state['content']
+
+    def __eq__(self, other):
+        if not isinstance(other, Article):
+            return False
+        return self.info == other.info and self.content == other.content
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Article(content={0}, info={1})".format(
+            format_value(self.content), self.info)
@@ -3,7 +3,7 @@ import argparse
 import os
 
 from flask import g, current_app
-from flask_script import Command, Manager, Server
+from flask_script import Command, Manager, Option, Server
 
 import yawt
 from yawt.utils import call_plugins
@@ -29,11 +29,21 @@ class NewSite(Command):
 class Walk(Command):
     """
     The walk command will visit every article in the repo and let each
-    plugin do something with it.
+    plugin do something with it.  With a memory budget (in megabytes, or the
+    YAWT_WALK_MEMORY_BUDGET config), the walk takes care to stay within it.
     """
-    def run(self):
+    def get_options(self):
+        return [Option('--memory-budget', '-m', type=int)]
+
+    def run(self, memory_budget=None):
         current_app.preprocess_request()
-        g.site.walk()
+        memory_budget = memory_budget or \
+            current_app.config['YAWT_WALK_MEMORY_BUDGET']
+        if memory_budget:
+            memory_budget *= 1024 * 1024
+        peak = g.site.walk(memory_budget)
+        current_app.logger.info('walk done, peak memory %.1fMB',
+                                peak / (1024.0 * 1024.0))
 
 
 def _root_dir():
@@ -74,7 +74,17 @@ def _before_request():
                              content_folder=config['YAWT_CONTENT_FOLDER'],
                              template_folder=config['YAWT_TEMPLATE_FOLDER'],
                              file_extensions=config['YAWT_ARTICLE_EXTENSIONS'],
-                             meta_types=config['YAWT_META_TYPES'])
+                             meta_types=config['YAWT_META_TYPES'],
+                             file_metadata=_file_metadata_provider())
+
+
+def _file_metadata_provider():
+    """The first extension able to tell us about article files' times"""
+    if current_app.extension_info:
+        for ext in current_app.extension_info[1]:
+            if has_method(ext, 'file_metadata'):
+                return ext.file_metadata
+    return None
 
 
 def _handle_path(path):
@@ -1,11 +1,20 @@
 """Most things relating to article definitions reside here"""
+import gc
 import os
-import re
+from collections import namedtuple
 
 import yawt.default_templates
 from yawt.article import make_article
 from yawt.utils import call_plugins, call_plugins_arg, save_file, \
-    joinfile, ensure_path, base_and_ext, ReprMixin
+    joinfile, ensure_path, current_rss, peak_rss, ReprMixin
+
+# how many articles to visit between memory checks in a budgeted walk
+MEMORY_CHECK_INTERVAL = 100
+
+
+ArticleEntry = namedtuple('ArticleEntry', ['fullname', 'filename', 'entry'])
+ArticleEntry.__doc__ = """An article file found by YawtSiteManager.articles().
+entry is the os.DirEntry for the file, whose stat() is cached."""
 
 
 class YawtSiteManager(object):
@@ -17,6 +26,7 @@ class YawtSiteManager(object):
         self.template_folder = kwargs.get('template_folder', 'templates')
         self.file_extensions = kwargs.get('file_extensions')
         self.meta_types = kwargs.get('meta_types')
+        self.file_metadata = kwargs.get('file_metadata')
 
     def initialize(self):
         """Set up an empty blog folder"""
@@ -43,7 +53,8 @@ class YawtSiteManager(object):
         fullname = self._file2name(filename)
         if not self.exists(fullname):
             raise ArticleNotFoundError(fullname)
-        article = make_article(fullname, filename, self.meta_types)
+        article = make_article(fullname, filename, self.meta_types,
+                               self.file_metadata)
         return call_plugins_arg('on_article_fetch', article)
 
     def fetch_articles_by_repofiles(self, repofiles):
@@ -79,36 +90,86 @@ class YawtSiteManager(object):
             prefix += '/'
         return repofile.startswith(prefix)
 
-    def walk(self):
+    def walk(self, memory_budget=None):
         """Perform a walk (i.e. visit each article in the store) and run the
-        plugins to process the articles.
+        plugins to process the articles.  Returns the peak memory use (in
+        bytes) of the process.
+
+        If a memory_budget (in bytes) is supplied, the content of each article
+        is dropped once the plugins have seen it, and if the process grows
+        beyond the budget, the plugins are asked to let go of whatever they
+        have buffered up (via on_walk_flush).
         """
         call_plugins('on_pre_walk')
-        for fullname in self._walk():
-            article = self.fetch_article(fullname)
+        for count, article_entry in enumerate(self.articles(), 1):
+            article = make_article(article_entry.fullname,
+                                   article_entry.filename,
+                                   self.meta_types,
+                                   self.file_metadata,
+                                   article_entry.entry.stat())
+            article = call_plugins_arg('on_article_fetch', article)
             call_plugins('on_visit_article', article)
+            if memory_budget:
+                article.content = None
+                if count % MEMORY_CHECK_INTERVAL == 0:
+                    self._check_memory(memory_budget)
         call_plugins('on_post_walk')
+        return peak_rss()
+
+    @staticmethod
+    def _check_memory(memory_budget):
+        if current_rss() > memory_budget:
+            call_plugins('on_walk_flush')
+            gc.collect()
+
+    def articles(self, category="", file_extensions=None):
+        """Yield an ArticleEntry for each article under category, as the
+        content tree is scanned.  Only the category's own folder is scanned,
+        and only files with one of file_extensions (by default, the site's
+        article extensions) are returned.
+        """
+        file_extensions = file_extensions or self.file_extensions
+        content_root = self._content_root()
+        prefix_len = len(content_root) + 1
+        folders = [os.path.join(content_root, category) if category
+                   else content_root]
+        while folders:
+            try:
+                scanner = os.scandir(folders.pop())
+            except OSError:
+                continue
+            with scanner:
+                for entry in scanner:
+                    if entry.is_dir():
+                        # like os.walk, don't follow symlinked folders
+                        if not entry.is_symlink():
+                            folders.append(entry.path)
+                        continue
+                    base, extension = os.path.splitext(entry.name)
+                    if base == 'index' or \
+                       extension[1:] not in file_extensions:
+                        continue
+                    fullname = entry.path[prefix_len:-len(extension)]
+                    yield ArticleEntry(fullname, entry.path, entry)
+
+    def repofiles(self, category=""):
+        """Yield the repofiles (paths starting from the root of the
+        repository) of all the articles under category"""
+        prefix_len = len(self.root_dir.rstrip('/')) + 1
+        for article_entry in self.articles(category):
+            yield article_entry.filename[prefix_len:]
 
     def _fetch_by_fullname(self, fullname):
         filename = self._fullname2file(fullname)
         if filename is None:
             raise ArticleNotFoundError(fullname)
-        return make_article(fullname, filename, self.meta_types)
+        return make_article(fullname, filename, self.meta_types,
+                            self.file_metadata)
 
     def _walk(self, category=""):
         """Yields fullnames"""
-        start_path = os.path.join(self._content_root(), category)
-        for directory, basedirs, basefiles in os.walk(start_path):
-            for filename in self._articles_in_directory(directory, basefiles):
-                yield self._file2name(filename)
-
-    def _articles_in_directory(self, directory, basefiles):
-        return [os.path.abspath(os.path.join(directory, basefile))
-                for basefile in basefiles if self._is_article_basefile(basefile)]
-
-    def _is_article_basefile(self, basefile):
-        base, extension = base_and_ext(basefile)
-        return extension in self.file_extensions and base != 'index'
+        for article_entry in self.articles(category):
+            yield article_entry.fullname
 
     def _fullname_ext2file(self, fullname, ext):
         return joinfile(self._content_root(), fullname, ext)
@@ -131,10 +192,10 @@ class YawtSiteManager(object):
         """Take a full absolute filename (including repository root folder) and
         extract the fullname of the article
         """
-        rel_filename = re.sub('^{0}/'.format(self._content_root()),
-                              '', filename)
-        fullname = os.path.splitext(rel_filename)[0]
-        return fullname
+        prefix = self._content_root() + '/'
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+        return os.path.splitext(filename)[0]
 
     def _content_root(self):
         return os.path.join(self.root_dir, self.content_folder)
@@ -2,8 +2,17 @@
 
 import unittest
 import os.path
+import pickle
 import shutil
-from yawt.article import make_article, ArticleInfo
+
+import jsonpickle
+
+from datetime import datetime
+
+from mock import patch
+
+from yawt.article import make_article, category_chain, parse_post, \
+    read_header, ArticleInfo
 from yawt.utils import save_file
 
 
@@ -32,8 +41,27 @@ class TestArticle(unittest.TestCase):
         save_file('/tmp/stuff/article_file.txt', 'blah')
         article = make_article('stuff/article_file',
                                '/tmp/stuff/article_file.txt')
-        self.assertTrue(isinstance(article.info.create_time, float))
-        self.assertTrue(isinstance(article.info.modified_time, float))
+        self.assertTrue(isinstance(article.info.create_time, int))
+        self.assertTrue(isinstance(article.info.modified_time, int))
+
+    def test_make_article_asks_file_metadata_provider(self):
+        save_file('/tmp/stuff/article_file.txt', 'blah')
+        provider = lambda filename: {'create_time': 1000,
+                                     'modified_time': 2000,
+                                     'author': 'Dude User'}
+        article = make_article('stuff/article_file',
+                               '/tmp/stuff/article_file.txt',
+                               file_metadata=provider)
+        self.assertEquals(1000, article.info.create_time)
+        self.assertEquals(2000, article.info.modified_time)
+        self.assertEquals('Dude User', article.info.author)
+
+    def test_make_article_falls_back_to_file_times(self):
+        save_file('/tmp/stuff/article_file.txt', 'blah')
+        article = make_article('stuff/article_file',
+                               '/tmp/stuff/article_file.txt',
+                               file_metadata=lambda filename: None)
+        self.assertTrue(isinstance(article.info.create_time, int))
 
     def test_make_article_loads_simple_metadata(self):
         article_text = """---
@@ -77,6 +105,111 @@ blah
                                meta_types={'date': 'iso8601'})
         self.assertTrue(isinstance(article.info.date, int))
 
+    def test_parse_post_reads_simple_header_without_yaml(self):
+        text = """---
+title: this is a title
+count: 76
+tags: tag1,tag2
+create_time: 2016-04-01T10:00:00
+---
+
+blah
+"""
+        with patch('yawt.article.yaml.load') as load:
+            metadata, content = parse_post(text)
+        self.assertFalse(load.called)
+        self.assertEquals({'title': 'this is a title',
+                           'count': 76,
+                           'tags': 'tag1,tag2',
+                           'create_time': datetime(2016, 4, 1, 10, 0)},
+                          metadata)
+        self.assertEquals('blah', content)
+
+    def test_parse_post_falls_back_to_yaml(self):
+        for value, expected in [("[5, 'dd']", [5, 'dd']),
+                                ('yes', True),
+                                ('1.5', 1.5),
+                                ('012', 10),
+                                ('hello # comment', 'hello')]:
+            metadata, content = parse_post('---\nfoo: {0}\n---\nblah'
+                                           .format(value))
+            self.assertEquals({'foo': expected}, metadata)
+            self.assertEquals('blah', content)
+
+    def test_parse_post_without_front_matter(self):
+        self.assertEquals(({}, 'just text'), parse_post('just text\n'))
+        self.assertEquals(({}, ''), parse_post(''))
+
+    def test_make_article_treats_naive_dates_as_utc(self):
+        save_file('/tmp/stuff/article_file.txt',
+                  '---\ndate: 2015-05-16T01:00:00\n---\nblah')
+        article = make_article('stuff/article_file',
+                               '/tmp/stuff/article_file.txt',
+                               meta_types={'date': 'iso8601'})
+        self.assertEquals(1431738000, article.info.date)
+
+    def test_read_header_leaves_content_on_disk(self):
+        body = 'x' * 1000 + '\n---\nmore'
+        save_file('/tmp/stuff/big.txt',
+                  '\n---\ntitle: big\ntags: [a, b]\n---\n\n' + body + '\n')
+        metadata, content = read_header('/tmp/stuff/big.txt')
+        self.assertEquals({'title': 'big', 'tags': ['a', 'b']}, metadata)
+        self.assertEquals(body, content.load())
+
+    def test_read_header_returns_none_without_header(self):
+        save_file('/tmp/stuff/plain.txt', 'just text')
+        self.assertEquals(None, read_header('/tmp/stuff/plain.txt'))
+        save_file('/tmp/stuff/empty.txt', '')
+        self.assertEquals(None, read_header('/tmp/stuff/empty.txt'))
+
+    def test_make_article_loads_big_content_lazily(self):
+        text = '---\ntitle: big\n---\n\nbig content'
+        save_file('/tmp/stuff/big.txt', text)
+        with patch('yawt.article.LAZY_CONTENT_SIZE', 10):
+            article = make_article('stuff/big', '/tmp/stuff/big.txt')
+        self.assertEquals('big', article.info.title)
+        self.assertFalse(article.content_loaded())
+        self.assertEquals('big content', article.content)
+        self.assertTrue(article.content_loaded())
+
+    def test_lazy_content_rereads_changed_file(self):
+        save_file('/tmp/stuff/big.txt', '---\ntitle: big\n---\nold')
+        with patch('yawt.article.LAZY_CONTENT_SIZE', 10):
+            article = make_article('stuff/big', '/tmp/stuff/big.txt')
+        save_file('/tmp/stuff/big.txt',
+                  '---\ntitle: bigger\n---\nnew content')
+        self.assertEquals('new content', article.content)
+
+    def test_make_article_interns_repeated_values(self):
+        save_file('/tmp/stuff/a.txt', '---\ntags: tag1, tag2\n---\n')
+        save_file('/tmp/stuff/b.txt', '---\ntags: tag2\n---\n')
+        info_a = make_article('stuff/a', '/tmp/stuff/a.txt',
+                              meta_types={'tags': 'list'}).info
+        info_b = make_article('stuff/b', '/tmp/stuff/b.txt',
+                              meta_types={'tags': 'list'}).info
+        self.assertTrue(info_a.category is info_b.category)
+        self.assertTrue(info_a.extension is info_b.extension)
+        self.assertTrue(info_a.tags[1] is info_b.tags[0])
+
+    def test_category_chain_is_shared(self):
+        chain = category_chain('cooking/indian/south')
+        self.assertEquals(('cooking/indian/south', 'cooking/indian',
+                           'cooking'), chain)
+        self.assertTrue(chain is category_chain('cooking/indian/south'))
+        self.assertEquals(chain[1:], category_chain('cooking/indian'))
+        self.assertEquals(('',), category_chain(''))
+
+    def test_decoded_info_is_interned(self):
+        info = ArticleInfo(fullname='cooking/madras', category='cooking',
+                           categories=category_chain('cooking'),
+                           tags=['hot'])
+        decoded = [jsonpickle.decode(jsonpickle.encode(info))
+                   for i in range(2)]
+        self.assertEquals(info, decoded[0])
+        self.assertTrue(decoded[0].category is decoded[1].category)
+        self.assertTrue(decoded[0].tags[0] is decoded[1].tags[0])
+        self.assertTrue(decoded[0].categories is category_chain('cooking'))
+
     def test_under_returns_true_if_article_is_in_folder(self):
         info = ArticleInfo(fullname='cooking/madras',
                            category='cooking',
@@ -85,6 +218,56 @@ blah
         self.assertTrue(info.under('cooking'))
         self.assertFalse(info.under('reading'))
 
+    def test_info_keeps_extra_metadata_out_of_slots(self):
+        info = ArticleInfo(fullname='cooking/madras', tags=['hot'])
+        info.author = 'Dude User'
+        self.assertFalse(hasattr(info, '__dict__'))
+        self.assertEquals({'tags': ['hot'], 'author': 'Dude User'}, info.extra)
+        self.assertEquals('Dude User', info.author)
+        self.assertRaises(AttributeError, getattr, info, 'title')
+        del info.author
+        self.assertFalse(hasattr(info, 'author'))
+
+    def test_infos_share_extra_metadata_names(self):
+        info1 = ArticleInfo(tags=['hot'], author='Dude User')
+        info2 = ArticleInfo(tags=['mild'], author='Other User')
+        self.assertTrue(info1._extra_keys is info2._extra_keys)
+
+    def test_info_stores_times_as_ints(self):
+        info = ArticleInfo(create_time=1000.7)
+        info.modified_time = 2000.2
+        self.assertEquals(1000, info.create_time)
+        self.assertEquals(2000, info.modified_time)
+
+    def test_info_equality_and_repr(self):
+        info1 = ArticleInfo(fullname='cooking/madras', tags=['hot'])
+        info2 = ArticleInfo(fullname='cooking/madras', tags=['hot'])
+        self.assertEquals(info1, info2)
+        info2.tags = ['mild']
+        self.assertNotEquals(info1, info2)
+        self.assertEquals("ArticleInfo(fullname='cooking/madras', "
+                          "category='', slug='', extension='', "
+                          "create_time=None, modified_time=None, "
+                          "tags=['hot'])", repr(info1))
+
+    def test_info_survives_pickling(self):
+        info = ArticleInfo(fullname='cooking/madras', create_time=1000,
+                           tags=['hot'])
+        self.assertEquals(info, jsonpickle.decode(jsonpickle.encode(info)))
+        self.assertEquals(info, pickle.loads(pickle.dumps(info)))
+
+    def test_info_loads_from_old_summaries(self):
+        old = '{"py/object": "yawt.article.ArticleInfo", ' \
+              '"fullname": "cooking/madras", "category": "cooking", ' \
+              '"slug": "madras", "extension": "txt", "create_time": 1000, ' \
+              '"modified_time": 2000, "tags": ["hot"]}'
+        info = jsonpickle.decode(old)
+        self.assertEquals(ArticleInfo(fullname='cooking/madras',
+                                      category='cooking', slug='madras',
+                                      extension='txt', create_time=1000,
+                                      modified_time=2000, tags=['hot']),
+                          info)
+
     def tearDown(self):
         if os.path.exists('/tmp/stuff'):
             shutil.rmtree('/tmp/stuff')
@@ -6,7 +6,7 @@ from yawt.site_manager import YawtSiteManager,\
 from yawt.article import ArticleInfo
 import os.path
 import shutil
-from mock import Mock
+from mock import Mock, patch
 from flask_testing import TestCase
 from yawt import create_app
 from yawtext import Plugin
@@ -86,6 +86,7 @@ class TestPlugin(Plugin):
         self.post_walk = False
         self.article = None
         self.visited = []
+        self.flushes = 0
 
     def on_article_fetch(self, article):
         self.article = article
@@ -100,6 +101,9 @@ class TestPlugin(Plugin):
     def on_visit_article(self, article):
         self.visited.append(article)
 
+    def on_walk_flush(self):
+        self.flushes += 1
+
 
 class TestYawtSiteManager(TestCaseWithSite):
     # config
@@ -186,3 +190,65 @@ class TestYawtSiteManager(TestCaseWithSite):
         self.assertTrue('cooking/madras' in visited_fullnames)
         self.assertTrue('specific' in visited_fullnames)
         self.assertTrue('reading/hyperion' in visited_fullnames)
+
+    def _plugin(self):
+        return self.app.extension_info[0]['yawt.test.test_site_manager.TestPlugin']
+
+    def test_walk_without_budget_keeps_content(self):
+        self.assertTrue(self.store.walk() > 0)
+        plugin = self._plugin()
+        self.assertEquals(0, plugin.flushes)
+        self.assertTrue(all(a.content for a in plugin.visited))
+
+    def test_walk_with_budget_releases_content(self):
+        self.store.walk(memory_budget=10**12)
+        plugin = self._plugin()
+        self.assertEquals(4, len(plugin.visited))
+        self.assertEquals(0, plugin.flushes)
+        self.assertTrue(all(a.content is None for a in plugin.visited))
+
+    def test_walk_over_budget_flushes_plugins(self):
+        with patch('yawt.site_manager.MEMORY_CHECK_INTERVAL', 2):
+            with patch('yawt.site_manager.current_rss', return_value=2000):
+                self.store.walk(memory_budget=1000)
+        self.assertEquals(2, self._plugin().flushes)
+
+    def test_walk_over_budget_flushes_plugins_without_proc(self):
+        # no /proc/self/statm, so the peak (1GB here) stands in for the rss
+        with patch('yawt.site_manager.MEMORY_CHECK_INTERVAL', 2):
+            with patch('yawt.utils.open', side_effect=IOError, create=True):
+                with patch('yawt.utils.peak_rss', return_value=10**9):
+                    self.store.walk(memory_budget=1000)
+        self.assertEquals(2, self._plugin().flushes)
+
+    def test_articles_yields_entries_with_stat(self):
+        entries = {e.fullname: e for e in self.store.articles()}
+        self.assertEquals(['cooking/madras', 'entry', 'reading/hyperion',
+                           'specific'], sorted(entries))
+        madras = entries['cooking/madras']
+        self.assertEquals(os.path.join(self.site.site_root,
+                                       'content/cooking/madras.txt'),
+                          madras.filename)
+        self.assertEquals(os.stat(madras.filename).st_mtime,
+                          madras.entry.stat().st_mtime)
+
+    def test_articles_filters_by_extension(self):
+        fullnames = [e.fullname for e in
+                     self.store.articles(file_extensions=['blah'])]
+        self.assertEquals(['reading/dummy'], fullnames)
+
+    def test_articles_only_scans_category(self):
+        scanned = []
+        real_scandir = os.scandir
+        def scandir(path):
+            scanned.append(path)
+            return real_scandir(path)
+        with patch('os.scandir', scandir):
+            fullnames = [e.fullname for e in self.store.articles('cooking')]
+        self.assertEquals(['cooking/madras'], fullnames)
+        self.assertEquals([os.path.join(self.site.site_root,
+                                        'content/cooking')], scanned)
+
+    def test_repofiles(self):
+        self.assertEquals(['content/reading/hyperion.txt'],
+                          list(self.store.repofiles('reading')))
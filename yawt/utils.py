@@ -1,10 +1,13 @@
 """Just a hodge podge of utility methods for use in various places in YAWT
 """
 
+import importlib.util
 import os
 import re
+import resource
+import sys
 from datetime import date, datetime, time
-from flask import current_app
+from flask import current_app, g
 import yawt
 
 
@@ -22,15 +25,33 @@ def save_file(filename, contents):
         f.write(contents)
 
 
+_FILE_CACHE = {}
+
+
+def cached_for_file(filename, build, *args):
+    """Return build(filename, *args), reusing the result for as long as
+    filename is unchanged on disk (same modification time and size).  Handy
+    for things like API clients built from credential files.  The args are
+    part of the cache key, so should be plain values like URLs."""
+    stat = os.stat(filename)
+    version = (stat.st_mtime, stat.st_size)
+    key = (filename, build) + args
+    cached = _FILE_CACHE.get(key)
+    if cached is None or cached[0] != version:
+        cached = (version, build(filename, *args))
+        _FILE_CACHE[key] = cached
+    return cached[1]
+
+
 def remove_file(filename):
     """Remove file at filename"""
     os.remove(filename)
 
 
 def ensure_path(path):
-    """Make sure the path exists, creating it if need be"""
-    if not os.path.exists(path):
-        os.makedirs(path)
+    """Make sure the path exists, creating it if need be (even if someone else
+    is creating it too)"""
+    os.makedirs(path, exist_ok=True)
 
 
 def base_and_ext(basefile):
@@ -40,6 +61,42 @@ def base_and_ext(basefile):
     return (base, extension)
 
 
+def lazy_import(name):
+    """Return the module called name, deferring the actual import until one
+    of its attributes is first accessed.  Use this for heavy dependencies that
+    many commands and requests never touch."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError('No module named ' + name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def current_rss():
+    """Return the resident memory of this process, in bytes.  Without
+    /proc (e.g. on macOS) this is the peak resident memory, which is never
+    less than the current, so a memory budget is still kept to, if
+    cautiously."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (IOError, OSError, IndexError, ValueError):
+        return peak_rss()
+
+
+def peak_rss():
+    """Return the peak resident memory of this process, in bytes"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
 def has_method(obj, method):
     """Return true of this oject has a callbale attribute on it that matches
     the supplied name
@@ -238,3 +295,93 @@ class ChangedFiles(ReprMixin, EqMixin):
                             modified=modified,
                             deleted=deleted,
                             renamed=renamed)
+
+
+# How the status of a file evolves when a later change set is applied on top
+# of an earlier one.  None means the two cancel out.
+_MERGED_STATUS = {
+    (None, 'added'): 'added',
+    (None, 'modified'): 'modified',
+    (None, 'deleted'): 'deleted',
+    ('added', 'added'): 'added',
+    ('added', 'modified'): 'added',
+    ('added', 'deleted'): None,
+    ('modified', 'added'): 'modified',
+    ('modified', 'modified'): 'modified',
+    ('modified', 'deleted'): 'deleted',
+    ('deleted', 'added'): 'modified',
+    ('deleted', 'modified'): 'modified',
+    ('deleted', 'deleted'): 'deleted',
+}
+
+
+def merge_changes(changes):
+    """Merge a sequence of consecutive ChangedFiles instances into a single
+    ChangedFiles instance representing their net effect.  Renames are
+    normalized into deletes and adds first, and a file added and then deleted
+    again disappears altogether."""
+    if len(changes) == 1:
+        return changes[0]
+
+    statuses = {}
+    order = []
+    for changed in changes:
+        changed = changed.normalize()
+        # within a single change set, a path that is both deleted and added
+        # was replaced, so apply the deletes first
+        for status, files in [('deleted', changed.deleted),
+                              ('added', changed.added),
+                              ('modified', changed.modified)]:
+            for repofile in files:
+                if repofile not in statuses:
+                    order.append(repofile)
+                merged = _MERGED_STATUS[(statuses.get(repofile), status)]
+                statuses[repofile] = merged
+
+    net = ChangedFiles()
+    for repofile in order:
+        status = statuses[repofile]
+        if status:
+            getattr(net, status).append(repofile)
+    return net
+
+
+class ChangeQueue(object):
+    """Collects consecutive change sets and hands their net effect to the
+    plugins' on_files_changed in one go.  Used as a context manager, it
+    collects whatever files_changed is given in the meantime, and dispatches
+    it on the way out."""
+    def __init__(self):
+        self.changes = []
+        self._outer = None
+
+    def push(self, changed):
+        """Queue up a change set"""
+        self.changes.append(changed)
+
+    def flush(self):
+        """Dispatch the net change of everything queued so far, if anything"""
+        if self.changes:
+            changed = merge_changes(self.changes)
+            self.changes = []
+            call_plugins('on_files_changed', changed)
+
+    def __enter__(self):
+        self._outer = g.get('change_queue')
+        g.change_queue = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        g.change_queue = self._outer
+        if exc_type is None:
+            self.flush()
+
+
+def files_changed(changed):
+    """Tell the plugins about changed, or if a ChangeQueue is collecting,
+    queue it up to be merged with the rest"""
+    queue = g.get('change_queue')
+    if queue is not None:
+        queue.push(changed)
+    else:
+        call_plugins('on_files_changed', changed)
@@ -4,10 +4,50 @@ This file contains utility classes in use by various extensions in YAWT
 import os
 
 import jsonpickle
-from flask import g, request
+from flask import current_app, g, request
 
 from yawt.utils import load_file, save_file, abs_state_folder, cfg,\
-    single_dict_var, ReprMixin, EqMixin, fullname, content_folder
+    single_dict_var, ReprMixin, EqMixin, fullname, content_folder, \
+    call_plugins
+
+
+_SUMMARY_CACHE = {}
+
+
+def load_summary(relpath):
+    """Load the jsonpickle'd summary at relpath (relative to the state
+    folder).  If the warm-start snapshot is loaded and holds the summary, and
+    the summary file hasn't been saved since, it is returned from the
+    snapshot.  Returns None if there is no such summary.
+
+    Otherwise the decoded summary is cached, and reused by later requests for
+    as long as the summary file is unchanged.  Either way, the returned object
+    may be shared between requests, so treat it as read only.
+    """
+    path = os.path.join(abs_state_folder(), relpath)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+    snapshot = _snapshot()
+    if snapshot is not None:
+        summary = snapshot.get(relpath)
+        if summary is not None and \
+           (mtime is None or mtime <= snapshot.snapshot.mtime):
+            return summary
+    if mtime is None:
+        return None
+    cached = _SUMMARY_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, jsonpickle.decode(load_file(path)))
+        _SUMMARY_CACHE[path] = cached
+    return cached[1]
+
+
+def _snapshot():
+    if not current_app.extension_info:
+        return None
+    return current_app.extension_info[0].get('yawtext.snapshot.YawtSnapshot')
 
 
 class Plugin(object):
@@ -129,13 +169,13 @@ class SummaryProcessor(ArticleProcessor):
 
     def _save_summary(self):
         save_file(self._abs_summary_file(), jsonpickle.encode(self.summary))
+        call_plugins('on_summary_saved', self._summary_file(), self.summary)
+
+    def _summary_file(self):
+        return os.path.join(self.plugin_name, self.root, self.summary_file)
 
     def _abs_summary_file(self):
-        path = os.path.join(abs_state_folder(),
-                            self.plugin_name,
-                            self.root,
-                            self.summary_file)
-        return path
+        return os.path.join(abs_state_folder(), self._summary_file())
 
     @staticmethod
     def context_processor(summaryfile_cfg, bases_cfg, varname):
@@ -145,9 +185,8 @@ class SummaryProcessor(ArticleProcessor):
         bases = cfg(bases_cfg) or ['']
         for base in bases:
             if request.path.startswith('/'+base):
-                path = os.path.join(abs_state_folder(), base, summary_file)
-                loaded_file = load_file(path)
-                return single_dict_var(varname, jsonpickle.decode(loaded_file))
+                summary = load_summary(os.path.join(base, summary_file))
+                return single_dict_var(varname, summary)
         return {}
 
 
@@ -1,20 +1,8 @@
-import os
-
 import datetime
-import frontmatter
-import yaml
-from flask import current_app
 
-from yawt.utils import save_file
 from yawtext import Plugin
-
-
-class ExplicitDumper(yaml.SafeDumper):
-    """
-    A dumper that will never emit aliases.
-    """
-    def ignore_aliases(self, data):
-        return True
+# pylint: disable=unused-import
+from yawtext.sync import rewrite_posts, ExplicitDumper
 
 
 # small comprimise for unit testing, this will be monkeypatched
@@ -22,21 +10,11 @@ def _now():
     return datetime.datetime.utcnow()
 
 
-def _fix_dates_for_article(repofile):
-    abs_article_file = os.path.join(current_app.yawt_root_dir, repofile)
-    post = frontmatter.load(abs_article_file)
+def _fix_dates_for_post(post):
     now = _now()
     if 'create_time' not in post.metadata:
         post['create_time'] = now
     post['modified_time'] = now
-    save_file(abs_article_file, frontmatter.dumps(post, Dumper=ExplicitDumper))
-
-
-def _fix_dates(changed):
-    """Add timestamps to files mentioned in the index"""
-    changed = changed.content_changes()
-    for changed_file in changed.added + changed.modified:
-        _fix_dates_for_article(changed_file)
 
 
 class YawtAutodates(Plugin):
@@ -49,4 +27,8 @@ class YawtAutodates(Plugin):
 
     def on_pre_sync(self, changed):
         """add create amd modifed dates to new files about to be synced"""
-        _fix_dates(changed)
+        rewrite_posts(changed)
+
+    def on_pre_sync_post(self, repofile, post, added):
+        """add create and modified dates to a post about to be synced"""
+        _fix_dates_for_post(post)
@@ -1,20 +1,20 @@
 import os
 
 import frontmatter
-from flask import current_app
+from flask import current_app, g
 from flask_script import Command, Option
 
-from yawt.utils import save_file, content_folder, fullname
+from yawt.utils import save_file, load_file, content_folder, fullname
 from yawtext import Plugin
+from yawtext.sync import rewrite_posts, parallel_map, load_post, \
+    save_post
 
 
 def _whoosh():
     return current_app.extension_info[0]['flask_whoosh.Whoosh']
 
 
-def _add_tags_for_article(repofile, searcher):
-    abs_article_file = os.path.join(current_app.yawt_root_dir, repofile)
-    post = frontmatter.load(abs_article_file)
+def _add_tags_for_post(post, searcher):
     if 'tags' not in post.metadata:
         keywords = [keyword for keyword, _
                     in searcher.key_terms_from_text("content", post.content,
@@ -23,13 +23,6 @@ def _add_tags_for_article(repofile, searcher):
         usertags = input('Enter tags (default '+keyword_str+'): ')
         tags = usertags or keyword_str
         post['tags'] = tags
-        save_file(abs_article_file, frontmatter.dumps(post))
-
-
-def _add_tags(changed):
-    searcher = _whoosh().searcher
-    for new_file in changed.content_changes().added:
-        _add_tags_for_article(new_file, searcher)
 
 
 # called from the Command
@@ -52,6 +45,63 @@ def _add_tags_for_indexed_article(indexed_file, edit):
         save_file(abs_article_file, frontmatter.dumps(post))
 
 
+def _suggest_tags(category=''):
+    """Return (repofile, tags) pairs for all the indexed articles under
+    category, all worked out in the one searcher session"""
+    searcher = _whoosh().searcher
+    suggestions = []
+    for repofile in g.site.repofiles(category):
+        docnum = searcher.document_number(fullname=fullname(repofile))
+        if docnum is None:
+            continue
+        keywords = [keyword for keyword, _
+                    in searcher.key_terms([docnum], "content", numterms=3)]
+        suggestions.append((repofile, ",".join(keywords)))
+    return suggestions
+
+
+def _save_review(review_file, suggestions):
+    lines = ['{0}: {1}\n'.format(repofile, tags)
+             for repofile, tags in suggestions]
+    save_file(review_file, ''.join(lines))
+
+
+def _load_review(review_file):
+    """Read back a review file, possibly edited by hand.  Articles with no
+    tags left are skipped."""
+    suggestions = []
+    for line in load_file(review_file).splitlines():
+        repofile, _, tags = line.rpartition(':')
+        tags = tags.strip()
+        if repofile and tags:
+            suggestions.append((repofile.strip(), tags))
+    return suggestions
+
+
+def _apply_tags(suggestions):
+    """Set the tags of many articles at once"""
+    root_dir = current_app.yawt_root_dir
+    filenames = [os.path.join(root_dir, repofile)
+                 for repofile, _ in suggestions]
+    posts = parallel_map(load_post, filenames)
+    for post, (_, tags) in zip(posts, suggestions):
+        post['tags'] = tags
+    parallel_map(save_post, filenames, posts)
+
+
+def _add_tags_for_category(category, edit, review_file):
+    suggestions = _suggest_tags(category)
+    if review_file:
+        _save_review(review_file, suggestions)
+        print("Wrote tags for {0} articles to {1}".format(len(suggestions),
+                                                          review_file))
+    elif edit:
+        _apply_tags(suggestions)
+    else:
+        for repofile, tags in suggestions:
+            print("{0}: {1}".format(repofile, tags))
+
+
 class Autotag(Command):
     """Autotag command"""
     def __init__(self):
@@ -59,11 +109,24 @@ class Autotag(Command):
 
     def get_options(self):
         return [Option('--edit', '-e', action='store_true'),
-                Option('article')]
-
-    def run(self, edit, article):
+                Option('--all', '-a', dest='all_articles',
+                       action='store_true'),
+                Option('--category', '-c'),
+                Option('--review', '-r', dest='review_file'),
+                Option('--apply', dest='apply_file'),
+                Option('article', nargs='?')]
+
+    def run(self, edit, article=None, all_articles=False, category=None,
+            review_file=None, apply_file=None):
         current_app.preprocess_request()
-        _add_tags_for_indexed_article(article, edit)
+        if apply_file:
+            _apply_tags(_load_review(apply_file))
+        elif all_articles or category is not None:
+            _add_tags_for_category(category or '', edit, review_file)
+        elif article:
+            _add_tags_for_indexed_article(article, edit)
+        else:
+            print("supply an article, --all or --category")
 
 
 class YawtAutotags(Plugin):
@@ -76,7 +139,12 @@ class YawtAutotags(Plugin):
 
     def on_pre_sync(self, changed):
         """add tags to new files about to be synced"""
-        _add_tags(changed)
+        rewrite_posts(changed)
+
+    def on_pre_sync_post(self, repofile, post, added):
+        """add tags to a new post about to be synced"""
+        if added:
+            _add_tags_for_post(post, _whoosh().searcher)
 
     def on_cli_init(self, manager):
         """add the command to the CLI manager"""
@@ -4,15 +4,27 @@ This extension registers a Blueprint and provides - a template varable with the
 article counts for all the categories (folders), on the system.
 """
 import os
-import re
+from functools import lru_cache
 
 from flask import current_app, Blueprint
 
+from yawt.article import category_chain
 from yawt.utils import cfg
 from yawtext import HierarchyCount, Plugin, SummaryProcessor, BranchedVisitor
 from yawtext.collections import CollectionView
 
 
+@lru_cache(maxsize=1024)
+def relative_category(category, base):
+    """Return category relative to base, e.g. indian for cooking/indian under
+    cooking.  Memoized, since the counters ask about the same few pairs over
+    and over."""
+    relative = category[len(base):]
+    if relative.startswith('/'):
+        relative = relative[1:]
+    return relative
+
+
 # Category pages plugin
 
 
@@ -27,15 +39,10 @@ class YawtCategories(Plugin):
         app.config.setdefault('YAWT_CATEGORY_FULL_ARTICLE_FLAVOURS', [])
 
     def on_article_fetch(self, article):
-        """Take the article category and construct a list of progressively more
-        general categories.
+        """Set the article categories to the (shared) tuple of progressively
+        more general categories.
         """
-        category = article.info.category
-        categories = [category]
-        while '/' in category:
-            category = category.rsplit('/', 1)[0]
-            categories.append(category)
-        article.info.categories = categories
+        article.info.categories = category_chain(article.info.category)
         return article
 
     def on_404(self, name, flavour):
@@ -63,6 +70,9 @@ class CategoryView(CollectionView):
         """
         return category
 
+    def postings_key(self, category, *args, **kwargs):
+        return (category, None)
+
     def get_template_name(self):
         """Return the template to be used for category collections"""
         return current_app.config['YAWT_CATEGORY_TEMPLATE']
@@ -111,18 +121,9 @@ class CategoryProcessor(SummaryProcessor):
     def on_visit_article(self, article):
         category = article.info.category
         if category == self.root or category.startswith(self.root):
-            category = self._slice_base(category, self.root)
-            self.summary.add(category)
+            self.summary.add(relative_category(category, self.root))
 
     def unvisit(self, name):
         category = os.path.dirname(name)
         if category.startswith(self.root):
-            category = self._slice_base(category, self.root)
-            self.summary.remove(category)
-
-    @staticmethod
-    def _slice_base(category, countbase):
-        category = re.sub('^'+countbase, '', category)
-        if category.startswith('/'):
-            category = category[1:]
-        return category
+            self.summary.remove(relative_category(category, self.root))
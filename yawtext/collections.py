@@ -14,6 +14,7 @@ from yawt.utils import is_loaded
 from yawt.view import render
 from yawtext import Plugin
 from yawtext.indexer import search_page
+from yawtext.postings import page_postings
 
 
 collectionsbp = Blueprint('paging', __name__)
@@ -55,14 +56,7 @@ class CollectionView(View):
         up pagination variables in the g variables.  Finally render the
         template, or abort with a 404 if you don't find a template.
         """
-        ainfos, total = [], 0
-        if is_loaded('yawtext.indexer.YawtIndexer'):
-            query = self.query(category, *args, **kwargs)
-            sortfield = current_app.config['YAWT_COLLECTIONS_SORT_FIELD']
-            ainfos, total = search_page(query=query,
-                                        sortedby=sortfield,
-                                        page=g.page, pagelen=g.pagelen,
-                                        reverse=True)
+        ainfos, total = self.fetch_infos(category, *args, **kwargs)
         g.total_results = total
         g.total_pages = int(ceil(float(g.total_results)/g.pagelen))
         g.has_prev_page = g.page > 1
@@ -85,6 +79,34 @@ class CollectionView(View):
         except TemplatesNotFound:
             abort(404)
 
+    def fetch_infos(self, category, *args, **kwargs):
+        """Return the article infos on the current page, along with the total
+        number of results.  The precomputed posting lists are used when they
+        can answer the collection query, otherwise we fall back to the
+        indexer.
+        """
+        key = self.postings_key(category, *args, **kwargs)
+        if key and is_loaded('yawtext.postings.YawtPostings'):
+            result = page_postings(key[0], key[1], g.page, g.pagelen,
+                                   reverse=True)
+            if result is not None:
+                return result
+
+        if is_loaded('yawtext.indexer.YawtIndexer'):
+            query = self.query(category, *args, **kwargs)
+            sortfield = current_app.config['YAWT_COLLECTIONS_SORT_FIELD']
+            return search_page(query=query,
+                               sortedby=sortfield,
+                               page=g.page, pagelen=g.pagelen,
+                               reverse=True)
+        return [], 0
+
+    def postings_key(self, category, *args, **kwargs):
+        """Return a (category, tag) tuple naming the posting list which
+        answers this collection, or None if the collection can only be
+        answered by a query"""
+        return None
+
     def query(self, category, *args, **kwargs):
         """Always passed a category, and the rest varies by collection type"""
         raise NotImplementedError()
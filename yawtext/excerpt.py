@@ -1,10 +1,12 @@
 """The basic YAWT excerpt extension"""
 
-from bs4 import BeautifulSoup
 from flask import current_app, Markup
 
+from yawt.utils import lazy_import
 from yawtext import Plugin
 
+bs4 = lazy_import('bs4')
+
 
 class YawtExcerpt(Plugin):
     """YAWT excerpt extension.  Sets an excerpt into the article summary
@@ -19,7 +21,7 @@ class YawtExcerpt(Plugin):
     def on_article_fetch(self, article):
         """Set the article summary"""
         max_word_count = current_app.config['YAWT_EXCERPT_WORDCOUNT']
-        soup = BeautifulSoup(article.content, 'html.parser')
+        soup = bs4.BeautifulSoup(article.content, 'html.parser')
         summary = ''
         word_count = 0
         for child in soup.findAll(recursive=False):
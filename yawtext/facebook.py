@@ -1,14 +1,28 @@
 """Module for posting to facebook"""
 import os
-import facepy
-from yawt.utils import cfg, load_file
+
+from flask import current_app
+
+from yawt.utils import cfg, load_file, lazy_import, cached_for_file
+
+facepy = lazy_import('facepy')
+
+
+def _graph_url():
+    return current_app.config.get('YAWT_MICROPOST_FB_GRAPH_URL',
+                                  'https://graph.facebook.com')
+
+
+def _build_graph(token_file, url):
+    """The graph client is reused (along with its connections) until the
+    token file changes"""
+    return facepy.GraphAPI(load_file(token_file), url=url)
 
 
 def post_fb(post, link=None):
     """Post message to facebook"""
     token_file = os.path.expanduser(cfg('YAWT_MICROPOST_FB_ACCESS_TOKEN_FILE'))
-    access_tok = load_file(token_file)
-    graph = facepy.GraphAPI(access_tok)
+    graph = cached_for_file(token_file, _build_graph, _graph_url())
 
     if link:
         print("trying force facebook to scrape URL...")
@@ -3,7 +3,11 @@ import subprocess
 
 from flask import current_app
 
-from yawt.utils import run_in_context, call_plugins, ChangedFiles
+from yawt.utils import run_in_context, call_plugins, files_changed, \
+    has_method, extensions, ChangedFiles
+
+NULL_COMMIT = '0' * 40
+EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
 
 
 def _git_cmd(args):
@@ -13,32 +17,113 @@ def _git_cmd(args):
             '--work-tree='+current_app.yawt_root_dir] + args
 
 
-def _git_files_changed(tree1, tree2):
+def _git_files_changed(tree1, tree2=None):
     changed = _extract_diff_tree_files(tree1, tree2)
-    call_plugins('on_files_changed', changed)
+    files_changed(changed)
+
+
+def _wants_history():
+    """True if any plugin wants to see the changes commit by commit"""
+    return any(has_method(ext, 'on_commit_files_changed')
+               for ext in extensions())
+
+
+def _range_changed(extract, old, new):
+    """Tell the plugins about the net change between commits old and new,
+    found with a single diff (by extract, so that backends can supply their
+    own).  An old of NULL_COMMIT means the ref was created, so everything in
+    new is added.
+
+    Plugins which need the history (e.g. to date articles by the commit which
+    touched them) can opt in by implementing
+    on_commit_files_changed(commit, changed), and will first be called for
+    each commit in the range, oldest first."""
+    if _wants_history():
+        for commit in _rev_list(old, new):
+            call_plugins('on_commit_files_changed', commit, extract(commit))
+    if old == NULL_COMMIT:
+        changed = extract(EMPTY_TREE, new)
+    else:
+        changed = extract(old, new)
+    files_changed(changed)
+
+
+def _git_range_changed(old, new):
+    _range_changed(_extract_diff_tree_files, old, new)
 
 
-def _handle_changed_files(repo_path, app, tree1, tree2=None):
+def _run_hook(repo_path, app, func, *args):
     if not app:
-        run_in_context(repo_path, _git_files_changed, tree1, tree2)
+        run_in_context(repo_path, func, *args)
     else:
-        _git_files_changed(tree1, tree2)
+        func(*args)
 
 
 def post_merge(repo_path, app=None):
     """Entry point for a vc merge operation"""
-    _handle_changed_files(repo_path, app, 'ORIG_HEAD', 'HEAD')
+    _run_hook(repo_path, app, _git_files_changed, 'ORIG_HEAD', 'HEAD')
 
 
 def post_commit(repo_path, app=None):
     """Entry point for a vc commit operation"""
-    _handle_changed_files(repo_path, app, 'HEAD')
+    _run_hook(repo_path, app, _git_files_changed, 'HEAD')
+
+
+def post_update(repo_path, old, new, app=None):
+    """Entry point for an arbitrary update of the repo, from commit old to
+    commit new"""
+    _run_hook(repo_path, app, _git_range_changed, old, new)
+
+
+def post_receive(repo_path, old, new, app=None):
+    """Entry point for a vc receive operation (i.e. a push into this repo),
+    which moved a ref from commit old to commit new.  The plugins see the net
+    change once, however many commits were pushed."""
+    _run_hook(repo_path, app, _git_range_changed, old, new)
+
+
+def _rev_list(old, new):
+    """Return the commits reachable from new but not old, oldest first"""
+    args = ['rev-list', '--reverse', new]
+    if old != NULL_COMMIT:
+        args.append('^' + old)
+    rev_list_out_b = subprocess.check_output(_git_cmd(args),
+                                             stderr=subprocess.STDOUT)
+    return rev_list_out_b.decode("utf-8").split()
+
+
+def vc_log(since=None):
+    """Return the history of the repo as a list of (commit, commit time,
+    author, changes) tuples, oldest first, where changes is a list of (status,
+    path) pairs.  If since is supplied, only commits after it are listed.
+    Renames are reported as a delete and an add."""
+    args = ['log', '--reverse', '--name-status', '--no-renames', '-z',
+            '--format=format:%x01%H %ct %an']
+    if since:
+        args.append(since + '..HEAD')
+    log_out_b = subprocess.check_output(_git_cmd(args),
+                                        stderr=subprocess.STDOUT)
+    log = []
+    for record in log_out_b.decode("utf-8").split('\x01')[1:]:
+        header, _, rest = record.partition('\n')
+        commit, ctime, author = header.split(' ', 2)
+        fields = [field for field in rest.split('\0') if field]
+        changes = list(zip(fields[0::2], fields[1::2]))
+        log.append((commit, int(ctime), author, changes))
+    return log
+
+
+def vc_head():
+    """Return the id of the commit currently checked out"""
+    head_out_b = subprocess.check_output(_git_cmd(['rev-parse', 'HEAD']),
+                                         stderr=subprocess.STDOUT)
+    return head_out_b.decode("utf-8").strip()
 
 
 def _extract_diff_tree_files(tree1, tree2=None):
     """Given git diff tree output, return the list of added, modied and
     removed files."""
-    args = ['diff-tree', '-r', '--name-status', '--no-commit-id',
+    args = ['diff-tree', '-r', '--root', '--name-status', '--no-commit-id',
             '--find-renames', tree1]
     cmd = _git_cmd(args)
 
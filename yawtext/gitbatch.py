@@ -0,0 +1,209 @@
+"""A YAWT git backend which keeps its git processes around
+
+The plain yawtext.git backend forks a git process for every question it asks
+of the repo, which adds up when a hook has to look at hundreds of commits
+(e.g. a big push).  This backend instead keeps one long running
+``git cat-file --batch-check`` process (for resolving revisions) and one
+``git diff-tree --stdin`` process (for diffing commits) per repo, and feeds
+them requests over their stdin.
+
+Select it with::
+
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.gitbatch'
+
+Operations which change the repo (add, commit, push) and status are
+delegated to yawtext.git.
+"""
+import atexit
+import os
+import subprocess
+import threading
+
+from flask import current_app
+
+from yawt.utils import files_changed, ChangedFiles
+# pylint: disable=unused-import
+from yawtext.git import _git_cmd, _range_changed, _run_hook, EMPTY_TREE, \
+    vc_ignore_file, vc_status, vc_add_tracked, vc_add_tracked_and_new, \
+    vc_commit, vc_push, vc_log
+
+
+# echoed back verbatim by diff-tree, so we know where each response ends
+_SENTINEL = b'yawt-end\n'
+
+_PIPES = {}
+_PIPES_LOCK = threading.Lock()
+
+
+class GitPipe(object):
+    """A git command reading requests from stdin, one line at a time, and
+    answering each of them on stdout"""
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.proc = None
+        self.lock = threading.Lock()
+
+    def _ensure_running(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = subprocess.Popen(self.cmd,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL)
+
+    def pid(self):
+        """pid of the git process, if running"""
+        return self.proc.pid if self.proc else None
+
+    def request(self, line, terminator):
+        """Send line to git, and read the response up to terminator"""
+        with self.lock:
+            self._ensure_running()
+            try:
+                self.proc.stdin.write(line)
+                self.proc.stdin.flush()
+                return self._read_until(terminator)
+            except (IOError, OSError):
+                self.close()
+                raise
+
+    def _read_until(self, terminator):
+        fd = self.proc.stdout.fileno()
+        chunks = []
+        tail = b''
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise IOError('git exited: ' + ' '.join(self.cmd))
+            chunks.append(chunk)
+            tail = (tail + chunk)[-len(terminator):]
+            if tail == terminator:
+                return b''.join(chunks)
+
+    def close(self):
+        """Shut the git process down"""
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait()
+            except (IOError, OSError):
+                pass
+            self.proc = None
+
+
+def _pipe(name, args):
+    key = (current_app.yawt_root_dir, name)
+    with _PIPES_LOCK:
+        if key not in _PIPES:
+            _PIPES[key] = GitPipe(_git_cmd(args))
+        return _PIPES[key]
+
+
+def _cat_file():
+    return _pipe('cat-file', ['cat-file', '--batch-check'])
+
+
+def _diff_tree():
+    return _pipe('diff-tree', ['diff-tree', '--stdin', '-r', '--root',
+                               '--always', '--name-status',
+                               '--find-renames', '-z'])
+
+
+@atexit.register
+def close_pipes():
+    """Shut down all the git processes"""
+    with _PIPES_LOCK:
+        for pipe in _PIPES.values():
+            pipe.close()
+        _PIPES.clear()
+
+
+def _resolve(rev):
+    """Return the commit id for rev (e.g. HEAD)"""
+    out = _cat_file().request((rev + '\n').encode('utf-8'), b'\n')
+    fields = out.decode('utf-8').split()
+    if len(fields) != 3:
+        raise ValueError('cannot resolve revision ' + rev)
+    return fields[0]
+
+
+def _parse_diff_tree(out):
+    """Parse diff-tree -z output into ChangedFiles"""
+    fields = out[:-len(_SENTINEL)].decode('utf-8').split('\0')
+    # the first field is the header: a commit id, or for a pair of trees, the
+    # tree ids and a newline, followed by the first status
+    _, _, first = fields[0].partition('\n')
+    fields = ([first] if first else []) + fields[1:]
+    added_files = []
+    modified_files = []
+    deleted_files = []
+    renamed_files = {}
+    i = 0
+    while i < len(fields) and fields[i]:
+        status = fields[i]
+        if status.startswith('R'):
+            renamed_files[fields[i+1]] = fields[i+2]
+            i += 3
+            continue
+        if status == 'A':
+            added_files.append(fields[i+1])
+        elif status == 'M':
+            modified_files.append(fields[i+1])
+        elif status == 'D':
+            deleted_files.append(fields[i+1])
+        i += 2
+    return ChangedFiles(added=added_files,
+                        modified=modified_files,
+                        deleted=deleted_files,
+                        renamed=renamed_files)
+
+
+def _extract_diff_tree_files(tree1, tree2=None):
+    """Return the files changed by commit tree1, or between commits tree1 and
+    tree2 if supplied"""
+    if tree1 == EMPTY_TREE:
+        # a pair of trees is diffed first to second
+        line = EMPTY_TREE + ' ' + _resolve(tree2 + '^{tree}')
+    elif tree2:
+        # diff-tree --stdin diffs the second commit on a line against the first
+        line = _resolve(tree2) + ' ' + _resolve(tree1)
+    else:
+        line = _resolve(tree1)
+    out = _diff_tree().request((line + '\n').encode('utf-8') + _SENTINEL,
+                               _SENTINEL)
+    return _parse_diff_tree(out)
+
+
+def _git_files_changed(tree1, tree2=None):
+    changed = _extract_diff_tree_files(tree1, tree2)
+    files_changed(changed)
+
+
+def _git_range_changed(old, new):
+    _range_changed(_extract_diff_tree_files, old, new)
+
+
+def post_merge(repo_path, app=None):
+    """Entry point for a vc merge operation"""
+    _run_hook(repo_path, app, _git_files_changed, 'ORIG_HEAD', 'HEAD')
+
+
+def post_commit(repo_path, app=None):
+    """Entry point for a vc commit operation"""
+    _run_hook(repo_path, app, _git_files_changed, 'HEAD')
+
+
+def post_update(repo_path, old, new, app=None):
+    """Entry point for an arbitrary update of the repo, from commit old to
+    commit new"""
+    _run_hook(repo_path, app, _git_range_changed, old, new)
+
+
+def post_receive(repo_path, old, new, app=None):
+    """Entry point for a vc receive operation (i.e. a push into this
+    repo)"""
+    _run_hook(repo_path, app, _git_range_changed, old, new)
+
+
+def vc_head():
+    """Return the id of the commit currently checked out"""
+    return _resolve('HEAD')
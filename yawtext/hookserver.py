@@ -0,0 +1,228 @@
+"""YAWT hook server extension
+
+Running a version control hook normally means building a whole YAWT app (and
+opening the index, loading summaries and so on) just to process one commit.
+On a busy authoring host these cold starts stack up.
+
+The serve-hooks command instead keeps a single app resident and listens on a
+unix socket for hook notifications.  The hooks themselves become thin
+clients which just send the name of the hook (post_commit, post_merge or
+post_receive, with its arguments) down the socket.  Notifications arriving
+in a burst are coalesced: the server waits until the socket has been quiet
+for YAWT_HOOKS_DELAY seconds, then processes everything from the last commit
+it handled up to the current one as a single change set.
+
+The hook scripts call run_hook, which finds the socket from the site's
+config.py (YAWT_STATE_FOLDER and YAWT_HOOKS_SOCKET), the same way the server
+does.  If nothing is listening, or the connection can't be made within
+YAWT_HOOKS_CLIENT_TIMEOUT seconds, the hook is processed right there in the
+hook, in an app of its own, as it would be without a server.  Once the
+notification has been sent, it's the server's, even if it's too busy to
+answer straight away, so that no commit gets processed twice.
+"""
+import os
+import socket
+
+from flask import current_app, Config
+from flask_script import Command, Option
+
+import yawt
+from yawt.utils import cfg, ensure_path, run_in_context, ChangeQueue
+from yawtext import Plugin
+from yawtext.vc import post_commit, post_merge, post_receive, post_update, \
+    vc_head
+
+
+HOOKS = {'post_commit': post_commit,
+         'post_merge': post_merge,
+         'post_receive': post_receive}
+
+DEFAULTS = {
+    'YAWT_HOOKS_SOCKET': 'hooks.sock',
+    'YAWT_HOOKS_DELAY': 1.0,
+    'YAWT_HOOKS_CLIENT_TIMEOUT': 2.0,
+}
+
+
+def _site_config(repo_path):
+    """Just the site's config.py, without the cost of building the app"""
+    config = Config(repo_path, dict(DEFAULTS,
+                                    YAWT_STATE_FOLDER=yawt.YAWT_STATE_FOLDER))
+    config.from_pyfile('config.py', silent=True)
+    return config
+
+
+def hooks_socket_path(repo_path, config):
+    """Where the server for the site at repo_path, with config, listens"""
+    return os.path.join(repo_path, config['YAWT_STATE_FOLDER'],
+                        config['YAWT_HOOKS_SOCKET'])
+
+
+def notify_hook(repo_path, hook, *args, path=None, timeout=None):
+    """Tell the hook server for the site at repo_path that hook has run,
+    with args.  Returns False if the notification couldn't be sent, because
+    there is no server listening or it couldn't be reached within timeout
+    seconds (YAWT_HOOKS_CLIENT_TIMEOUT by default), in which case it's up to
+    the caller to process the hook itself.  Once sent, the server will get
+    to it, so a server too busy to answer still counts."""
+    if path is None or timeout is None:
+        config = _site_config(repo_path)
+        path = path or hooks_socket_path(repo_path, config)
+        if timeout is None:
+            timeout = config['YAWT_HOOKS_CLIENT_TIMEOUT']
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+        sock.sendall((' '.join((hook,) + args) + '\n').encode('utf-8'))
+    except (socket.error, socket.timeout):
+        sock.close()
+        return False
+    try:
+        sock.recv(64)
+    except (socket.error, socket.timeout):
+        pass
+    finally:
+        sock.close()
+    return True
+
+
+def run_hook(repo_path, hook, *args, path=None):
+    """Hand hook (and its args) over to the hook server, or process it right
+    here if the server can't be reached.  This is what the hook scripts
+    call."""
+    if not notify_hook(repo_path, hook, *args, path=path):
+        run_in_context(repo_path, _process_hook, repo_path, hook, args)
+
+
+def _process_hook(repo_path, hook, args):
+    HOOKS[hook](repo_path, *args, app=current_app._get_current_object())
+
+
+class HookServer(object):
+    """Listens on socket_path for hook notifications and processes them in the
+    supplied app"""
+    def __init__(self, app, socket_path, delay):
+        self.app = app
+        self.socket_path = socket_path
+        self.delay = delay
+        self.last_head = None
+        self.running = False
+
+    def serve(self):
+        """Serve until told to stop"""
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            self.last_head = _current_head()
+
+        sock = self._bind()
+        self.running = True
+        pending = []
+        try:
+            while self.running:
+                sock.settimeout(self.delay if pending else None)
+                try:
+                    conn, _ = sock.accept()
+                except socket.timeout:
+                    self._process(pending)
+                    pending = []
+                    continue
+                message = self._receive(conn)
+                if message and message[0] == 'stop':
+                    self.running = False
+                elif message and message[0] in HOOKS:
+                    pending.append(message)
+            if pending:
+                self._process(pending)
+        finally:
+            sock.close()
+            os.remove(self.socket_path)
+
+    def _bind(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        ensure_path(os.path.dirname(self.socket_path))
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        sock.listen(16)
+        return sock
+
+    @staticmethod
+    def _receive(conn):
+        try:
+            conn.settimeout(1.0)
+            message = conn.makefile('r').readline().split()
+            conn.sendall(b'queued\n')
+            return message
+        except socket.error:
+            return None
+        finally:
+            conn.close()
+
+    def _process(self, pending):
+        with self.app.test_request_context():
+            self.app.preprocess_request()
+            try:
+                self._process_in_context(pending)
+            except Exception:  # pylint: disable=broad-except
+                self.app.logger.exception('failed to process hooks %s',
+                                          pending)
+
+    def _process_in_context(self, pending):
+        root_dir = self.app.yawt_root_dir
+        if self.last_head is None:
+            # we don't know where we started from, so each hook works out
+            # its own change, and the queue hands the plugins their net
+            # effect
+            with ChangeQueue():
+                for message in pending:
+                    HOOKS[message[0]](root_dir, *message[1:], app=self.app)
+            self.last_head = _current_head()
+            return
+
+        head = vc_head()
+        if head != self.last_head:
+            post_update(root_dir, self.last_head, head, self.app)
+            self.last_head = head
+
+
+def _current_head():
+    try:
+        return vc_head()
+    except Exception:  # pylint: disable=broad-except
+        # e.g. a repo without any commits yet
+        return None
+
+
+class ServeHooks(Command):
+    """serve-hooks command"""
+    def __init__(self):
+        super(ServeHooks, self).__init__()
+
+    def get_options(self):
+        return [Option('--socket', '-s', dest='socket_path'),
+                Option('--delay', '-d', type=float)]
+
+    def run(self, socket_path=None, delay=None):
+        current_app.preprocess_request()
+        socket_path = socket_path or \
+            hooks_socket_path(current_app.yawt_root_dir, current_app.config)
+        if delay is None:
+            delay = cfg('YAWT_HOOKS_DELAY')
+        server = HookServer(current_app._get_current_object(),
+                            socket_path, delay)
+        server.serve()
+
+
+class YawtHookServer(Plugin):
+    """Hook server extension, processing vc hooks in a resident process"""
+    def __init__(self, app=None):
+        super(YawtHookServer, self).__init__(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+
+    def on_cli_init(self, manager):
+        """add the serve-hooks command to the CLI manager"""
+        manager.add_command('serve-hooks', ServeHooks())
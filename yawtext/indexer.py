@@ -3,8 +3,6 @@
 The goal here is to index each article using Whoosh and the configured fields.
 The indexing itself is done via the walk phase and the on_files_changed phase.
 """
-from whoosh.fields import TEXT
-
 from yawt.utils import cfg
 from yawtext import Plugin, ArticleProcessor
 
@@ -20,8 +18,20 @@ class YawtIndexer(Plugin, ArticleProcessor):
         """Set up default config values.  By default we index content"""
         app.config.setdefault('YAWT_INDEXER_IFC', 'yawtext.whoosh')
         app.config.setdefault('YAWT_INDEXER_WHOOSH_INFO_FIELDS', {})
-        app.config.setdefault('YAWT_INDEXER_WHOOSH_FIELDS',
-                              {'content': TEXT()})
+        app.config.setdefault('YAWT_INDEXER_WHOOSH_SNIPPET_FIELD', 'content')
+        app.config.setdefault('YAWT_INDEXER_WHOOSH_SNIPPET_FRAGMENTS', 3)
+        # for yawtext.whooshshards
+        app.config.setdefault('YAWT_INDEXER_SHARDS', None)
+        app.config.setdefault('YAWT_INDEXER_SHARD_WORKERS', None)
+        app.config.setdefault('YAWT_INDEXER_SHARD_BATCH', 1000)
+        # for yawtext.sqlite
+        app.config.setdefault('YAWT_INDEXER_SQLITE_FILE', 'index.sqlite')
+        app.config.setdefault('YAWT_INDEXER_SQLITE_DATE_FIELDS',
+                              ['create_time', 'modified_time'])
+        app.config.setdefault('YAWT_INDEXER_SQLITE_SNIPPET_TOKENS', 16)
+        # None means yawtext.whoosh's default, an unstored content field; it's
+        # built there so that creating the app doesn't have to import whoosh
+        app.config.setdefault('YAWT_INDEXER_WHOOSH_FIELDS', None)
 
     def on_new_site(self, files):
         """Set up the index when we crate a new site"""
@@ -38,6 +48,10 @@ class YawtIndexer(Plugin, ArticleProcessor):
     def unvisit(self, name):
         remove_article(name)
 
+    def on_walk_flush(self):
+        """Commit what's been indexed so far, to free up memory"""
+        flush()
+
     def on_post_walk(self):
         """Commit the index"""
         commit()
@@ -77,6 +91,17 @@ def commit():
     return _run_indexer_func("commit")
 
 
+def flush():
+    """Commit the index changes made so far, carrying on with further changes
+    afterwards"""
+    return _run_indexer_func("flush")
+
+
+def generation():
+    """Return a value which changes whenever index changes are committed"""
+    return _run_indexer_func("generation")
+
+
 def _run_indexer_func(funcname, *args, **kwargs):
     temp = __import__(cfg('YAWT_INDEXER_IFC'),
                       globals(), locals(), [funcname])
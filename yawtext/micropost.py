@@ -1,11 +1,12 @@
 import os
 
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from flask import g, current_app
 from flask_script import Command, Option
 
-from yawt.utils import ensure_path, cfg, content_folder
+from yawt.utils import ensure_path, cfg, content_folder, ReprMixin
 from yawtext import Plugin
 from yawtext.facebook import post_fb
 from yawtext.twitter import post_twitter
@@ -26,20 +27,57 @@ def _extract_tags(post):
                   if tag.startswith('#') and len(tag) > 1]))
 
 
+def post_network(network, post, link=None):
+    """Post the supplied post to a single social network, returning the
+    metadata describing where it ended up"""
+    if network == 'facebook':
+        return post_fb(post, link)
+    elif network == 'twitter':
+        return post_twitter(post)
+    return {}
+
+
+def in_app_context(app, func, *args):
+    """Call func in an app context for app.  Handy for running things which
+    need the config in another thread"""
+    with app.app_context():
+        return func(*args)
+
+
 def post_social(post, networks=None, link=None):
     """Post the supplied post to the supplied social networks.  If none are
-    supplied, use the YAWT_MICROPOST_NETWORKS configuration
+    supplied, use the YAWT_MICROPOST_NETWORKS configuration.  The networks
+    are posted to concurrently.
     """
     networks = networks or current_app.config['YAWT_MICROPOST_NETWORKS']
+    app = current_app._get_current_object()
     metadata = {}
-    for network in networks:
-        if network == 'facebook':
-            metadata.update(post_fb(post, link))
-        elif network == 'twitter':
-            metadata.update(post_twitter(post))
+    posted = []
+    errors = {}
+    with ThreadPoolExecutor(max(len(networks), 1)) as executor:
+        futures = [executor.submit(in_app_context, app, post_network,
+                                   network, post, link)
+                   for network in networks]
+        for network, future in zip(networks, futures):
+            try:
+                metadata.update(future.result())
+                posted.append(network)
+            except Exception as exc:  # pylint: disable=broad-except
+                errors[network] = exc
+    if errors:
+        raise SocialPostError(posted, errors)
     return metadata
 
 
+class SocialPostError(Exception, ReprMixin):
+    """Raised when posting to some of the networks failed.  posted lists the
+    networks which were posted to anyway."""
+    def __init__(self, posted, errors):
+        super(SocialPostError, self).__init__(errors)
+        self.posted = posted
+        self.errors = errors
+
+
 def _post_and_save(post, networks, link):
     metadata = post_social(post, networks, link)
     now = datetime.datetime.utcnow()
@@ -89,6 +127,8 @@ class YawtMicropost(Plugin):
         app.config.setdefault('YAWT_MICROPOST_NETWORKS', ['twitter'])
         app.config.setdefault('YAWT_MICROPOST_FB_ACCESS_TOKEN_FILE',
                               '~/.fbaccesstoken')
+        app.config.setdefault('YAWT_MICROPOST_FB_GRAPH_URL',
+                              'https://graph.facebook.com')
         app.config.setdefault('YAWT_MICROPOST_FB_POST_URL',
                               'http://www.facebook.com/desmond.rivet/posts/{0}')
         app.config.setdefault('YAWT_MICROPOST_TWITTER_CREDENTIALS_FILE',
@@ -3,11 +3,13 @@
 This plugin will read a markdown file and a) convert the content to HTML
 and b) convert the metadata to article attributes.
 """
-import markdown
 from flask import Markup, current_app
 
+from yawt.utils import lazy_import
 from yawtext import Plugin
 
+markdown = lazy_import('markdown')
+
 
 def _load_markdown(file_contents):
     extensions = current_app.config['YAWT_MULTIMARKDOWN_EXTENSIONS']
@@ -1,9 +1,11 @@
 import os.path
 import socket
 
-from yawt.utils import fullname, cfg, content_folder
+from yawt.utils import fullname, cfg, content_folder, abs_state_folder, \
+    load_file, ensure_path
 from yawtext import Plugin
-from yawtext.micropost import post_social
+from yawtext.micropost import post_social, SocialPostError
+from yawtext.socialqueue import enqueue_batch, load_queue
 
 
 def _notify_message(file_added):
@@ -13,27 +15,113 @@ def _notify_message(file_added):
     return (link, link)
 
 
-def _post_notification(added):
-    (msg, link) = _notify_message(added)
-    post_social(msg, cfg('YAWT_NOTIFY_NETWORKS'), link)
-#    print "notify with msg = '"+msg + "' and file = "+added
+def _post_notifications(plan):
+    """Deliver the planned notifications (each file going out to its networks
+    concurrently), noting each delivery in the ledger as soon as it's made.
+    A failure doesn't hold up the other files, but is raised once they've
+    been dealt with."""
+    failure = None
+    for added, networks in plan:
+        (msg, link) = _notify_message(added)
+        try:
+            post_social(msg, networks, link)
+            posted = networks
+        except SocialPostError as exc:
+            posted = exc.posted
+            failure = failure or exc
+        except Exception as exc:  # pylint: disable=broad-except
+            posted = []
+            failure = failure or exc
+        _add_to_ledger(_delivery_id(added, network) for network in posted)
+    if failure is not None:
+        raise failure
+
+
+def _enqueue_notifications(plan):
+    posts = []
+    for added, networks in plan:
+        (msg, link) = _notify_message(added)
+        posts.append((msg, networks, link, added))
+    # don't hold up the other plugins waiting on the networks.  The ledger is
+    # written as the drainer delivers them.
+    enqueue_batch(posts)
+
+
+def _ledger_file():
+    return os.path.join(abs_state_folder(), cfg('YAWT_NOTIFY_LEDGER_FILE'))
+
+
+def _load_ledger():
+    filename = _ledger_file()
+    if not os.path.exists(filename):
+        return set()
+    return set(line for line in load_file(filename).split('\n') if line)
+
+
+def _add_to_ledger(delivery_ids):
+    """Append the delivery ids to the ledger, one per line.  The hooks and
+    the social queue's drainer can both be writing it, so it's done in a
+    single append, which can't lose anybody else's."""
+    lines = ''.join(delivery_id + '\n'
+                    for delivery_id in sorted(set(delivery_ids)))
+    if lines:
+        filename = _ledger_file()
+        ensure_path(os.path.dirname(filename))
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, lines.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+
+def _delivery_id(repofile, network):
+    return network + ':' + repofile
+
+
+def _queued_deliveries():
+    """The deliveries waiting on the social queue"""
+    return set(_delivery_id(job['source'], job['network'])
+               for job in load_queue()['jobs'] if job.get('source'))
+
+
+def plan_notifications(changed, done=frozenset()):
+    """Work out which new files need announcing on which networks.  Returns a
+    list of (repofile, networks) pairs, with each file listed once however
+    many of the notify categories it falls under, and leaving out the
+    deliveries in done (i.e. made already, according to the ledger)."""
+    cat_paths = [os.path.join(content_folder(), cat)
+                 for cat in cfg('YAWT_NOTIFY_CATEGORIES')]
+    plan = []
+    for added in changed.content_changes().added:
+        if not any(added.startswith(cpath) for cpath in cat_paths):
+            continue
+        networks = [network for network in cfg('YAWT_NOTIFY_NETWORKS')
+                    if _delivery_id(added, network) not in done]
+        if networks:
+            plan.append((added, networks))
+    return plan
 
 
 def notify_new_files(changed):
-    """Sends out a notification about new blog files to social networks"""
+    """Sends out a notification about new blog files to social networks.  Each
+    file is announced at most once on each network, even if the same change
+    is processed again."""
 
     if cfg('YAWT_NOTIFY_HOSTS') and \
        socket.gethostname() not in cfg('YAWT_NOTIFY_HOSTS'):
         return
 
-    cat_paths = []
-    for cat in cfg('YAWT_NOTIFY_CATEGORIES'):
-        cat_paths.append(os.path.join(content_folder(), cat))
-
-    for added in changed.content_changes().added:
-        for cpath in cat_paths:
-            if added.startswith(cpath):
-                _post_notification(added)
+    done = _load_ledger()
+    if cfg('YAWT_NOTIFY_QUEUE'):
+        # don't queue up what's already queued up
+        done |= _queued_deliveries()
+    plan = plan_notifications(changed, done)
+    if not plan:
+        return
+    if cfg('YAWT_NOTIFY_QUEUE'):
+        _enqueue_notifications(plan)
+    else:
+        _post_notifications(plan)
 
 
 class YawtNotify(Plugin):
@@ -46,8 +134,15 @@ class YawtNotify(Plugin):
         app.config.setdefault('YAWT_NOTIFY_BASE_URL', '')
         app.config.setdefault('YAWT_NOTIFY_NETWORKS', ['facebook'])
         app.config.setdefault('YAWT_NOTIFY_HOSTS', [])
+        app.config.setdefault('YAWT_NOTIFY_QUEUE', True)
+        app.config.setdefault('YAWT_NOTIFY_LEDGER_FILE', 'notified')
         app.config.setdefault('YAWT_NOTIFY_FB_ACCESS_TOKEN_FILE',
                               '~/.fbaccesstoken')
 
     def on_files_changed(self, changed):
         notify_new_files(changed)
+
+    def on_social_delivered(self, jobs):
+        """Note the queued notifications the social queue has delivered"""
+        _add_to_ledger(_delivery_id(job['source'], job['network'])
+                       for job in jobs if job.get('source'))
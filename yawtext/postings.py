@@ -0,0 +1,164 @@
+"""YAWT posting list extension
+
+Maintains, for every category and every (tag, category) pair, a list of
+articles pre-sorted by the configured collection sort field.  Collection views
+can then serve any page of a category or tag listing by slicing the list,
+rather than asking the indexer to sort the full result set on every request.
+
+The lists are kept as jsonpickle'd summary files in the _state folder, one for
+each of the roots configured in YAWT_POSTINGS_BASE, and are maintained during
+the walk and on_files_changed phases.
+"""
+import os
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from yawt.utils import cfg, ReprMixin, EqMixin
+from yawtext import SummaryProcessor, BranchedVisitor, load_summary
+
+
+def _ancestors(category):
+    categories = [category]
+    while category:
+        category = category.rsplit('/', 1)[0] if '/' in category else ''
+        categories.append(category)
+    return categories
+
+
+def _sort_key(info):
+    """Return the key to sort info by.  Dates are turned into seconds since
+    the epoch, so that they compare with the 0 used for articles without
+    one."""
+    sortfield = cfg('YAWT_COLLECTIONS_SORT_FIELD')
+    if not sortfield:
+        return 0
+    value = getattr(info, sortfield, None)
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return int(time.mktime(value.timetuple()))
+        return int(value.timestamp())
+    return value
+
+
+def _remove(lists, key, entry):
+    postings = lists.get(key, [])
+    i = bisect_left(postings, entry)
+    if i < len(postings) and postings[i] == entry:
+        del postings[i]
+    if not postings and key in lists:
+        del lists[key]
+
+
+def _page(postings, page, pagelen, reverse):
+    total = len(postings)
+    page = max(page, 1)
+    if reverse:
+        end = max(total - (page - 1) * pagelen, 0)
+        start = max(end - pagelen, 0)
+        return list(reversed(postings[start:end]))
+    else:
+        start = (page - 1) * pagelen
+        return postings[start:start + pagelen]
+
+
+class PostingLists(ReprMixin, EqMixin):
+    """Sorted posting lists for categories and tags.  Each list holds
+    [sortkey, fullname] pairs in ascending order.  Lists are keyed by every
+    ancestor category of the article (including '', the root), so that a
+    category listing includes the articles of its subcategories."""
+    def __init__(self, **kwargs):
+        self.entries = kwargs.get('entries', {})
+        self.categories = kwargs.get('categories', {})
+        self.tags = kwargs.get('tags', {})
+
+    def add(self, info, key):
+        """Add the article info to the posting lists, under the supplied sort
+        key.  An existing entry for the same article is replaced."""
+        self.remove(info.fullname)
+        entry = [key, info.fullname]
+        self.entries[info.fullname] = [key, info]
+        for category in _ancestors(info.category):
+            insort(self.categories.setdefault(category, []), entry)
+            for tag in getattr(info, 'tags', None) or []:
+                tagged = self.tags.setdefault(tag, {})
+                insort(tagged.setdefault(category, []), entry)
+
+    def remove(self, fullname):
+        """Remove the article from all posting lists"""
+        if fullname not in self.entries:
+            return
+        key, info = self.entries.pop(fullname)
+        entry = [key, fullname]
+        for category in _ancestors(info.category):
+            _remove(self.categories, category, entry)
+            for tag in getattr(info, 'tags', None) or []:
+                _remove(self.tags.get(tag, {}), category, entry)
+                if tag in self.tags and not self.tags[tag]:
+                    del self.tags[tag]
+
+    def page(self, category, tag, page, pagelen, reverse=False):
+        """Return a tuple of the article infos on the requested page of the
+        category (or tag in category) listing and the total length of the
+        listing"""
+        if tag:
+            postings = self.tags.get(tag, {}).get(category, [])
+        else:
+            postings = self.categories.get(category, [])
+        infos = [self.entries[fullname][1] for _, fullname
+                 in _page(postings, page, pagelen, reverse)]
+        return infos, len(postings)
+
+
+class PostingsProcessor(SummaryProcessor):
+    """Subclass of SummaryProcessor which maintains the posting lists for
+    articles under a root"""
+    def __init__(self, root=''):
+        super(PostingsProcessor, self).__init__(root, '',
+                                                cfg('YAWT_POSTINGS_FILE'))
+
+    def _init_summary(self):
+        self.summary = PostingLists()
+
+    def on_visit_article(self, article):
+        self.summary.add(article.info, _sort_key(article.info))
+
+    def unvisit(self, name):
+        self.summary.remove(name)
+
+
+class YawtPostings(BranchedVisitor):
+    """The YAWT posting lists plugin"""
+    def __init__(self, app=None):
+        super(YawtPostings, self).__init__('YAWT_POSTINGS_BASE',
+                                           PostingsProcessor,
+                                           app)
+
+    def init_app(self, app):
+        """set some default config"""
+        app.config.setdefault('YAWT_POSTINGS_BASE', [''])
+        app.config.setdefault('YAWT_POSTINGS_FILE', 'postings')
+
+
+def _find_base(category):
+    longest_base = None
+    for base in cfg('YAWT_POSTINGS_BASE') or ['']:
+        if (not base or category == base or category.startswith(base + '/')) \
+           and (longest_base is None or len(base) > len(longest_base)):
+            longest_base = base
+    return longest_base
+
+
+def page_postings(category, tag, page, pagelen, reverse=False):
+    """Return a page of article infos from the precomputed posting lists, along
+    with the total listing length.  Returns None if no posting lists cover the
+    category."""
+    base = _find_base(category)
+    if base is None:
+        return None
+    postings = load_summary(os.path.join(base, cfg('YAWT_POSTINGS_FILE')))
+    if postings is None:
+        return None
+    return postings.page(category, tag, page, pagelen, reverse)
@@ -1,16 +1,104 @@
 """The YAWT Search plugin.
 
 Implements full text search using Whoosh.
+
+Search results are cached (YAWT_SEARCH_CACHE_SIZE pages of them), keyed by
+the query, category, page, page length and sort field, and thrown away as
+soon as the index is committed.
+
+Searches can also be limited, so that a burst of them can't tie up every
+worker, though this is off by default.  Set YAWT_SEARCH_CLIENT_LIMIT to cap
+the searches any one client may have on the go at once, and
+YAWT_SEARCH_LIMIT to cap them overall; searches over the limit get a 429.
+Cached results don't count against the limits.  Clients are told apart by
+request.remote_addr, so behind a reverse proxy set YAWT_SEARCH_CLIENT_KEY to
+a function of the request returning something better (e.g. from
+X-Forwarded-For).  The counts are per process, so under a preforking server
+the limits apply to each worker separately.
+
+The YawtSearchSuggestions plugin adds a search-as-you-type endpoint,
+/search/suggest?q=..., returning JSON title and tag completions.  They're
+looked up in a sorted array, built during the walk and kept up to date as
+files change, without going near the search index.
 """
-from flask import current_app, request, g, Blueprint
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
 
-from yawtext import Plugin
+from flask import current_app, request, g, Blueprint, abort, jsonify
+
+from yawt.utils import cfg, ReprMixin, EqMixin
+from yawtext import Plugin, SummaryProcessor, load_summary
 from yawtext.collections import CollectionView
+from yawtext.indexer import generation
 
 
 searchbp = Blueprint('search', __name__)
 
 
+def _normalize(searchtext):
+    return ' '.join(searchtext.split())
+
+
+class SearchCache(object):
+    """LRU cache of search result pages, for one generation of the index"""
+    def __init__(self, size):
+        self.size = size
+        self.generation = None
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, gen, key):
+        """Return the cached results for key, or None"""
+        with self.lock:
+            if gen != self.generation:
+                return None
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+            return result
+
+    def put(self, gen, key, result):
+        """Cache result under key, for index generation gen"""
+        if self.size <= 0:
+            return
+        with self.lock:
+            if gen != self.generation:
+                self.results.clear()
+                self.generation = gen
+            self.results[key] = result
+            while len(self.results) > self.size:
+                self.results.popitem(last=False)
+
+
+class SearchLimiter(object):
+    """Keeps count of the searches on the go, overall and per client"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = 0
+        self.clients = {}
+
+    def acquire(self, client, client_limit, limit):
+        """Count a search for client, returning False if that would take it,
+        or everybody, over the limits"""
+        with self.lock:
+            busy = self.clients.get(client, 0)
+            if (client_limit and busy >= client_limit) or \
+               (limit and self.total >= limit):
+                return False
+            self.clients[client] = busy + 1
+            self.total += 1
+            return True
+
+    def release(self, client):
+        """A search for client is done"""
+        with self.lock:
+            self.total -= 1
+            self.clients[client] -= 1
+            if not self.clients[client]:
+                del self.clients[client]
+
+
 class SearchView(CollectionView):
     """The main SearchView.  Implements a fulltext search on the article
     content
@@ -19,25 +107,65 @@ class SearchView(CollectionView):
     methods = ['GET', 'POST']
 
     def query(self, category, *args, **kwargs):
-        searchtext = request.args.get('searchtext', '')
+        searchtext = _normalize(request.args.get('searchtext', ''))
         query_str = 'content:' + searchtext
         if category:
             query_str += ' AND ' + category
         return query_str
 
+    def fetch_infos(self, category, *args, **kwargs):
+        plugin = _search_plugin()
+        gen = generation()
+        key = (self.query(category, *args, **kwargs), category, g.page,
+               g.pagelen, current_app.config['YAWT_COLLECTIONS_SORT_FIELD'])
+        result = plugin.cache.get(gen, key)
+        if result is not None:
+            return result
+
+        client_limit = current_app.config['YAWT_SEARCH_CLIENT_LIMIT']
+        limit = current_app.config['YAWT_SEARCH_LIMIT']
+        if not client_limit and not limit:
+            result = super(SearchView, self).fetch_infos(category,
+                                                         *args, **kwargs)
+            plugin.cache.put(gen, key, result)
+            return result
+
+        client_key = current_app.config['YAWT_SEARCH_CLIENT_KEY']
+        client = client_key(request) if client_key else request.remote_addr
+        if not plugin.limiter.acquire(client, client_limit, limit):
+            abort(429)
+        try:
+            result = super(SearchView, self).fetch_infos(category,
+                                                         *args, **kwargs)
+        finally:
+            plugin.limiter.release(client)
+        plugin.cache.put(gen, key, result)
+        return result
+
     def get_template_name(self):
         return current_app.config['YAWT_SEARCH_TEMPLATE']
 
 
+def _search_plugin():
+    return current_app.extension_info[0]['yawtext.search.YawtSearch']
+
+
 class YawtSearch(Plugin):
     """The actual YAWT search plugin class"""
 
     def __init__(self, app=None):
+        self.cache = None
+        self.limiter = SearchLimiter()
         super(YawtSearch, self).__init__(app)
 
     def init_app(self, app):
         """Set some config default and register blueprint"""
         app.config.setdefault('YAWT_SEARCH_TEMPLATE', 'article_list')
+        app.config.setdefault('YAWT_SEARCH_CACHE_SIZE', 256)
+        app.config.setdefault('YAWT_SEARCH_CLIENT_LIMIT', None)
+        app.config.setdefault('YAWT_SEARCH_LIMIT', None)
+        app.config.setdefault('YAWT_SEARCH_CLIENT_KEY', None)
+        self.cache = SearchCache(app.config['YAWT_SEARCH_CACHE_SIZE'])
         app.register_blueprint(searchbp)
 
 
@@ -49,6 +177,135 @@ def _collection_title():
     return {'collection_title': title}
 
 
+# Search suggestions
+
+
+suggestbp = Blueprint('search_suggest', __name__)
+
+
+class Suggestions(ReprMixin, EqMixin):
+    """The titles and tags to complete searches with.  The completions live
+    in a sorted array of [key, text, kind, fullname] entries (fullname is
+    None for tags), with the lower cased keys in a parallel array to bisect.
+    Titles get an entry for each word in them, so that "cur" turns up "Goan
+    Fish Curry".
+    """
+    def __init__(self, **kwargs):
+        self.titles = kwargs.get('titles', {})
+        self.article_tags = kwargs.get('article_tags', {})
+        self.entries = kwargs.get('entries', [])
+        self.keys = kwargs.get('keys', [])
+
+    def add(self, name, title, tags):
+        """Add the title and tags for the article at name"""
+        if title:
+            self.titles[name] = str(title)
+        if tags:
+            self.article_tags[name] = list(tags)
+
+    def remove(self, name):
+        """Remove the title and tags for the article at name"""
+        self.titles.pop(name, None)
+        self.article_tags.pop(name, None)
+
+    def build(self):
+        """Rebuild the sorted array after adding and removing articles"""
+        entries = set()
+        for name, title in self.titles.items():
+            words = title.split()
+            for i in range(len(words)):
+                key = ' '.join(words[i:]).lower()
+                entries.add((key, title, 'title', name))
+        for tags in self.article_tags.values():
+            for tag in tags:
+                entries.add((tag.lower(), tag, 'tag', None))
+        self.entries = [list(entry) for entry in
+                        sorted(entries, key=lambda e: (e[0], e[2], e[3] or ''))]
+        self.keys = [entry[0] for entry in self.entries]
+
+    def complete(self, prefix, limit):
+        """Return up to limit (text, kind, fullname) completions for
+        prefix"""
+        prefix = ' '.join(prefix.split()).lower()
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix) and \
+                len(results) < limit:
+            _, text, kind, name = self.entries[i]
+            if (kind, name or text) not in seen:
+                seen.add((kind, name or text))
+                results.append((text, kind, name))
+            i += 1
+        return results
+
+
+class SuggestionProcessor(SummaryProcessor):
+    """Collects the titles and tags of all the articles"""
+    def __init__(self):
+        super(SuggestionProcessor, self).__init__('', '',
+                                                  cfg('YAWT_SEARCH_SUGGEST_FILE'))
+
+    def _init_summary(self):
+        self.summary = Suggestions()
+
+    def on_visit_article(self, article):
+        self.summary.add(article.info.fullname,
+                         getattr(article.info, 'title', None),
+                         getattr(article.info, 'tags', None))
+
+    def unvisit(self, name):
+        self.summary.remove(name)
+
+    def _save_summary(self):
+        self.summary.build()
+        super(SuggestionProcessor, self)._save_summary()
+
+
+class YawtSearchSuggestions(Plugin):
+    """The search suggestions plugin"""
+    def __init__(self, app=None):
+        self.processor = None
+        super(YawtSearchSuggestions, self).__init__(app)
+
+    def init_app(self, app):
+        """Set some config defaults and register the blueprint"""
+        app.config.setdefault('YAWT_SEARCH_SUGGEST_FILE', 'suggestions')
+        app.config.setdefault('YAWT_SEARCH_SUGGEST_LIMIT', 10)
+        app.register_blueprint(suggestbp)
+
+    def on_pre_walk(self):
+        """Start collecting titles and tags afresh"""
+        self.processor = SuggestionProcessor()
+        self.processor.on_pre_walk()
+
+    def on_visit_article(self, article):
+        """Collect the article title and tags"""
+        self.processor.on_visit_article(article)
+
+    def on_post_walk(self):
+        """Build and save the suggestions"""
+        self.processor.on_post_walk()
+
+    def on_files_changed(self, changed):
+        """Bring the suggestions up to date with the changed articles"""
+        SuggestionProcessor().on_files_changed(changed)
+
+
+@suggestbp.route('/search/suggest')
+def _suggest():
+    suggestions = load_summary(cfg('YAWT_SEARCH_SUGGEST_FILE'))
+    completions = []
+    if suggestions is not None:
+        completions = suggestions.complete(request.args.get('q', ''),
+                                           cfg('YAWT_SEARCH_SUGGEST_LIMIT'))
+    return jsonify(suggestions=[{'text': text, 'kind': kind,
+                                 'fullname': name}
+                                for text, kind, name in completions])
+
+
 searchbp.add_url_rule('/search/',
                       view_func=SearchView.as_view('full_text_search'))
 searchbp.add_url_rule('/<path:category>/search/',
@@ -0,0 +1,166 @@
+"""YAWT warm-start snapshot extension
+
+Collects every summary saved under the _state folder (category, tag and
+archive counts, posting lists and so on) into a single pickled snapshot file,
+written at the end of each walk and each round of on_files_changed
+processing.  The snapshot is memory mapped and loaded when the app is
+created, so that a fresh worker can serve summaries and listings straight
+from memory instead of reading and decoding each summary file on first use.
+Workers pick up a newer snapshot on their next request.
+
+Summaries are reported to this plugin as they are saved, so it must come
+*after* every summary producing plugin in YAWT_EXTENSIONS.  Since any plugin
+with an on_post_walk or on_files_changed could be saving summaries, listing
+one of those after this plugin is refused with a SnapshotOrderError.
+
+The full text index is not part of the snapshot; the indexer already keeps it
+on disk in a form it can open cheaply.
+"""
+import mmap
+import os
+import pickle
+import tempfile
+
+from flask import Blueprint, current_app
+
+from yawt.utils import ensure_path, has_method, ReprMixin
+from yawtext import Plugin
+
+
+def load_snapshot(path):
+    """Load the snapshot at path, returning a dictionary of summaries keyed by
+    their path relative to the state folder.  Returns None if there is no
+    snapshot."""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return pickle.loads(buf)
+            finally:
+                buf.close()
+    except IOError:
+        return None
+
+
+def save_snapshot(path, summaries):
+    """Atomically replace the snapshot at path with the supplied summaries, so
+    that concurrent readers never see a partially written file"""
+    folder = os.path.dirname(path)
+    ensure_path(folder)
+    # a temp file of our own, so that two processes snapshotting at once
+    # can't write over each other's before the rename
+    with tempfile.NamedTemporaryFile(dir=folder, prefix='.snapshot',
+                                     delete=False) as f:
+        pickle.dump(summaries, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, path)
+
+
+class Snapshot(object):
+    """In memory copy of the snapshot file, reloaded when the file changes"""
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+        self.summaries = {}
+
+    def refresh(self):
+        """Reload the snapshot if the file has changed since we last loaded
+        it"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            self.mtime = None
+            self.summaries = {}
+            return
+        if mtime != self.mtime:
+            self.summaries = load_snapshot(self.path) or {}
+            self.mtime = mtime
+
+    def get(self, relpath):
+        """Return the summary saved at relpath, or None"""
+        return self.summaries.get(os.path.normpath(relpath))
+
+
+snapshotbp = Blueprint('snapshot', __name__)
+
+
+@snapshotbp.before_app_request
+def _before_request():
+    _snapshot_plugin().snapshot.refresh()
+
+
+def _snapshot_plugin():
+    return current_app.extension_info[0]['yawtext.snapshot.YawtSnapshot']
+
+
+class YawtSnapshot(Plugin):
+    """The YAWT snapshot plugin"""
+    def __init__(self, app=None):
+        self.snapshot = None
+        self.saved = {}
+        self.walking = False
+        super(YawtSnapshot, self).__init__(app)
+
+    def init_app(self, app):
+        """Set up the default config and load the snapshot, if there is
+        one"""
+        app.config.setdefault('YAWT_SNAPSHOT_FILE', 'snapshot')
+        path = os.path.join(app.yawt_root_dir,
+                            app.config['YAWT_STATE_FOLDER'],
+                            app.config['YAWT_SNAPSHOT_FILE'])
+        self.snapshot = Snapshot(path)
+        self.snapshot.refresh()
+        app.register_blueprint(snapshotbp)
+        self._check_order(app)
+
+    def _check_order(self, app):
+        """Make sure no plugin which might save summaries comes after us"""
+        extensions = getattr(app, 'extension_info', None)
+        if not extensions or self not in extensions[1]:
+            return
+        later = extensions[1][extensions[1].index(self) + 1:]
+        for ext in later:
+            if has_method(ext, 'on_post_walk') or \
+               has_method(ext, 'on_files_changed'):
+                raise SnapshotOrderError(type(ext).__name__)
+
+    def get(self, relpath):
+        """Return the summary saved at relpath, or None"""
+        return self.snapshot.get(relpath)
+
+    def on_summary_saved(self, relpath, summary):
+        """Remember the summary, for the next snapshot"""
+        self.saved[os.path.normpath(relpath)] = summary
+
+    def on_pre_walk(self):
+        """A walk regenerates every summary, so start from scratch"""
+        self.saved = {}
+        self.walking = True
+
+    def on_post_walk(self):
+        """Write the snapshot"""
+        self._write()
+
+    def on_files_changed(self, changed):
+        """Write the snapshot, merging the summaries changed this time into
+        the existing ones"""
+        self._write()
+
+    def _write(self):
+        summaries = {}
+        if not self.walking:
+            summaries.update(load_snapshot(self.snapshot.path) or {})
+        summaries.update(self.saved)
+        save_snapshot(self.snapshot.path, summaries)
+        self.saved = {}
+        self.walking = False
+        self.snapshot.refresh()
+
+
+class SnapshotOrderError(Exception, ReprMixin):
+    """Raised when a plugin which might save summaries is listed after the
+    snapshot plugin in YAWT_EXTENSIONS"""
+    def __init__(self, plugin):
+        super(SnapshotOrderError, self).__init__()
+        self.plugin = plugin
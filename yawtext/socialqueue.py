@@ -0,0 +1,251 @@
+"""A persistent queue of social network posts
+
+Posting to Facebook or Twitter from inside a version control hook means a
+slow (or down) API holds up everything else the hook does.  Instead, posts
+can be put on a queue kept in the state folder, and delivered later, several
+at a time, by a drainer.  A post which fails is retried with exponential
+backoff, and set aside once it has failed YAWT_SOCIAL_QUEUE_RETRIES times.
+
+By default, enqueueing posts starts a drainer in a separate process, so the
+caller never waits on the network.  The drain-social command (from
+YawtSocialQueue) drains the queue by hand, e.g. from cron.
+"""
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from flask import current_app
+from flask_script import Command, Option
+
+from yawt.utils import abs_state_folder, ensure_path, load_file, save_file, \
+    run_in_context, call_plugins
+from yawtext import Plugin
+from yawtext.micropost import post_network, in_app_context
+
+
+DEFAULTS = {
+    'YAWT_SOCIAL_QUEUE_FILE': 'socialqueue',
+    'YAWT_SOCIAL_QUEUE_WORKERS': 4,
+    'YAWT_SOCIAL_QUEUE_RETRIES': 5,
+    'YAWT_SOCIAL_QUEUE_BACKOFF': 30,
+    'YAWT_SOCIAL_QUEUE_MAX_BACKOFF': 3600,
+    'YAWT_SOCIAL_QUEUE_MAX_WAIT': 120,
+    'YAWT_SOCIAL_QUEUE_AUTODRAIN': True,
+}
+
+
+def _cfg(key):
+    # the queue is also used by plugins which don't load YawtSocialQueue
+    return current_app.config.get(key, DEFAULTS[key])
+
+
+def _queue_file():
+    return os.path.join(abs_state_folder(), _cfg('YAWT_SOCIAL_QUEUE_FILE'))
+
+
+@contextmanager
+def _locked(suffix, blocking=True):
+    """Hold an exclusive lock on the queue's suffix lock file.  Yields False
+    if we didn't block and someone else has it."""
+    lockfile = _queue_file() + suffix
+    ensure_path(os.path.dirname(lockfile))
+    with open(lockfile, 'a') as lockf:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lockf, flags)
+        except (IOError, OSError):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lockf, fcntl.LOCK_UN)
+
+
+def load_queue():
+    """Return the queue, as a dict of pending jobs and failed jobs"""
+    filename = _queue_file()
+    if not os.path.exists(filename):
+        return {'jobs': [], 'failed': []}
+    return json.loads(load_file(filename))
+
+
+def _save_queue(queue):
+    filename = _queue_file()
+    save_file(filename + '.tmp', json.dumps(queue))
+    os.rename(filename + '.tmp', filename)
+
+
+def enqueue(post, networks, link=None, drain=None, source=None):
+    """Queue up post to be sent to each of networks, and return straight
+    away.  Unless drain is False (or drain is None and
+    YAWT_SOCIAL_QUEUE_AUTODRAIN is off), a drainer is started in the
+    background to deliver it.  source (e.g. the file being announced) is
+    kept with the job, and handed to the on_social_delivered plugins once
+    it's delivered."""
+    enqueue_batch([(post, networks, link, source)], drain)
+
+
+def enqueue_batch(posts, drain=None):
+    """Like enqueue, but for a list of (post, networks, link, source)
+    tuples, all queued up in one go"""
+    with _locked('.lock'):
+        queue = load_queue()
+        for post, networks, link, source in posts:
+            for network in networks:
+                queue['jobs'].append({'id': uuid.uuid4().hex,
+                                      'network': network,
+                                      'post': post,
+                                      'link': link,
+                                      'source': source,
+                                      'attempts': 0,
+                                      'next_try': 0,
+                                      'error': None})
+        _save_queue(queue)
+    if drain is None:
+        drain = autodrain()
+    if drain:
+        spawn_drainer()
+
+
+def autodrain():
+    """True if enqueueing should start a drainer"""
+    return _cfg('YAWT_SOCIAL_QUEUE_AUTODRAIN')
+
+
+def spawn_drainer():
+    """Drain the queue in a separate, detached, process"""
+    subprocess.Popen([sys.executable, '-m', 'yawtext.socialqueue',
+                      current_app.yawt_root_dir],
+                     stdin=subprocess.DEVNULL,
+                     stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+
+
+def _due_jobs(now):
+    """Return the jobs due now, and how long until the next one is due (None
+    if nothing else is pending)"""
+    with _locked('.lock'):
+        jobs = load_queue()['jobs']
+    due = [job for job in jobs if job['next_try'] <= now]
+    later = [job['next_try'] - now for job in jobs if job['next_try'] > now]
+    return due, min(later) if later else None
+
+
+def _deliver(app, job):
+    try:
+        in_app_context(app, post_network, job['network'], job['post'],
+                       job['link'])
+        return None
+    except Exception as exc:  # pylint: disable=broad-except
+        return repr(exc)
+
+
+def _record(results, now):
+    """Take the delivered jobs off the queue, and reschedule the failures.
+    The on_social_delivered plugins hear about the delivered jobs before
+    the queue is let go of."""
+    with _locked('.lock'):
+        queue = load_queue()
+        jobs = []
+        delivered = []
+        for job in queue['jobs']:
+            if job['id'] not in results:
+                jobs.append(job)
+                continue
+            error = results[job['id']]
+            if error is None:
+                delivered.append(job)
+                continue
+            job['attempts'] += 1
+            job['error'] = error
+            if job['attempts'] >= _cfg('YAWT_SOCIAL_QUEUE_RETRIES'):
+                queue['failed'].append(job)
+                current_app.logger.error('giving up posting to %s: %s',
+                                         job['network'], error)
+            else:
+                delay = _cfg('YAWT_SOCIAL_QUEUE_BACKOFF') * \
+                    2 ** (job['attempts'] - 1)
+                job['next_try'] = now + min(delay,
+                                            _cfg('YAWT_SOCIAL_QUEUE_MAX_BACKOFF'))
+                jobs.append(job)
+        queue['jobs'] = jobs
+        _save_queue(queue)
+        if delivered:
+            call_plugins('on_social_delivered', delivered)
+
+
+def _drain_once(app, executor):
+    delivered = 0
+    while True:
+        now = time.time()
+        due, wait = _due_jobs(now)
+        if not due:
+            return delivered, wait
+        errors = executor.map(lambda job: _deliver(app, job), due)
+        results = dict(zip([job['id'] for job in due], errors))
+        _record(results, time.time())
+        delivered += len([e for e in results.values() if e is None])
+
+
+def drain_queue(wait=False):
+    """Deliver the queued posts which are due, several at a time, and return
+    how many were delivered.  With wait, hang around for retries which come
+    due within YAWT_SOCIAL_QUEUE_MAX_WAIT seconds.  Does nothing if another
+    drainer is already at work."""
+    app = current_app._get_current_object()
+    delivered = 0
+    with ThreadPoolExecutor(_cfg('YAWT_SOCIAL_QUEUE_WORKERS')) as executor:
+        while True:
+            with _locked('.drain', blocking=False) as got_lock:
+                if not got_lock:
+                    return delivered
+                while True:
+                    count, pause = _drain_once(app, executor)
+                    delivered += count
+                    if not wait or pause is None or \
+                       pause > _cfg('YAWT_SOCIAL_QUEUE_MAX_WAIT'):
+                        break
+                    time.sleep(pause)
+            # something may have been queued up while we were letting go of
+            # the lock, and its drainer would have given up on seeing us
+            if not _due_jobs(time.time())[0]:
+                return delivered
+
+
+class DrainSocial(Command):
+    """drain-social command"""
+    def __init__(self):
+        super(DrainSocial, self).__init__()
+
+    def get_options(self):
+        return [Option('--wait', '-w', action='store_true')]
+
+    def run(self, wait=False):
+        current_app.preprocess_request()
+        print("delivered {0} posts".format(drain_queue(wait)))
+
+
+class YawtSocialQueue(Plugin):
+    """Social queue extension, adding the drain-social command"""
+    def __init__(self, app=None):
+        super(YawtSocialQueue, self).__init__(app)
+
+    def init_app(self, app):
+        for key, value in DEFAULTS.items():
+            app.config.setdefault(key, value)
+
+    def on_cli_init(self, manager):
+        """add the drain-social command to the CLI manager"""
+        manager.add_command('drain-social', DrainSocial())
+
+
+if __name__ == '__main__':
+    run_in_context(sys.argv[1], drain_queue, True)
@@ -0,0 +1,353 @@
+"""A YAWT indexer backend keeping the index in SQLite
+
+Select it with::
+
+    YAWT_INDEXER_IFC = 'yawtext.sqlite'
+
+The index is a single file, YAWT_INDEXER_SQLITE_FILE in the state folder.
+Article content goes in an FTS5 table, and the dates (the info fields in
+YAWT_INDEXER_SQLITE_DATE_FIELDS), categories and tags go in tables with
+B-tree indexes.  The database is in WAL mode, so searches in any number of
+processes don't hold each other, or the indexer, up.  Changes are made in
+one transaction, committed by commit (or flush), so a walk is one bulk
+insert.
+
+Queries are the subset of the whoosh query syntax the YAWT plugins use:
+field:value terms, joined by AND, where a bare value is a category, e.g.
+'tags:curry AND cooking' or 'create_time:201511'.  Dates are matched by
+prefix, so create_time:2015 is anything in 2015.  Words following a
+content: term are searched for too, so 'content:madras curry' is a two
+word search.  Anything else with a colon in it (e.g. 'note:' typed into the
+search box) is taken as content too, rather than as a field.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import jsonpickle
+from flask import g, Markup, escape
+
+from yawt.article import category_chain
+from yawt.utils import abs_state_folder, cfg, ensure_path
+
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS articles
+       (id INTEGER PRIMARY KEY,
+        fullname TEXT NOT NULL UNIQUE,
+        info_json TEXT NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS dates
+       (article_id INTEGER NOT NULL REFERENCES articles(id)
+            ON DELETE CASCADE,
+        field TEXT NOT NULL,
+        value INTEGER NOT NULL)""",
+    """CREATE INDEX IF NOT EXISTS dates_value
+       ON dates (field, value, article_id)""",
+    """CREATE INDEX IF NOT EXISTS dates_article ON dates (article_id)""",
+    """CREATE TABLE IF NOT EXISTS categories
+       (article_id INTEGER NOT NULL REFERENCES articles(id)
+            ON DELETE CASCADE,
+        category TEXT NOT NULL)""",
+    """CREATE INDEX IF NOT EXISTS categories_category
+       ON categories (category, article_id)""",
+    """CREATE INDEX IF NOT EXISTS categories_article
+       ON categories (article_id)""",
+    """CREATE TABLE IF NOT EXISTS tags
+       (article_id INTEGER NOT NULL REFERENCES articles(id)
+            ON DELETE CASCADE,
+        tag TEXT NOT NULL)""",
+    """CREATE INDEX IF NOT EXISTS tags_tag ON tags (tag, article_id)""",
+    """CREATE INDEX IF NOT EXISTS tags_article ON tags (article_id)""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS fulltext USING fts5(content)""",
+    """CREATE TABLE IF NOT EXISTS meta
+       (key TEXT PRIMARY KEY, value INTEGER NOT NULL)""",
+    """INSERT OR IGNORE INTO meta VALUES ('generation', 0)""",
+]
+
+_TABLES = ['fulltext', 'tags', 'categories', 'dates', 'articles', 'meta']
+
+# snippet() marks the matches with these, so that the rest can be escaped
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_READERS = threading.local()
+
+
+# API IMPLEMENTATION
+
+def init_index(clear=False):
+    """Create the index tables, optionally clearing them"""
+    conn = _writer()
+    if clear:
+        for table in _TABLES:
+            conn.execute('DROP TABLE IF EXISTS ' + table)
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    commit()
+
+
+def add_article(article):
+    """Add article to the index, replacing it if it's already there"""
+    info = article.info
+    conn = _writer()
+    _remove(conn, info.fullname)
+    info.indexed = True
+    article_id = conn.execute(
+        'INSERT INTO articles (fullname, info_json) VALUES (?, ?)',
+        (info.fullname, jsonpickle.encode(info))).lastrowid
+    conn.execute('INSERT INTO fulltext (rowid, content) VALUES (?, ?)',
+                 (article_id, article.content or ''))
+    conn.executemany('INSERT INTO dates VALUES (?, ?, ?)',
+                     [(article_id, field, _timestamp(getattr(info, field)))
+                      for field in cfg('YAWT_INDEXER_SQLITE_DATE_FIELDS')
+                      if getattr(info, field, None) is not None])
+    conn.executemany('INSERT INTO categories VALUES (?, ?)',
+                     [(article_id, category)
+                      for category in _categories(info)])
+    conn.executemany('INSERT INTO tags VALUES (?, ?)',
+                     [(article_id, tag)
+                      for tag in _tags(info)])
+
+
+def search(query_str, sortedby=None, reverse=False):
+    """Search the index, returning all results"""
+    sql, args, _ = _select(query_str, sortedby, reverse)
+    return [_decode(row[0]) for row in _reader().execute(sql, args)]
+
+
+def search_page(query_str, sortedby, page, pagelen, reverse=False):
+    """Search the index, returning a page of article infos along with the
+    total number of results.  Where content was searched for, each info
+    carries a highlighted snippet."""
+    sql, args, words = _select(query_str, sortedby, reverse)
+    conn = _reader()
+    total = conn.execute('SELECT count(*) FROM (' + sql + ')',
+                         args).fetchone()[0]
+    # like whoosh, pages past the end give the last page
+    page = max(1, min(page, (total + pagelen - 1) // pagelen))
+    rows = conn.execute(sql + ' LIMIT ? OFFSET ?',
+                        args + [pagelen, (page - 1) * pagelen]).fetchall()
+    return [_decode(row[0], row[1] if words else None) for row in rows], total
+
+
+def remove_article(fname):
+    """Remove the article at fullname from the index"""
+    _remove(_writer(), fname)
+
+
+def commit():
+    """Commit the index changes"""
+    conn = g.pop('sqlite_writer', None)
+    if conn is not None:
+        conn.execute("UPDATE meta SET value = value + 1 "
+                     "WHERE key = 'generation'")
+        conn.commit()
+        conn.close()
+
+
+def flush():
+    """Commit the changes made so far, and carry on in a fresh
+    transaction"""
+    commit()
+
+
+def generation():
+    """Return the generation of the index, which goes up with each
+    commit"""
+    row = _reader().execute(
+        "SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    return row[0] if row else None
+
+# END API
+
+
+def _index_file():
+    return os.path.join(abs_state_folder(), cfg('YAWT_INDEXER_SQLITE_FILE'))
+
+
+def _connect(filename):
+    conn = sqlite3.connect(filename, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    return conn
+
+
+def _writer():
+    """Return the connection for this request's index changes, opening one,
+    and starting a transaction, if need be"""
+    if 'sqlite_writer' not in g:
+        filename = _index_file()
+        ensure_path(os.path.dirname(filename))
+        conn = _connect(filename)
+        conn.isolation_level = None
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('BEGIN IMMEDIATE')
+        g.sqlite_writer = conn
+    return g.sqlite_writer
+
+
+def _reader():
+    """Return this thread's connection for searching the index"""
+    filename = _index_file()
+    conns = getattr(_READERS, 'conns', None)
+    if conns is None:
+        conns = _READERS.conns = {}
+    if filename not in conns:
+        conns[filename] = _connect(filename)
+    return conns[filename]
+
+
+def _remove(conn, fname):
+    row = conn.execute('SELECT id FROM articles WHERE fullname = ?',
+                       (fname,)).fetchone()
+    if row is not None:
+        conn.execute('DELETE FROM fulltext WHERE rowid = ?', row)
+        conn.execute('DELETE FROM articles WHERE id = ?', row)
+
+
+def _timestamp(value):
+    """Return the date value (a timestamp, possibly as a string, or a
+    datetime) as an int timestamp"""
+    if isinstance(value, datetime):
+        # naive datetimes are local time, as they are for whoosh
+        return int(time.mktime(value.timetuple())) if value.tzinfo is None \
+            else int(value.timestamp())
+    return int(float(value))
+
+
+def _tags(info):
+    tags = getattr(info, 'tags', None) or []
+    if isinstance(tags, str):
+        # no list meta type for tags
+        tags = tags.split(',')
+    return set(tag.strip() for tag in tags if tag.strip())
+
+
+def _categories(info):
+    categories = getattr(info, 'categories', None)
+    if categories is None:
+        categories = category_chain(info.category)
+    return set(category for category in categories if category)
+
+
+def _decode(info_json, snippet=None):
+    info = jsonpickle.decode(info_json)
+    if snippet:
+        info.snippet = Markup(str(escape(snippet))
+                              .replace(_MARK_START, '<mark>')
+                              .replace(_MARK_END, '</mark>'))
+    return info
+
+
+def _is_term(field, value):
+    """True if field:value is a term we can search on"""
+    if field in ['content', 'fullname', 'categories', 'tags']:
+        return True
+    return field in cfg('YAWT_INDEXER_SQLITE_DATE_FIELDS') and \
+        re.match(r'^\d{4}(\d{2}){0,2}$', value) is not None
+
+
+def _parse(query_str):
+    """Parse query_str into a list of (field, value) terms, and a list of
+    content words.  Anything which looks like a term, but isn't one we can
+    search on (e.g. 'note:' in what someone typed into the search box), is
+    taken as content."""
+    terms = []
+    words = []
+    field = None
+    for token in (query_str or '').split():
+        if token == 'AND':
+            field = None
+            continue
+        if ':' in token:
+            token_field, value = token.split(':', 1)
+            if _is_term(token_field, value):
+                field, token = token_field, value
+            else:
+                field = 'content'
+        if not token:
+            continue
+        if field == 'content':
+            words.append(token)
+        else:
+            terms.append((field or 'categories', token))
+    return terms, words
+
+
+def _date_range(value):
+    """Return the [start, end) timestamps for a yyyy[mm[dd]] date"""
+    year = int(value[:4])
+    month = int(value[4:6] or 1)
+    day = int(value[6:8] or 1)
+    start = datetime(year, month, day)
+    if len(value) >= 8:
+        end = datetime.fromordinal(start.toordinal() + 1)
+    elif len(value) >= 6:
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+    else:
+        end = datetime(year + 1, 1, 1)
+    # timestamps are local time, as they are for whoosh
+    return int(time.mktime(start.timetuple())), \
+        int(time.mktime(end.timetuple()))
+
+
+def _fts_query(words):
+    # quote each word, so that nothing in it is taken as FTS5 syntax
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def _select(query_str, sortedby, reverse):
+    """Return the SQL (and its arguments) selecting the info and snippet of
+    each article matching query_str, in order, along with the content words
+    searched for"""
+    terms, words = _parse(query_str)
+    date_fields = cfg('YAWT_INDEXER_SQLITE_DATE_FIELDS')
+    joins = []
+    where = []
+    args = []
+    snippet = 'NULL'
+    if words:
+        joins.append('JOIN fulltext ON fulltext.rowid = a.id')
+        where.append('fulltext MATCH ?')
+        args.append(_fts_query(words))
+        snippet = "snippet(fulltext, 0, '{0}', '{1}', '...', {2})".format(
+            _MARK_START, _MARK_END, cfg('YAWT_INDEXER_SQLITE_SNIPPET_TOKENS'))
+    for field, value in terms:
+        if field == 'fullname':
+            where.append('a.fullname = ?')
+            args.append(value)
+        elif field == 'categories':
+            where.append('a.id IN (SELECT article_id FROM categories '
+                         'WHERE category = ?)')
+            args.append(value)
+        elif field == 'tags':
+            where.append('a.id IN (SELECT article_id FROM tags '
+                         'WHERE tag = ?)')
+            args.append(value)
+        else:
+            where.append('a.id IN (SELECT article_id FROM dates '
+                         'WHERE field = ? AND value >= ? AND value < ?)')
+            args.append(field)
+            args.extend(_date_range(value))
+    descending = reverse
+    if sortedby in date_fields:
+        # the join comes before the WHERE clause, so its argument goes first
+        joins.append('LEFT JOIN dates sort ON sort.article_id = a.id '
+                     'AND sort.field = ?')
+        args.insert(0, sortedby)
+        order = 'sort.value'
+    elif words and sortedby != 'fullname':
+        # best matches first, and the best have the lowest (bm25) rank
+        order = 'fulltext.rank'
+    else:
+        order = 'a.fullname'
+    sql = 'SELECT a.info_json, {0} FROM articles a {1}'.format(
+        snippet, ' '.join(joins))
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY {0} {1}, a.fullname'.format(
+        order, 'DESC' if descending else 'ASC')
+    return sql, args, words
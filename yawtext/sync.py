@@ -1,12 +1,86 @@
-from flask import current_app
+"""The YAWT sync plugin, plus the pipeline plugins use to rewrite the front
+matter of files about to be synced"""
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import frontmatter
+import yaml
+from flask import current_app, g
 from flask_script import Command, Option
 
-from yawt.utils import call_plugins
+from yawt.utils import call_plugins, extensions, has_method, save_file
 from yawtext import Plugin
 from yawtext.vc import vc_push, vc_commit, vc_add_tracked,\
     vc_add_tracked_and_new, vc_status
 
 
+class ExplicitDumper(yaml.SafeDumper):
+    """
+    A dumper that will never emit aliases.
+    """
+    def ignore_aliases(self, data):
+        return True
+
+
+def load_post(filename):
+    """Parse the front matter and content of filename"""
+    return frontmatter.load(filename)
+
+
+def save_post(filename, post):
+    """Write post back out to filename"""
+    save_file(filename, frontmatter.dumps(post, Dumper=ExplicitDumper))
+
+
+def parallel_map(func, *iterables):
+    """Run func over the iterables, spread over several processes if there
+    are enough items to make it worthwhile"""
+    iterables = [list(iterable) for iterable in iterables]
+    config = current_app.config
+    if len(iterables[0]) < config.get('YAWT_SYNC_PARALLEL_THRESHOLD', 100):
+        return list(map(func, *iterables))
+    with ProcessPoolExecutor(config.get('YAWT_SYNC_WORKERS')) as executor:
+        return list(executor.map(func, *iterables, chunksize=32))
+
+
+def rewrite_posts(changed):
+    """Let every plugin with an on_pre_sync_post(repofile, post, added) method
+    adjust the front matter of the files in changed, so that each file is
+    parsed and written just once, however many plugins want to touch it.
+
+    Parsing and writing are spread over several processes for big syncs,
+    while the plugins themselves (which may be interactive) are called one
+    file at a time.  Plugins call this from on_pre_sync; only the first call
+    for a given change set does any work."""
+    if getattr(g, 'rewritten_changes', None) is changed:
+        return
+    g.rewritten_changes = changed
+
+    rewriters = [ext for ext in extensions()
+                 if has_method(ext, 'on_pre_sync_post')]
+    changed = changed.content_changes()
+    repofiles = changed.added + changed.modified
+    if not rewriters or not repofiles:
+        return
+
+    root_dir = current_app.yawt_root_dir
+    filenames = [os.path.join(root_dir, repofile) for repofile in repofiles]
+    posts = parallel_map(load_post, filenames)
+
+    dirty_filenames = []
+    dirty_posts = []
+    added = set(changed.added)
+    for repofile, filename, post in zip(repofiles, filenames, posts):
+        metadata = copy.deepcopy(post.metadata)
+        for rewriter in rewriters:
+            rewriter.on_pre_sync_post(repofile, post, repofile in added)
+        if post.metadata != metadata:
+            dirty_filenames.append(filename)
+            dirty_posts.append(post)
+    parallel_map(save_post, dirty_filenames, dirty_posts)
+
+
 def _sync(strict, addnew, push, message):
     if not strict:
         # if addnew is True, this means we need to add all untracked files
@@ -54,7 +128,8 @@ class YawtSync(Plugin):
         super(YawtSync, self).__init__(app)
 
     def init_app(self, app):
-        pass
+        app.config.setdefault('YAWT_SYNC_PARALLEL_THRESHOLD', 100)
+        app.config.setdefault('YAWT_SYNC_WORKERS', None)
 
     def on_cli_init(self, manager):
         """add the command to the CLI manager"""
@@ -57,6 +57,9 @@ class TaggingView(CollectionView):
             query_str += ' AND ' + category
         return query_str
 
+    def postings_key(self, category='', tag=None, *args, **kwargs):
+        return (category, tag)
+
     def get_template_name(self):
         return current_app.config['YAWT_TAGGING_TEMPLATE']
 
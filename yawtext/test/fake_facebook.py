@@ -3,13 +3,15 @@ graphapis = []
 returnval = None
 
 def clear():
+    global graphapis, returnval
     graphapis = []
     returnval = None
 
 
 class GraphAPI(object):
-    def __init__(self, access_token):
+    def __init__(self, access_token, url=None):
         self.access_token = access_token
+        self.url = url
         global graphapis
         graphapis.append(self)
 
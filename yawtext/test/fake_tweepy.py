@@ -4,6 +4,7 @@ apis = []
 returnid = None
 
 def clear():
+    global oauths, apis, returnid
     oauths = []
     apis = []
     returnid = None
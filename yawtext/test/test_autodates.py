@@ -1,9 +1,13 @@
 #pylint: skip-file
 import datetime
 
+from mock import patch
+
 import yawtext.autodates
+import yawtext.sync
 from yawt.test import TestCaseWithSite
 from yawt.utils import call_plugins, ChangedFiles
+from yawtext import Plugin
 
 
 HAMLET = """---
@@ -71,3 +75,64 @@ class TestAutodates(TestCaseWithSite):
     def tearDown(self):
         super(TestAutodates, self).tearDown()
         yawtext.autodates._now = self.old_now
+
+
+class TitlePlugin(Plugin):
+    def on_pre_sync(self, changed):
+        yawtext.sync.rewrite_posts(changed)
+
+    def on_pre_sync_post(self, repofile, post, added):
+        if added:
+            post['title'] = 'new post'
+
+
+class TestSharedPreSync(TestCaseWithSite):
+    YAWT_EXTENSIONS = ['yawtext.autodates.YawtAutodates',
+                       'yawtext.test.test_autodates.TitlePlugin']
+    files = {
+        'content/reading/hamlet.txt': HAMLET,
+        'content/cooking/soup.txt': SOUP,
+    }
+
+    def setUp(self):
+        self.old_now = yawtext.autodates._now
+        yawtext.autodates._now = lambda: datetime.datetime(2015, 9, 13)
+
+    def _pre_sync(self, changed):
+        with patch('yawtext.sync.load_post',
+                   wraps=yawtext.sync.load_post) as load, \
+                patch('yawtext.sync.save_post',
+                      wraps=yawtext.sync.save_post) as save:
+            call_plugins('on_pre_sync', changed)
+        return load.call_count, save.call_count
+
+    def test_each_file_parsed_and_written_once(self):
+        self.site.save_file('content/cooking/italian/spaghetti.txt', SPAGHETTI)
+        changed = ChangedFiles(added=['content/cooking/italian/spaghetti.txt'],
+                               modified=['content/reading/hamlet.txt'])
+        self.assertEqual((2, 2), self._pre_sync(changed))
+
+        spaghetti = self.site.load_file('content/cooking/italian/spaghetti.txt')
+        self.assertIn('title: new post', spaghetti)
+        self.assertIn('create_time: 2015-09-13', spaghetti)
+        hamlet = self.site.load_file('content/reading/hamlet.txt')
+        self.assertNotIn('title:', hamlet)
+        self.assertIn('modified_time: 2015-09-13', hamlet)
+
+    def test_parallel_rewrite(self):
+        self.app.config['YAWT_SYNC_PARALLEL_THRESHOLD'] = 0
+        self.app.config['YAWT_SYNC_WORKERS'] = 2
+        changed = ChangedFiles(modified=['content/reading/hamlet.txt',
+                                         'content/cooking/soup.txt'])
+        call_plugins('on_pre_sync', changed)
+
+        self.assertIn('create_time: 2008-06-03',
+                      self.site.load_file('content/cooking/soup.txt'))
+        self.assertIn('modified_time: 2015-09-13',
+                      self.site.load_file('content/cooking/soup.txt'))
+        self.assertIn('modified_time: 2015-09-13',
+                      self.site.load_file('content/reading/hamlet.txt'))
+
+    def tearDown(self):
+        super(TestSharedPreSync, self).tearDown()
+        yawtext.autodates._now = self.old_now
@@ -10,7 +10,7 @@ from yawt import create_app, utils
 from yawt.cli import create_manager, Walk
 from yawt.test import BaseTestSite
 from yawt.utils import call_plugins
-from yawtext.autotags import Autotag
+from yawtext.autotags import Autotag, _load_review
 from yawtext.test import TestCaseWithIndex
 
 
@@ -153,3 +153,55 @@ class TestAutotags(TestCaseWithIndex):
 
         self.assertIn('tags:',
                        self.site.load_file('content/reading/hamlet.txt'))
+
+    def test_autotags_command_tags_whole_category(self):
+        autotag = Autotag()
+        autotag.run(edit=True, category='cooking')
+
+        self.assertIn('tags:',
+                      self.site.load_file('content/cooking/soup.txt'))
+        self.assertNotIn('tags: food,liquid',
+                         self.site.load_file('content/cooking/soup.txt'))
+        self.assertNotIn('tags:',
+                         self.site.load_file('content/reading/hamlet.txt'))
+
+    def test_autotags_command_writes_and_applies_review_file(self):
+        review_file = os.path.join(self.site.site_root, 'review.txt')
+        autotag = Autotag()
+        autotag.run(edit=False, all_articles=True, review_file=review_file)
+
+        review = self.site.load_file('review.txt')
+        self.assertIn('content/reading/hamlet.txt: ', review)
+        self.assertIn('content/cooking/soup.txt: ', review)
+        self.assertNotIn('tags:',
+                         self.site.load_file('content/reading/hamlet.txt'))
+
+        self.site.save_file('review.txt',
+                            'content/reading/hamlet.txt: play,danish\n')
+        autotag.run(edit=False, apply_file=review_file)
+        self.assertIn('tags: play,danish',
+                      self.site.load_file('content/reading/hamlet.txt'))
+        self.assertIn('tags: food,liquid',
+                      self.site.load_file('content/cooking/soup.txt'))
+
+
+class TestReviewFile(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.autotags.YawtAutotags']
+
+    def create_app(self):
+        self.site = BaseTestSite()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def test_review_file_skips_untagged_articles(self):
+        self.site.save_file('review.txt',
+                            'content/a.txt: one,two\n'
+                            'content/b.txt: \n'
+                            'content/c: d.txt: three\n')
+        review_file = os.path.join(self.site.site_root, 'review.txt')
+        self.assertEqual([('content/a.txt', 'one,two'),
+                          ('content/c: d.txt', 'three')],
+                         _load_review(review_file))
+
+    def tearDown(self):
+        self.site.remove()
@@ -5,7 +5,9 @@ import jsonpickle
 from flask_testing import TestCase
 
 from yawt import create_app, utils
+from yawt.article import Article
 from yawt.utils import abs_state_folder, call_plugins, load_file, ChangedFiles
+from yawtext.categories import relative_category
 from yawtext.test import TestCaseWithIndex, TestCaseWithWalker
 import yawtext
 
@@ -24,6 +26,25 @@ class TestYawtCategoriesInitialize(TestCase):
         self.assertEqual('categorycounts',
                          self.app.config['YAWT_CATEGORY_COUNT_FILE'])
 
+    def test_article_fetch_adds_shared_category_chain(self):
+        plugin = self.app.extension_info[0]['yawtext.categories.YawtCategories']
+        articles = []
+        for slug in ['madras', 'korma']:
+            article = Article()
+            article.info.category = 'cooking/indian'
+            articles.append(plugin.on_article_fetch(article))
+        self.assertEqual(('cooking/indian', 'cooking'),
+                         articles[0].info.categories)
+        self.assertTrue(articles[0].info.categories is
+                        articles[1].info.categories)
+
+    def test_relative_category(self):
+        self.assertEqual('indian', relative_category('cooking/indian',
+                                                     'cooking'))
+        self.assertEqual('', relative_category('cooking', 'cooking'))
+        self.assertEqual('cooking/indian',
+                         relative_category('cooking/indian', ''))
+
 
 FILES = {
     'templates/article_list.html': 'does not matter',
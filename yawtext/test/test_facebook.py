@@ -1,7 +1,9 @@
 #pylint: skip-file
+import os
+
 from flask_testing import TestCase
+from mock import patch
 
-import yawtext
 from yawt import create_app
 from yawt.utils import save_file, remove_file
 from yawtext.facebook import post_fb
@@ -19,8 +21,9 @@ class TestFacebook(TestCase):
         return create_app('/tmp/blah', config=self)
 
     def setUp(self):
-        self.old_facebook = yawtext.facebook.facepy
-        yawtext.facebook.facepy = fake_facebook
+        patcher = patch('yawtext.facebook.facepy', fake_facebook)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         fake_facebook.clear()
         save_file('/tmp/fbtoken', access_token)
 
@@ -34,6 +37,17 @@ class TestFacebook(TestCase):
         self.assertEquals('http://www.facebook.com/desmond.rivet/posts/5678',
                           metadata['fbpost'])
 
+    def test_graph_reused_until_token_changes(self):
+        fake_facebook.returnval = {'id': '1234_5678'}
+        post_fb('first message')
+        post_fb('second message')
+        self.assertEquals(1, len(fake_facebook.graphapis))
+
+        save_file('/tmp/fbtoken', 'NEW_TOKEN')
+        os.utime('/tmp/fbtoken', (1, 1))
+        post_fb('third message')
+        self.assertEquals(2, len(fake_facebook.graphapis))
+        self.assertEquals('NEW_TOKEN', fake_facebook.graphapis[1].access_token)
+
     def tearDown(self):
         remove_file('/tmp/fbtoken')
-        yawtext.facebook.facepy = self.old_facebook
@@ -5,14 +5,15 @@ import subprocess
 
 from flask import g
 from flask_testing import TestCase
+from mock import patch
 
 from yawt import create_app
-from yawt.utils import ChangedFiles
-from yawtext import Plugin
+from yawt.utils import ChangedFiles, ChangeQueue, call_plugins
+from yawtext import Plugin, load_summary
 from yawtext.git import _git_cmd
 from yawtext.test import TempGitFolder
 from yawtext.vc import vc_status, vc_add_tracked, vc_add_tracked_and_new,\
-    vc_commit, post_commit
+    vc_commit, vc_head, post_commit, post_receive
 
 
 class TestYawtGitNewSite(TestCase):
@@ -180,5 +181,204 @@ class TestGitHooks(TestCase):
         plugin = self.app.extension_info[0][test_plugin_name]
         self.assertEquals(expected, plugin.changed)
 
+    def test_post_receive_merges_commits(self):
+        old = vc_head()
+
+        self.site.save_file('content/newfile.txt', 'blah')
+        self.site.save_file('content/otherfile.txt', 'blah blah')
+        vc_add_tracked_and_new()
+        vc_commit('first')
+
+        self.site.save_file('content/index.txt', 'different stuff')
+        self.site.delete_file('content/newfile.txt')
+        vc_add_tracked_and_new()
+        vc_commit('second')
+
+        with patch('yawtext.git._rev_list') as rev_list:
+            post_receive(self.site.site_root, old, vc_head(), self.app)
+        # nobody wants the history, so it's one diff, and no commit walk
+        self.assertFalse(rev_list.called)
+        expected = ChangedFiles(added=['content/otherfile.txt'],
+                                modified=['content/index.txt'])
+
+        test_plugin_name = 'yawtext.test.test_git.TestPlugin'
+        plugin = self.app.extension_info[0][test_plugin_name]
+        self.assertEquals(expected, plugin.changed)
+
+    def test_hooks_in_a_change_queue_are_dispatched_as_net_change(self):
+        plugin = self.app.extension_info[0]['yawtext.test.test_git.TestPlugin']
+        with ChangeQueue():
+            self.site.save_file('content/newfile.txt', 'blah')
+            vc_add_tracked_and_new()
+            vc_commit('first')
+            post_commit(self.site.site_root, self.app)
+
+            self.site.delete_file('content/newfile.txt')
+            self.site.save_file('content/index.txt', 'different stuff')
+            vc_add_tracked_and_new()
+            vc_commit('second')
+            post_commit(self.site.site_root, self.app)
+            self.assertEquals(None, plugin.changed)
+        self.assertEquals(ChangedFiles(modified=['content/index.txt']),
+                          plugin.changed)
+
+    def test_post_receive_from_null_commit(self):
+        post_receive(self.site.site_root, '0' * 40, vc_head(), self.app)
+        expected = ChangedFiles(added=sorted(self.site.files))
+
+        test_plugin_name = 'yawtext.test.test_git.TestPlugin'
+        plugin = self.app.extension_info[0][test_plugin_name]
+        self.assertEquals(expected, plugin.changed)
+
+    def tearDown(self):
+        self.site.remove()
+
+
+class HistoryPlugin(Plugin):
+    def __init__(self):
+        self.commits = []
+        self.changed = None
+
+    def on_commit_files_changed(self, commit, changed):
+        self.commits.append((commit, changed))
+
+    def on_files_changed(self, changed):
+        self.changed = changed
+
+
+class TestGitHistory(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl',
+                       'yawtext.test.test_git.HistoryPlugin']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.git'
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self.app.preprocess_request()
+        self.site.initialize_git()
+
+    def test_post_receive_reports_each_commit_then_net_change(self):
+        old = vc_head()
+
+        self.site.save_file('content/newfile.txt', 'blah')
+        vc_add_tracked_and_new()
+        vc_commit('first')
+        first = vc_head()
+
+        self.site.save_file('content/renamed.txt',
+                            self.site.load_file('content/food.txt'))
+        self.site.delete_file('content/food.txt')
+        vc_add_tracked_and_new()
+        vc_commit('second')
+        second = vc_head()
+
+        post_receive(self.site.site_root, old, second, self.app)
+
+        plugin = self.app.extension_info[0]['yawtext.test.test_git.HistoryPlugin']
+        self.assertEquals([(first, ChangedFiles(added=['content/newfile.txt'])),
+                           (second, ChangedFiles(renamed={'content/food.txt':
+                                                          'content/renamed.txt'}))],
+                          plugin.commits)
+        self.assertEquals(ChangedFiles(added=['content/newfile.txt'],
+                                       renamed={'content/food.txt':
+                                                'content/renamed.txt'}),
+                          plugin.changed)
+
+    def tearDown(self):
+        self.site.remove()
+
+
+class TestGitFileTimes(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.git'
+    YAWT_VERSION_CONTROL_TIMES = True
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self._commit_at(1500000000, self.site.initialize_git)
+        self.app.preprocess_request()
+
+    def _commit_at(self, epoch, func, *args):
+        date = '@{0} +0000'.format(epoch)
+        with patch.dict(os.environ, {'GIT_COMMITTER_DATE': date,
+                                     'GIT_AUTHOR_DATE': date}):
+            func(*args)
+
+    def _commit(self, epoch, message):
+        vc_add_tracked_and_new()
+        self._commit_at(epoch, vc_commit, message)
+
+    def _walk(self):
+        call_plugins('on_pre_walk')
+
+    def test_article_times_come_from_history(self):
+        self.site.save_file('content/index.txt', 'different stuff')
+        self._commit(1500002000, 'second')
+        self._walk()
+
+        article = g.site.fetch_article('index')
+        self.assertEquals(1500000000, article.info.create_time)
+        self.assertEquals(1500002000, article.info.modified_time)
+        self.assertEquals('Dude User', article.info.author)
+
+    def test_uncommitted_article_uses_file_times(self):
+        self._walk()
+        self.site.save_file('content/newfile.txt', 'blah')
+        article = g.site.fetch_article('newfile')
+        self.assertTrue(isinstance(article.info.create_time, int))
+
+    def test_fetch_before_walk_uses_file_times_without_git(self):
+        with patch('yawtext.vc.vc_log') as log:
+            article = g.site.fetch_article('index')
+        self.assertFalse(log.called)
+        self.assertNotEquals(1500000000, article.info.create_time)
+        self.assertEquals(None, load_summary('vctimes'))
+
+    def test_times_updated_incrementally_on_files_changed(self):
+        self._walk()
+        self.site.save_file('content/newfile.txt', 'blah')
+        self.site.delete_file('content/random.txt')
+        self._commit(1500003000, 'third')
+        post_commit(self.site.site_root, self.app)
+
+        article = g.site.fetch_article('newfile')
+        self.assertEquals(1500003000, article.info.create_time)
+        self.assertEquals(1500003000, article.info.modified_time)
+        times = load_summary('vctimes')
+        self.assertFalse('content/random.txt' in times['files'])
+        self.assertEquals(vc_head(), times['head'])
+
+    def tearDown(self):
+        self.site.remove()
+
+
+class TestGitFileTimesNewSite(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.git'
+    YAWT_VERSION_CONTROL_TIMES = True
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self.app.preprocess_request()
+        subprocess.check_output(_git_cmd(['init']), stderr=subprocess.STDOUT)
+
+    def test_walk_without_commits_uses_file_times(self):
+        call_plugins('on_pre_walk')
+        self.assertEquals({'head': None, 'files': {}},
+                          load_summary('vctimes'))
+        article = g.site.fetch_article('index')
+        self.assertTrue(isinstance(article.info.create_time, int))
+
     def tearDown(self):
         self.site.remove()
@@ -0,0 +1,145 @@
+#pylint: skip-file
+from flask_testing import TestCase
+
+from yawt import create_app
+from yawt.utils import ChangedFiles
+from yawtext import Plugin
+from yawtext.gitbatch import _diff_tree, close_pipes
+from yawtext.test import TempGitFolder
+from yawtext.vc import vc_add_tracked_and_new, vc_commit, vc_head, \
+    post_commit, post_update, post_receive
+
+
+class TestFolder(TempGitFolder):
+    def __init__(self):
+        super(TestFolder, self).__init__()
+        self.files = {
+            'content/index.txt': 'index text',
+            'content/entry.txt': 'entry text',
+            'content/random.txt': 'random text',
+            'content/food.txt': 'random food text, let us make this longer',
+        }
+
+
+class TestPlugin(Plugin):
+    def __init__(self):
+        self.changed = None
+
+    def on_files_changed(self, changed):
+        self.changed = changed
+
+
+class TestGitBatchHooks(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl',
+                       'yawtext.test.test_gitbatch.TestPlugin']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.gitbatch'
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self.app.preprocess_request()
+        self.site.initialize_git()
+
+    def _changed(self):
+        plugin_name = 'yawtext.test.test_gitbatch.TestPlugin'
+        return self.app.extension_info[0][plugin_name].changed
+
+    def _commit(self, message):
+        vc_add_tracked_and_new()
+        vc_commit(message)
+
+    def test_post_commit(self):
+        self.site.save_file('content/index.txt', 'different stuff')
+        self.site.save_file('content/new file.txt', 'blah')
+        self.site.delete_file('content/random.txt')
+        self.site.save_file('content/newfood.txt',
+                            self.site.load_file('content/food.txt'))
+        self.site.delete_file('content/food.txt')
+        self._commit('hello')
+
+        post_commit(self.site.site_root, self.app)
+        expected = ChangedFiles(added=['content/new file.txt'],
+                                modified=['content/index.txt'],
+                                deleted=['content/random.txt'],
+                                renamed={'content/food.txt':
+                                         'content/newfood.txt'})
+        self.assertEquals(expected, self._changed())
+
+    def test_post_update(self):
+        old = vc_head()
+        self.site.save_file('content/newfile.txt', 'blah')
+        self._commit('first')
+        self.site.save_file('content/index.txt', 'different stuff')
+        self._commit('second')
+
+        post_update(self.site.site_root, old, vc_head(), self.app)
+        expected = ChangedFiles(added=['content/newfile.txt'],
+                                modified=['content/index.txt'])
+        self.assertEquals(expected, self._changed())
+
+    def test_post_receive_uses_one_diff_tree_process(self):
+        old = vc_head()
+        for i in range(5):
+            self.site.save_file('content/file{0}.txt'.format(i), 'blah')
+            self._commit('commit {0}'.format(i))
+        post_commit(self.site.site_root, self.app)
+        self.assertEquals(ChangedFiles(added=['content/file4.txt']),
+                          self._changed())
+        pid = _diff_tree().pid()
+
+        post_receive(self.site.site_root, old, vc_head(), self.app)
+        expected = ChangedFiles(added=['content/file{0}.txt'.format(i)
+                                       for i in range(5)])
+        self.assertEquals(expected, self._changed())
+        self.assertIsNotNone(pid)
+        self.assertEquals(pid, _diff_tree().pid())
+
+    def test_post_receive_from_null_commit(self):
+        post_receive(self.site.site_root, '0' * 40, vc_head(), self.app)
+        self.assertEquals(ChangedFiles(added=sorted(self.site.files)),
+                          self._changed())
+        # diffed by the resident diff-tree, like any other range
+        self.assertIsNotNone(_diff_tree().pid())
+
+    def tearDown(self):
+        close_pipes()
+        self.site.remove()
+
+
+class TestGitBatchHistory(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl',
+                       'yawtext.test.test_git.HistoryPlugin']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.gitbatch'
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self.app.preprocess_request()
+        self.site.initialize_git()
+
+    def test_post_receive_reports_each_commit_from_the_root(self):
+        root = vc_head()
+        self.site.save_file('content/newfile.txt', 'blah')
+        vc_add_tracked_and_new()
+        vc_commit('first')
+        first = vc_head()
+
+        post_receive(self.site.site_root, '0' * 40, first, self.app)
+
+        plugin = self.app.extension_info[0]['yawtext.test.test_git.HistoryPlugin']
+        self.assertEquals([(root, ChangedFiles(added=sorted(self.site.files))),
+                           (first, ChangedFiles(added=['content/newfile.txt']))],
+                          plugin.commits)
+        self.assertEquals(ChangedFiles(added=sorted(list(self.site.files) +
+                                                    ['content/newfile.txt'])),
+                          plugin.changed)
+
+    def tearDown(self):
+        close_pipes()
+        self.site.remove()
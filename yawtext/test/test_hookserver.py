@@ -0,0 +1,187 @@
+#pylint: skip-file
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+from flask_testing import TestCase
+
+from yawt import create_app
+from yawt.utils import ChangedFiles
+from yawtext import Plugin
+from yawtext.hookserver import HookServer, notify_hook, hooks_socket_path, \
+    run_hook, _site_config
+from yawtext.test import TempGitFolder
+from yawtext.vc import vc_add_tracked_and_new, vc_commit
+
+
+class TestFolder(TempGitFolder):
+    def __init__(self):
+        super(TestFolder, self).__init__()
+        self.files = {
+            'content/index.txt': 'index text',
+            'content/entry.txt': 'entry text',
+            'content/random.txt': 'random text',
+        }
+
+
+class CountingPlugin(Plugin):
+    def __init__(self):
+        self.changes = []
+
+    def on_files_changed(self, changed):
+        self.changes.append(changed)
+
+
+class RecordingPlugin(Plugin):
+    """For apps the hook client builds itself, which the tests can't get at"""
+    changes = []
+
+    def on_files_changed(self, changed):
+        RecordingPlugin.changes.append(changed)
+
+
+class TestHookServer(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl',
+                       'yawtext.hookserver.YawtHookServer',
+                       'yawtext.test.test_hookserver.CountingPlugin']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.git'
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self.app.preprocess_request()
+        self.site.initialize_git()
+        self.socket_path = os.path.join(self.site.site_root, 'hooks.sock')
+        self.server = HookServer(self.app, self.socket_path, 0.5)
+        self.thread = threading.Thread(target=self.server.serve)
+        self.thread.start()
+        while not os.path.exists(self.socket_path):
+            time.sleep(0.01)
+
+    def _plugin(self):
+        return self.app.extension_info[0]['yawtext.test.test_hookserver.CountingPlugin']
+
+    def _commit(self, message):
+        vc_add_tracked_and_new()
+        vc_commit(message)
+        self.assertTrue(notify_hook(self.site.site_root, 'post_commit',
+                                    path=self.socket_path))
+
+    def _stop(self):
+        notify_hook(self.site.site_root, 'stop', path=self.socket_path)
+        self.thread.join()
+
+    def test_burst_of_commits_processed_as_one_change(self):
+        self.site.save_file('content/newfile.txt', 'blah')
+        self._commit('first')
+        self.site.save_file('content/index.txt', 'different stuff')
+        self._commit('second')
+        self.site.delete_file('content/random.txt')
+        self._commit('third')
+        self._stop()
+
+        expected = ChangedFiles(added=['content/newfile.txt'],
+                                modified=['content/index.txt'],
+                                deleted=['content/random.txt'])
+        self.assertEqual([expected], self._plugin().changes)
+
+    def test_commits_after_quiet_period_processed_separately(self):
+        self.site.save_file('content/newfile.txt', 'blah')
+        self._commit('first')
+        time.sleep(1.0)
+        self.site.save_file('content/index.txt', 'different stuff')
+        self._commit('second')
+        self._stop()
+
+        self.assertEqual([ChangedFiles(added=['content/newfile.txt']),
+                          ChangedFiles(modified=['content/index.txt'])],
+                         self._plugin().changes)
+
+    def test_socket_removed_when_server_stops(self):
+        self._stop()
+        self.assertFalse(os.path.exists(self.socket_path))
+        self.assertFalse(notify_hook(self.site.site_root, 'post_commit',
+                                     path=self.socket_path))
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self._stop()
+        self.site.remove()
+
+
+class TestHookFallback(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl']
+    YAWT_VERSION_CONTROL_IFC = 'yawtext.git'
+
+    def create_app(self):
+        self.site = TestFolder()
+        self.site.files['config.py'] = \
+            "YAWT_EXTENSIONS = ['yawtext.vc.YawtVersionControl', " \
+            "'yawtext.test.test_hookserver.RecordingPlugin']\n"
+        self.site.initialize()
+        return create_app(self.site.site_root, config=self)
+
+    def setUp(self):
+        self.app.preprocess_request()
+        self.site.initialize_git()
+        del RecordingPlugin.changes[:]
+
+    def test_hook_processed_in_its_own_app_without_server(self):
+        self.site.save_file('content/newfile.txt', 'blah')
+        vc_add_tracked_and_new()
+        vc_commit('first')
+        run_hook(self.site.site_root, 'post_commit',
+                 path=os.path.join(self.site.site_root, 'nothing.sock'))
+        self.assertEqual([ChangedFiles(added=['content/newfile.txt'])],
+                         RecordingPlugin.changes)
+
+    def tearDown(self):
+        self.site.remove()
+
+
+class TestHookClient(unittest.TestCase):
+    def setUp(self):
+        self.site_root = tempfile.mkdtemp()
+
+    def test_socket_path_comes_from_site_config(self):
+        self.assertEqual(os.path.join(self.site_root, '_state', 'hooks.sock'),
+                         hooks_socket_path(self.site_root,
+                                           _site_config(self.site_root)))
+        with open(os.path.join(self.site_root, 'config.py'), 'w') as f:
+            f.write("YAWT_STATE_FOLDER = 'state'\n"
+                    "YAWT_HOOKS_SOCKET = 'yawt.sock'\n")
+        self.assertEqual(os.path.join(self.site_root, 'state', 'yawt.sock'),
+                         hooks_socket_path(self.site_root,
+                                           _site_config(self.site_root)))
+
+    def test_busy_server_still_gets_the_hook(self):
+        path = os.path.join(self.site_root, 'hooks.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)  # but doesn't accept until later
+        try:
+            start = time.time()
+            self.assertTrue(notify_hook(self.site_root, 'post_receive',
+                                        'abc', 'def', path=path,
+                                        timeout=0.2))
+            self.assertTrue(time.time() - start < 2)
+            conn, _ = server.accept()
+            self.assertEqual('post_receive abc def\n',
+                             conn.makefile('r').readline())
+            conn.close()
+        finally:
+            server.close()
+
+    def test_notify_fails_without_server(self):
+        path = os.path.join(self.site_root, 'hooks.sock')
+        self.assertFalse(notify_hook(self.site_root, 'post_commit', path=path))
+
+    def tearDown(self):
+        shutil.rmtree(self.site_root)
@@ -12,6 +12,7 @@ from yawt.cli import Walk
 from yawt.utils import cfg
 from yawtext.indexer import search
 from yawtext.test import TestCaseWithIndex
+from yawtext.whoosh import _content_fields
 
 
 def _idx_root():
@@ -36,8 +37,9 @@ class TestYawtIndexerInitialize(TestCase):
                           self.app.config['YAWT_INDEXER_IFC'])
         self.assertEquals({},
                           self.app.config['YAWT_INDEXER_WHOOSH_INFO_FIELDS'])
-        self.assertEquals({'content': TEXT()},
+        self.assertEquals(None,
                           self.app.config['YAWT_INDEXER_WHOOSH_FIELDS'])
+        self.assertEquals({'content': TEXT()}, _content_fields())
 
     def test_index_initialized_on_new_site(self):
         self.assertFalse(os.path.exists(_idx_root()))
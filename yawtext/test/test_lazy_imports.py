@@ -0,0 +1,85 @@
+#pylint: skip-file
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+# Creates an app (twice) with every extension that has a heavy dependency, in
+# a fresh interpreter, and with their default config, and reports how long
+# the first one took (not counting flask itself, which we always need), how
+# often the site root ended up on sys.path, and which modules got loaded.
+SCRIPT = """
+import sys
+import time
+import flask
+
+start = time.time()
+import yawt
+import yawt.cli
+
+
+class Config(object):
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.excerpt.YawtExcerpt',
+                       'yawtext.multimarkdown.YawtMarkdown',
+                       'yawtext.micropost.YawtMicropost',
+                       'yawtext.notify.YawtNotify',
+                       'yawtext.autotags.YawtAutotags',
+                       'yawtext.sync.YawtSync',
+                       'yawtext.vc.YawtVersionControl',
+                       'yawtext.tagging.YawtTagging',
+                       'yawtext.archives.YawtArchives',
+                       'yawtext.search.YawtSearch',
+                       'yawtext.indexer.YawtIndexer']
+
+yawt.create_app(sys.argv[1], config=Config())
+print(time.time() - start)
+yawt.create_app(sys.argv[1], config=Config())
+print(sys.path.count(sys.argv[1]))
+print(' '.join(sys.modules))
+"""
+
+# modules only imported once the heavy packages are really loaded
+HEAVY_MODULES = ['tweepy.api', 'facepy.graph_api', 'bs4.element',
+                 'markdown.core', 'whoosh.fields', 'requests']
+
+
+class TestLazyImports(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def _create_app(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join([root, env.get('PYTHONPATH', '')])
+        output = subprocess.check_output([sys.executable, '-W', 'ignore',
+                                          '-c', SCRIPT, self.tempdir],
+                                         env=env).decode('utf-8')
+        elapsed, path_count, modules = output.strip().split('\n')
+        return float(elapsed), int(path_count), modules.split()
+
+    def test_create_app_does_not_load_heavy_dependencies(self):
+        _, _, modules = self._create_app()
+        for module in HEAVY_MODULES:
+            self.assertFalse(module in modules, module + ' was loaded')
+
+    def test_create_app_is_within_import_budget(self):
+        # best of a few runs, so that a busy machine doesn't fail the test
+        times = []
+        for _ in range(3):
+            times.append(self._create_app()[0])
+            if times[-1] < 0.2:
+                break
+        self.assertTrue(min(times) < 0.2, 'create_app took %fs' % min(times))
+
+    def test_site_root_added_to_path_once(self):
+        _, path_count, _ = self._create_app()
+        self.assertEqual(1, path_count)
+
+    def tearDown(self):
+        assert self.tempdir.startswith('/tmp/')
+        shutil.rmtree(self.tempdir)
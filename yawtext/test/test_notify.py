@@ -1,20 +1,33 @@
 #pylint: skip-file
 import shutil
 import tempfile
+import threading
 import unittest
 
 from mock import Mock
 
 import yawtext.notify
+from yawtext.micropost import SocialPostError
 from yawt import create_app
 from yawt.utils import ChangedFiles
 
 
-class Config(object):
+# these tests post straight away, rather than through the social queue
+class SyncConfig(object):
+    YAWT_NOTIFY_QUEUE = False
+
+
+class Config(SyncConfig):
     YAWT_NOTIFY_CATEGORIES = ['cat1']
     YAWT_NOTIFY_BASE_URL = 'http://www.example.com'
 
 
+class NestedConfig(SyncConfig):
+    YAWT_NOTIFY_CATEGORIES = ['cat1', 'cat1/sub']
+    YAWT_NOTIFY_NETWORKS = ['facebook', 'twitter']
+    YAWT_NOTIFY_BASE_URL = 'http://www.example.com'
+
+
 class TestNotify(unittest.TestCase):
     def setUp(self):
         self.old_post_social = yawtext.micropost.post_social
@@ -22,7 +35,7 @@ class TestNotify(unittest.TestCase):
 
     def test_notify_posts_message_on_networks(self):
         self.tempdir = tempfile.mkdtemp()
-        self.app = create_app(self.tempdir)
+        self.app = create_app(self.tempdir, config=SyncConfig())
         self.notify = yawtext.notify.YawtNotify(self.app)
         with self.app.test_request_context():
             changed = ChangedFiles(added=['content/cat1/a.txt', 'content/cat2/b.txt'],
@@ -53,6 +66,84 @@ class TestNotify(unittest.TestCase):
         msg = call[0][0]
         self.assertTrue('cat1/a' in msg)
 
+    def test_notify_posts_once_for_nested_categories(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.app = create_app(self.tempdir, config=NestedConfig())
+        self.notify = yawtext.notify.YawtNotify(self.app)
+        with self.app.test_request_context():
+            changed = ChangedFiles(added=['content/cat1/sub/a.txt'])
+            self.notify.on_files_changed(changed)
+        self.assertEquals(1, yawtext.notify.post_social.call_count)
+        call = yawtext.notify.post_social.call_args_list[0]
+        self.assertEquals(['facebook', 'twitter'], call[0][1])
+
+    def test_notify_does_not_repeat_deliveries(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.app = create_app(self.tempdir, config=NestedConfig())
+        self.notify = yawtext.notify.YawtNotify(self.app)
+        with self.app.test_request_context():
+            self.notify.on_files_changed(ChangedFiles(added=['content/cat1/a.txt']))
+            self.notify.on_files_changed(ChangedFiles(added=['content/cat1/a.txt',
+                                                             'content/cat1/b.txt']))
+        args_list = yawtext.notify.post_social.call_args_list
+        self.assertEquals(2, len(args_list))
+        self.assertTrue('cat1/a' in args_list[0][0][0])
+        self.assertTrue('cat1/b' in args_list[1][0][0])
+
+    def test_failed_delivery_is_retried_next_time(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.app = create_app(self.tempdir, config=NestedConfig())
+        self.notify = yawtext.notify.YawtNotify(self.app)
+        yawtext.notify.post_social.side_effect = [None, IOError('down'), None]
+        changed = ChangedFiles(added=['content/cat1/a.txt',
+                                      'content/cat1/b.txt'])
+        with self.app.test_request_context():
+            self.assertRaises(IOError, self.notify.on_files_changed, changed)
+            self.notify.on_files_changed(changed)
+        args_list = yawtext.notify.post_social.call_args_list
+        self.assertEquals(3, len(args_list))
+        self.assertTrue('cat1/b' in args_list[2][0][0])
+
+    def test_partial_failure_only_retries_failed_networks(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.app = create_app(self.tempdir, config=NestedConfig())
+        self.notify = yawtext.notify.YawtNotify(self.app)
+        yawtext.notify.post_social.side_effect = \
+            [SocialPostError(['facebook'], {'twitter': IOError('down')}), None]
+        changed = ChangedFiles(added=['content/cat1/a.txt'])
+        with self.app.test_request_context():
+            self.assertRaises(SocialPostError,
+                              self.notify.on_files_changed, changed)
+            self.notify.on_files_changed(changed)
+        args_list = yawtext.notify.post_social.call_args_list
+        self.assertEquals(2, len(args_list))
+        self.assertEquals(['twitter'], args_list[1][0][1])
+
+    def test_notifications_queued_by_default(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.app = create_app(self.tempdir)
+        yawtext.notify.YawtNotify(self.app)
+        self.assertTrue(self.app.config['YAWT_NOTIFY_QUEUE'])
+
+    def test_concurrent_ledger_writers_keep_each_others_entries(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.app = create_app(self.tempdir, config=SyncConfig())
+        yawtext.notify.YawtNotify(self.app)
+
+        def deliver(network):
+            with self.app.test_request_context():
+                for i in range(50):
+                    yawtext.notify._add_to_ledger(
+                        [network + ':content/{0}.txt'.format(i)])
+        threads = [threading.Thread(target=deliver, args=(network,))
+                   for network in ['facebook', 'twitter']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self.app.test_request_context():
+            self.assertEquals(100, len(yawtext.notify._load_ledger()))
+
     def tearDown(self):
         yawtext.micropost.post_social = self.old_post_social
         assert self.tempdir.startswith('/tmp/')
@@ -0,0 +1,197 @@
+#pylint: skip-file
+import os
+
+import jsonpickle
+from flask_testing import TestCase
+
+from yawt import create_app
+from yawt.article import ArticleInfo
+from yawt.utils import abs_state_folder, load_file
+from yawtext.postings import PostingLists
+from yawtext.test import TestCaseWithWalker
+
+
+class TestYawtPostingsInitialize(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.postings.YawtPostings']
+
+    def create_app(self):
+        return create_app('/tmp/blah', config=self)
+
+    def test_postings_has_default_config(self):
+        self.assertEqual([''], self.app.config['YAWT_POSTINGS_BASE'])
+        self.assertEqual('postings', self.app.config['YAWT_POSTINGS_FILE'])
+
+
+def _info(fullname, tags=None):
+    info = ArticleInfo(fullname=fullname,
+                       category=os.path.dirname(fullname),
+                       slug=os.path.basename(fullname))
+    if tags:
+        info.tags = tags
+    return info
+
+
+class TestPostingLists(TestCase):
+    def create_app(self):
+        return create_app('/tmp/blah')
+
+    def setUp(self):
+        self.postings = PostingLists()
+        self.postings.add(_info('cooking/indian/madras', ['curry']), 3)
+        self.postings.add(_info('cooking/soup', ['curry', 'liquid']), 1)
+        self.postings.add(_info('reading/hamlet'), 2)
+
+    def _names(self, infos):
+        return [info.fullname for info in infos]
+
+    def test_category_lists_include_subcategories(self):
+        infos, total = self.postings.page('cooking', None, 1, 10)
+        self.assertEqual(2, total)
+        self.assertEqual(['cooking/soup', 'cooking/indian/madras'],
+                         self._names(infos))
+
+    def test_root_list_includes_everything(self):
+        infos, total = self.postings.page('', None, 1, 10, reverse=True)
+        self.assertEqual(3, total)
+        self.assertEqual(['cooking/indian/madras', 'reading/hamlet',
+                          'cooking/soup'], self._names(infos))
+
+    def test_pages_are_sliced(self):
+        infos, total = self.postings.page('', None, 2, 2, reverse=True)
+        self.assertEqual(3, total)
+        self.assertEqual(['cooking/soup'], self._names(infos))
+
+        infos, total = self.postings.page('', None, 3, 2, reverse=True)
+        self.assertEqual(3, total)
+        self.assertEqual([], infos)
+
+    def test_tag_lists_are_kept_per_category(self):
+        infos, total = self.postings.page('', 'curry', 1, 10, reverse=True)
+        self.assertEqual(['cooking/indian/madras', 'cooking/soup'],
+                         self._names(infos))
+        infos, total = self.postings.page('cooking/indian', 'curry', 1, 10)
+        self.assertEqual(['cooking/indian/madras'], self._names(infos))
+        infos, total = self.postings.page('reading', 'curry', 1, 10)
+        self.assertEqual(0, total)
+
+    def test_remove_drops_article_from_all_lists(self):
+        self.postings.remove('cooking/soup')
+        self.assertEqual(1, self.postings.page('cooking', None, 1, 10)[1])
+        self.assertEqual(1, self.postings.page('', 'curry', 1, 10)[1])
+        self.assertFalse('liquid' in self.postings.tags)
+
+    def test_add_replaces_existing_entry(self):
+        self.postings.add(_info('cooking/soup', ['liquid']), 5)
+        infos, total = self.postings.page('', None, 1, 10, reverse=True)
+        self.assertEqual(3, total)
+        self.assertEqual('cooking/soup', infos[0].fullname)
+        self.assertEqual(1, self.postings.page('', 'curry', 1, 10)[1])
+
+
+MADRAS = """---
+create_time: 2015-03-01T00:00:00
+tags: curry
+---
+
+spicy
+"""
+
+SOUP = """---
+create_time: 2015-01-01T00:00:00
+tags: curry,liquid
+---
+
+yummy
+"""
+
+UNDATED = """---
+tags: curry
+---
+
+no idea when
+"""
+
+HAMLET = """---
+create_time: 2015-02-01T00:00:00
+---
+
+to be or not to be
+"""
+
+DAL = """---
+create_time: 2015-04-01T00:00:00
+tags: curry
+---
+
+lentils
+"""
+
+
+class TestPostingsOnSite(TestCaseWithWalker):
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.collections.YawtCollections',
+                       'yawtext.tagging.YawtTagging',
+                       'yawtext.postings.YawtPostings']
+    YAWT_META_TYPES = {'tags': 'list',
+                       'create_time': 'iso8601'}
+    YAWT_COLLECTIONS_SORT_FIELD = 'create_time'
+    files = {
+        'templates/article_list.html': 'does not matter',
+        'templates/article.html': 'does not matter',
+        'content/cooking/indian/madras.txt': MADRAS,
+        'content/cooking/soup.txt': SOUP,
+        'content/reading/hamlet.txt': HAMLET,
+    }
+
+    def _fullnames(self):
+        return [a.info.fullname for a in self.get_context_variable('articles')]
+
+    def test_walk_saves_postings(self):
+        path = os.path.join(abs_state_folder(), 'postings')
+        postings = jsonpickle.decode(load_file(path))
+        self.assertEqual(3, postings.page('', None, 1, 10)[1])
+
+    def test_category_page_served_from_postings(self):
+        self.client.get('/cooking/')
+        self.assertEqual(['cooking/indian/madras', 'cooking/soup'],
+                         self._fullnames())
+
+    def test_category_page_is_paginated(self):
+        self.client.get('/index?page=2&pagelen=2')
+        self.assertEqual(['cooking/soup'], self._fullnames())
+
+    def test_tag_page_served_from_postings(self):
+        self.client.get('/tags/curry/')
+        self.assertEqual(['cooking/indian/madras', 'cooking/soup'],
+                         self._fullnames())
+
+    def test_postings_adjusted_on_update(self):
+        self.site.change(added={'content/cooking/indian/dal.txt': DAL},
+                         deleted=['content/cooking/soup.txt'])
+        self.client.get('/tags/curry/')
+        self.assertEqual(['cooking/indian/dal', 'cooking/indian/madras'],
+                         self._fullnames())
+
+
+class TestPostingsUntypedTimes(TestCaseWithWalker):
+    # without a meta type, front matter times are datetimes, while times
+    # taken from the file are epoch seconds
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.collections.YawtCollections',
+                       'yawtext.postings.YawtPostings']
+    YAWT_META_TYPES = {'tags': 'list'}
+    YAWT_COLLECTIONS_SORT_FIELD = 'create_time'
+    files = {
+        'templates/article_list.html': 'does not matter',
+        'templates/article.html': 'does not matter',
+        'content/cooking/indian/madras.txt': MADRAS,
+        'content/cooking/soup.txt': SOUP,
+        'content/cooking/undated.txt': UNDATED,
+    }
+
+    def test_datetimes_and_epoch_times_sort_together(self):
+        self.client.get('/cooking/')
+        self.assertEqual(['cooking/undated', 'cooking/indian/madras',
+                          'cooking/soup'],
+                         [a.info.fullname
+                          for a in self.get_context_variable('articles')])
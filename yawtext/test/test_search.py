@@ -2,8 +2,14 @@
 from __future__ import absolute_import
 
 from flask_testing import TestCase
+from mock import patch
+
 from yawt import create_app
-from yawtext.test import TestCaseWithIndex
+from yawt.article import ArticleInfo
+from yawt.utils import ChangedFiles, call_plugins
+from yawtext.search import SearchCache, SearchLimiter, Suggestions
+from yawtext.test import TestCaseWithIndex, TestCaseWithSite, \
+    TestCaseWithWalker
 
 
 class TestYawtSearchInitialize(TestCase):
@@ -15,6 +21,106 @@ class TestYawtSearchInitialize(TestCase):
     def test_search_has_default_config(self):
         self.assertEqual('article_list',
                          self.app.config['YAWT_SEARCH_TEMPLATE'])
+        self.assertEqual(256, self.app.config['YAWT_SEARCH_CACHE_SIZE'])
+        self.assertEqual(None, self.app.config['YAWT_SEARCH_CLIENT_LIMIT'])
+        self.assertEqual(None, self.app.config['YAWT_SEARCH_LIMIT'])
+
+
+class TestSearchCache(TestCase):
+    def create_app(self):
+        return create_app('/tmp/blah', config=self)
+
+    def test_cache_returns_results_for_same_generation(self):
+        cache = SearchCache(10)
+        cache.put(1, 'key', 'result')
+        self.assertEqual('result', cache.get(1, 'key'))
+        self.assertEqual(None, cache.get(2, 'key'))
+
+    def test_cache_cleared_by_new_generation(self):
+        cache = SearchCache(10)
+        cache.put(1, 'key1', 'result1')
+        cache.put(2, 'key2', 'result2')
+        self.assertEqual(['key2'], list(cache.results))
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = SearchCache(2)
+        cache.put(1, 'key1', 'result1')
+        cache.put(1, 'key2', 'result2')
+        cache.get(1, 'key1')
+        cache.put(1, 'key3', 'result3')
+        self.assertEqual(['key1', 'key3'], list(cache.results))
+
+    def test_limiter_limits_clients_and_total(self):
+        limiter = SearchLimiter()
+        self.assertTrue(limiter.acquire('a', 1, 2))
+        self.assertFalse(limiter.acquire('a', 1, 2))
+        self.assertTrue(limiter.acquire('b', 1, 2))
+        self.assertFalse(limiter.acquire('c', 1, 2))
+        limiter.release('a')
+        self.assertTrue(limiter.acquire('c', 1, 2))
+        self.assertEqual({'b': 1, 'c': 1}, limiter.clients)
+
+
+class TestSearchView(TestCaseWithSite):
+    YAWT_EXTENSIONS = ['yawtext.indexer.YawtIndexer',
+                       'yawtext.collections.YawtCollections',
+                       'yawtext.search.YawtSearch']
+    YAWT_SEARCH_CLIENT_LIMIT = 1
+    files = {'templates/article_list.html': 'does not really matter'}
+
+    def setUp(self):
+        self.generation = 1
+        self.searches = []
+        patchers = [patch('yawtext.search.generation',
+                          lambda: self.generation),
+                    patch('yawtext.collections.search_page', self._search)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _search(self, query, sortedby, page, pagelen, reverse):
+        self.searches.append((query, page, pagelen))
+        return [ArticleInfo(fullname='cooking/madras')], 1
+
+    def test_repeated_search_served_from_cache(self):
+        self.client.get('/search/?searchtext=madras')
+        self.client.get('/search/?searchtext=%20madras%20')
+        self.assertEqual([('content:madras', 1, 10)], self.searches)
+        self.assertEqual(1, len(self.get_context_variable('articles')))
+
+    def test_different_page_searched_again(self):
+        self.client.get('/search/?searchtext=madras')
+        self.client.get('/search/?searchtext=madras&page=2')
+        self.client.get('/cooking/search/?searchtext=madras')
+        self.assertEqual(3, len(self.searches))
+
+    def test_commit_invalidates_cache(self):
+        self.client.get('/search/?searchtext=madras')
+        self.generation = 2
+        self.client.get('/search/?searchtext=madras')
+        self.assertEqual(2, len(self.searches))
+
+    def test_busy_client_refused(self):
+        plugin = self.app.extension_info[0]['yawtext.search.YawtSearch']
+        plugin.limiter.acquire('127.0.0.1', 1, 8)
+        response = self.client.get('/search/?searchtext=madras')
+        self.assertEqual(429, response.status_code)
+        plugin.limiter.release('127.0.0.1')
+        response = self.client.get('/search/?searchtext=madras')
+        self.assertEqual(200, response.status_code)
+
+    def test_client_key_configurable(self):
+        self.app.config['YAWT_SEARCH_CLIENT_KEY'] = \
+            lambda request: request.headers.get('X-Forwarded-For')
+        plugin = self.app.extension_info[0]['yawtext.search.YawtSearch']
+        plugin.limiter.acquire('10.0.0.1', 1, 8)
+        response = self.client.get('/search/?searchtext=madras',
+                                   headers={'X-Forwarded-For': '10.0.0.1'})
+        self.assertEqual(429, response.status_code)
+        response = self.client.get('/search/?searchtext=madras',
+                                   headers={'X-Forwarded-For': '10.0.0.2'})
+        self.assertEqual(200, response.status_code)
+        plugin.limiter.release('10.0.0.1')
 
 
 class TestSearchPages(TestCaseWithIndex):
@@ -54,3 +160,68 @@ class TestSearchPages(TestCaseWithIndex):
         response = self.client.get('/search/?searchtext=stuff')
         articles = self.get_context_variable('articles')
         self.assertEquals(0, len(articles))
+
+
+class TestSuggestions(TestCase):
+    def create_app(self):
+        return create_app('/tmp/blah', config=self)
+
+    def _suggestions(self):
+        suggestions = Suggestions()
+        suggestions.add('cooking/madras', 'Madras Curry', ['spicy', 'curry'])
+        suggestions.add('cooking/korma', 'Korma Curry', ['mild', 'curry'])
+        suggestions.add('reading/hamlet', None, ['shakespeare'])
+        suggestions.build()
+        return suggestions
+
+    def test_completes_titles_and_tags(self):
+        self.assertEqual([('curry', 'tag', None),
+                          ('Korma Curry', 'title', 'cooking/korma'),
+                          ('Madras Curry', 'title', 'cooking/madras')],
+                         self._suggestions().complete('CUR', 10))
+
+    def test_completes_later_words(self):
+        self.assertEqual([('Madras Curry', 'title', 'cooking/madras')],
+                         self._suggestions().complete('madras  c', 10))
+
+    def test_limits_completions(self):
+        self.assertEqual(1, len(self._suggestions().complete('c', 1)))
+        self.assertEqual([], self._suggestions().complete('', 10))
+
+    def test_removed_article_not_completed(self):
+        suggestions = self._suggestions()
+        suggestions.remove('reading/hamlet')
+        suggestions.build()
+        self.assertEqual([], suggestions.complete('sha', 10))
+
+
+class TestSuggestEndpoint(TestCaseWithWalker):
+    YAWT_EXTENSIONS = ['yawtext.search.YawtSearchSuggestions']
+    YAWT_META_TYPES = {'tags': 'list'}
+    files = {
+        'content/cooking/madras.txt': '---\ntitle: Madras Curry\n'
+                                      'tags: spicy,curry\n---\nhot',
+        'content/reading/hamlet.txt': '---\ntitle: Hamlet\n'
+                                      'tags: shakespeare\n---\nto be',
+    }
+
+    def _suggest(self, prefix):
+        response = self.client.get('/search/suggest?q=' + prefix)
+        return response.json['suggestions']
+
+    def test_suggest_returns_json_completions(self):
+        self.assertEqual([{'text': 'curry', 'kind': 'tag', 'fullname': None},
+                          {'text': 'Madras Curry', 'kind': 'title',
+                           'fullname': 'cooking/madras'}],
+                         self._suggest('cu'))
+
+    def test_suggestions_updated_on_files_changed(self):
+        self.site.save_file('content/reading/lear.txt',
+                            '---\ntitle: King Lear\ntags: shakespeare\n---\n')
+        self.site.delete_file('content/reading/hamlet.txt')
+        changed = ChangedFiles(added=['content/reading/lear.txt'],
+                               deleted=['content/reading/hamlet.txt'])
+        call_plugins('on_files_changed', changed)
+        self.assertEqual(['King Lear'],
+                         [s['text'] for s in self._suggest('k')])
+        self.assertEqual([], self._suggest('ham'))
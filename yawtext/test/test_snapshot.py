@@ -0,0 +1,133 @@
+#pylint: skip-file
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import jsonpickle
+
+from flask_testing import TestCase
+
+from yawt import create_app
+from yawt.utils import abs_state_folder, remove_file, load_file, \
+    save_file
+from yawtext import load_summary
+from yawtext.snapshot import load_snapshot, save_snapshot, \
+    SnapshotOrderError
+from yawtext.test import TestCaseWithWalker
+
+
+class TestYawtSnapshotInitialize(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.snapshot.YawtSnapshot']
+
+    def create_app(self):
+        return create_app('/tmp/blah', config=self)
+
+    def test_snapshot_has_default_config(self):
+        self.assertEqual('snapshot', self.app.config['YAWT_SNAPSHOT_FILE'])
+
+    def test_summary_plugins_must_come_first(self):
+        class Config(object):
+            YAWT_EXTENSIONS = ['yawtext.snapshot.YawtSnapshot',
+                               'yawtext.categories.YawtCategoryCounter']
+        self.assertRaises(SnapshotOrderError, create_app, '/tmp/blah',
+                          config=Config())
+
+
+class TestSnapshotFile(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def test_save_and_load_snapshot(self):
+        path = os.path.join(self.tempdir, '_state/snapshot')
+        save_snapshot(path, {'categorycounts': [1, 2, 3]})
+        self.assertEqual({'categorycounts': [1, 2, 3]}, load_snapshot(path))
+
+    def test_concurrent_saves_use_their_own_temp_files(self):
+        path = os.path.join(self.tempdir, '_state/snapshot')
+        errors = []
+
+        def save(value):
+            try:
+                for _ in range(20):
+                    save_snapshot(path, {'value': value})
+            except Exception as exc:
+                errors.append(exc)
+        threads = [threading.Thread(target=save, args=(value,))
+                   for value in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertTrue(load_snapshot(path)['value'] in [0, 1])
+        self.assertEqual(['snapshot'],
+                         os.listdir(os.path.join(self.tempdir, '_state')))
+
+    def test_load_missing_snapshot(self):
+        path = os.path.join(self.tempdir, '_state/nothing')
+        self.assertEqual(None, load_snapshot(path))
+
+    def tearDown(self):
+        assert self.tempdir.startswith('/tmp/')
+        shutil.rmtree(self.tempdir)
+
+
+FILES = {
+    'templates/article_list.html': 'does not matter',
+    'templates/article.html': 'does not matter',
+
+    'content/reading/hamlet.txt': 'to be or not to be',
+    'content/cooking/indian/madras.txt': 'spicy',
+    'content/cooking/soup.txt': 'yummy',
+}
+
+
+class TestSnapshot(TestCaseWithWalker):
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.categories.YawtCategoryCounter',
+                       'yawtext.collections.YawtCollections',
+                       'yawtext.postings.YawtPostings',
+                       'yawtext.snapshot.YawtSnapshot']
+    files = FILES
+
+    def _snapshot(self):
+        return load_snapshot(os.path.join(abs_state_folder(), 'snapshot'))
+
+    def test_walk_writes_snapshot(self):
+        summaries = self._snapshot()
+        self.assertEqual(['categorycounts', 'postings'], sorted(summaries))
+        self.assertEqual(3, summaries['categorycounts'].count)
+
+    def test_summaries_served_from_snapshot(self):
+        remove_file(os.path.join(abs_state_folder(), 'categorycounts'))
+        remove_file(os.path.join(abs_state_folder(), 'postings'))
+
+        self.client.get('/cooking/')
+        self.assertEqual(3, self.get_context_variable('categorycounts').count)
+        self.assertEqual(2, len(self.get_context_variable('articles')))
+
+    def test_newer_summary_file_wins_over_snapshot(self):
+        plugin = self.app.extension_info[0]['yawtext.snapshot.YawtSnapshot']
+        plugin.snapshot.refresh()
+        path = os.path.join(abs_state_folder(), 'categorycounts')
+        self.assertIs(plugin.get('categorycounts'),
+                      load_summary('categorycounts'))
+
+        counts = jsonpickle.decode(load_file(path))
+        counts.count = 7
+        save_file(path, jsonpickle.encode(counts))
+        later = plugin.snapshot.mtime + 10
+        os.utime(path, (later, later))
+        self.assertEqual(7, load_summary('categorycounts').count)
+
+    def test_snapshot_updated_on_files_changed(self):
+        self.site.change(added={'content/reading/emma.txt': 'pretty funny'},
+                         deleted=['content/cooking/soup.txt'])
+        summaries = self._snapshot()
+        self.assertEqual(3, summaries['categorycounts'].count)
+        self.assertEqual(1, summaries['categorycounts'].child('cooking').count)
+
+        self.client.get('/reading/')
+        self.assertEqual(2, len(self.get_context_variable('articles')))
@@ -0,0 +1,182 @@
+#pylint: skip-file
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask_testing import TestCase
+
+from yawt import create_app
+from yawt.cli import create_manager
+from yawt.test import TestCaseWithSite
+from yawt.utils import ChangedFiles, call_plugins
+from yawtext.socialqueue import enqueue, drain_queue, load_queue
+from yawtext.notify import _load_ledger as _ledger
+
+
+def _load_ledger():
+    return sorted(_ledger())
+
+
+class FakeGraphHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        with server.lock:
+            server.requests += 1
+            fail = server.failures > 0
+            if fail:
+                server.failures -= 1
+        time.sleep(server.delay)
+        if fail:
+            self._reply(500, {'error': {'message': 'down', 'code': 2}})
+        else:
+            self._reply(200, {'id': '123_456'})
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeGraph(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super(FakeGraph, self).__init__(('127.0.0.1', 0), FakeGraphHandler)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.delay = 0
+
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self.server_address[1])
+
+
+class TestSocialQueueInitialization(TestCase):
+    YAWT_EXTENSIONS = ['yawtext.socialqueue.YawtSocialQueue']
+
+    def create_app(self):
+        return create_app('/tmp/blah', config=self)
+
+    def test_socialqueue_has_default_config(self):
+        self.assertEqual(5, self.app.config['YAWT_SOCIAL_QUEUE_RETRIES'])
+        self.assertEqual(True, self.app.config['YAWT_SOCIAL_QUEUE_AUTODRAIN'])
+
+    def test_drain_social_is_added_to_commands(self):
+        self.app.preprocess_request()
+        manager = create_manager(self.app)
+        self.assertTrue('drain-social' in manager._commands)
+
+
+class TestSocialQueue(TestCaseWithSite):
+    YAWT_EXTENSIONS = ['yawtext.micropost.YawtMicropost',
+                       'yawtext.socialqueue.YawtSocialQueue',
+                       'yawtext.notify.YawtNotify']
+    YAWT_SOCIAL_QUEUE_AUTODRAIN = False
+    YAWT_SOCIAL_QUEUE_BACKOFF = 0
+    YAWT_NOTIFY_QUEUE = True
+    YAWT_NOTIFY_BASE_URL = 'http://www.example.com'
+    YAWT_NOTIFY_NETWORKS = ['facebook']
+    folders = ['content']
+
+    def setUp(self):
+        self.graph = FakeGraph()
+        self.thread = threading.Thread(target=self.graph.serve_forever)
+        self.thread.start()
+        self.site.save_file('fbtoken', 'token')
+        self.app.config['YAWT_MICROPOST_FB_ACCESS_TOKEN_FILE'] = \
+            os.path.join(self.site.site_root, 'fbtoken')
+        self.app.config['YAWT_MICROPOST_FB_GRAPH_URL'] = self.graph.url()
+
+    def test_enqueue_returns_without_posting(self):
+        enqueue('hello', ['facebook'])
+        self.assertEqual(0, self.graph.requests)
+        self.assertEqual(1, len(load_queue()['jobs']))
+
+    def test_notify_enqueues_new_files(self):
+        changed = ChangedFiles(added=['content/a.txt', 'content/b.txt'])
+        call_plugins('on_files_changed', changed)
+        self.assertEqual(0, self.graph.requests)
+        posts = [job['post'] for job in load_queue()['jobs']]
+        self.assertEqual(['http://www.example.com/a',
+                          'http://www.example.com/b'], posts)
+
+    def test_notify_ledger_written_on_delivery(self):
+        changed = ChangedFiles(added=['content/a.txt'])
+        call_plugins('on_files_changed', changed)
+        # still queued, so not queued again
+        call_plugins('on_files_changed', changed)
+        self.assertEqual(1, len(load_queue()['jobs']))
+        self.assertEqual([], _load_ledger())
+        self.assertEqual(1, drain_queue())
+        self.assertEqual(['facebook:content/a.txt'], _load_ledger())
+        call_plugins('on_files_changed', changed)
+        self.assertEqual([], load_queue()['jobs'])
+
+    def test_notify_failed_jobs_are_queued_again(self):
+        self.app.config['YAWT_SOCIAL_QUEUE_RETRIES'] = 1
+        self.graph.failures = 1
+        changed = ChangedFiles(added=['content/a.txt'])
+        call_plugins('on_files_changed', changed)
+        self.assertEqual(0, drain_queue())
+        self.assertEqual(1, len(load_queue()['failed']))
+        self.assertEqual([], _load_ledger())
+        call_plugins('on_files_changed', changed)
+        self.assertEqual(1, drain_queue())
+        self.assertEqual(['facebook:content/a.txt'], _load_ledger())
+
+    def test_drain_posts_concurrently(self):
+        self.graph.delay = 0.5
+        for i in range(5):
+            enqueue('post {0}'.format(i), ['facebook'])
+        start = time.time()
+        self.assertEqual(5, drain_queue())
+        self.assertTrue(time.time() - start < 1.5)
+        self.assertEqual(5, self.graph.requests)
+        self.assertEqual([], load_queue()['jobs'])
+
+    def test_drain_retries_failures(self):
+        self.graph.failures = 2
+        enqueue('hello', ['facebook'])
+        self.assertEqual(1, drain_queue())
+        self.assertEqual(3, self.graph.requests)
+        self.assertEqual({'jobs': [], 'failed': []}, load_queue())
+
+    def test_drain_backs_off_exponentially(self):
+        self.app.config['YAWT_SOCIAL_QUEUE_BACKOFF'] = 60
+        self.graph.failures = 1
+        enqueue('hello', ['facebook'])
+        start = time.time()
+        self.assertEqual(0, drain_queue())
+        job = load_queue()['jobs'][0]
+        self.assertEqual(1, job['attempts'])
+        self.assertTrue(start + 60 <= job['next_try'] < start + 70)
+
+        # not due yet
+        self.assertEqual(0, drain_queue())
+        self.assertEqual(1, self.graph.requests)
+
+    def test_drain_gives_up_after_retries(self):
+        self.app.config['YAWT_SOCIAL_QUEUE_RETRIES'] = 3
+        self.graph.failures = 10
+        enqueue('hello', ['facebook'])
+        self.assertEqual(0, drain_queue())
+        self.assertEqual(3, self.graph.requests)
+        queue = load_queue()
+        self.assertEqual([], queue['jobs'])
+        self.assertEqual(3, queue['failed'][0]['attempts'])
+
+    def tearDown(self):
+        self.graph.shutdown()
+        self.graph.server_close()
+        self.thread.join()
+        super(TestSocialQueue, self).tearDown()
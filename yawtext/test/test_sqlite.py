@@ -0,0 +1,136 @@
+#pylint: skip-file
+from __future__ import absolute_import
+
+import os
+import sqlite3
+
+from yawt.utils import ChangedFiles, abs_state_folder, call_plugins, cfg
+from yawtext.indexer import search, search_page, generation
+from yawtext.sqlite import _parse
+from yawtext.test import TestCaseWithWalker
+
+
+def _post(create_time, tags, content):
+    return ('create_time: {0}\ntags: {1}'.format(create_time, tags), content)
+
+
+def _names(infos):
+    return [info.fullname for info in infos]
+
+
+class TestSqliteIndexer(TestCaseWithWalker):
+    YAWT_META_TYPES = {'tags': 'list', 'create_time': 'iso8601'}
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.indexer.YawtIndexer']
+    YAWT_INDEXER_IFC = 'yawtext.sqlite'
+    files = {
+        'content/entry.txt':
+            _post('2007-06-01T00:00:00', 'misc', 'soup entry'),
+        'content/cooking/dal.txt':
+            _post('2007-06-02T00:00:00', 'lentils,soup', 'dal & soup'),
+        'content/cooking/indian/madras.txt':
+            _post('2007-07-03T00:00:00', 'curry', 'madras curry soup'),
+        'content/reading/hyperion.txt':
+            _post('2008-01-04T00:00:00', 'scifi', 'hyperion'),
+    }
+
+    def _index_file(self):
+        return os.path.join(abs_state_folder(),
+                            cfg('YAWT_INDEXER_SQLITE_FILE'))
+
+    def test_index_is_one_file_in_wal_mode(self):
+        conn = sqlite3.connect(self._index_file())
+        self.assertEqual('wal',
+                         conn.execute('PRAGMA journal_mode').fetchone()[0])
+        self.assertEqual(4, conn.execute('SELECT count(*) FROM articles')
+                         .fetchone()[0])
+        conn.close()
+
+    def test_parse_gathers_content_words(self):
+        self.assertEqual(([('categories', 'cooking')], ['madras', 'curry']),
+                         _parse('content:madras curry AND cooking'))
+        self.assertEqual(([], []), _parse(''))
+
+    def test_search_everything(self):
+        self.assertEqual(['cooking/dal', 'cooking/indian/madras', 'entry',
+                          'reading/hyperion'], _names(search('')))
+
+    def test_search_category_includes_subcategories(self):
+        self.assertEqual(['cooking/indian/madras', 'cooking/dal'],
+                         _names(search('cooking', 'create_time', True)))
+
+    def test_search_tags_and_fullname(self):
+        self.assertEqual(['cooking/dal'],
+                         _names(search('tags:soup AND cooking')))
+        self.assertEqual(['entry'], _names(search('fullname:entry')))
+
+    def test_search_dates(self):
+        self.assertEqual(['cooking/dal', 'cooking/indian/madras', 'entry'],
+                         _names(search('create_time:2007')))
+        self.assertEqual(['cooking/dal', 'entry'],
+                         _names(search('create_time:200706')))
+        self.assertEqual(['cooking/dal'],
+                         _names(search('create_time:20070602 AND cooking')))
+
+    def test_search_content(self):
+        self.assertEqual(['cooking/indian/madras'],
+                         _names(search('content:curry soup')))
+        self.assertEqual(['cooking/indian/madras'],
+                         _names(search('content:soup AND cooking/indian')))
+
+    def test_unknown_fields_are_content(self):
+        self.assertEqual(([], ['soup', 'note:madras']),
+                         _parse('content:soup note:madras'))
+        self.assertEqual(([], ['create_time:soon']),
+                         _parse('create_time:soon'))
+        self.assertEqual(['cooking/indian/madras'],
+                         _names(search('content:soup madras:curry')))
+        self.assertEqual([], _names(search('title:soup')))
+
+    def test_search_page(self):
+        pages = [search_page('', 'create_time', page, 3, True)
+                 for page in [1, 2, 3]]
+        self.assertEqual([4, 4, 4], [total for _, total in pages])
+        self.assertEqual([['reading/hyperion', 'cooking/indian/madras',
+                           'cooking/dal'],
+                          ['entry'], ['entry']],
+                         [_names(infos) for infos, _ in pages])
+
+    def test_search_page_highlights_content(self):
+        infos, total = search_page('content:soup', 'create_time', 1, 10, True)
+        self.assertEqual(3, total)
+        self.assertEqual('dal &amp; <mark>soup</mark>', infos[1].snippet)
+
+    def test_files_changed_updates_index(self):
+        gen = generation()
+        self.site.save_file('content/reading/ilium.txt',
+                            'create_time: 2008-02-01T00:00:00\n\nilium soup')
+        self.site.delete_file('content/cooking/dal.txt')
+        call_plugins('on_files_changed',
+                     ChangedFiles(added=['content/reading/ilium.txt'],
+                                  deleted=['content/cooking/dal.txt']))
+        self.assertNotEqual(gen, generation())
+        self.assertEqual(['cooking/indian/madras', 'entry', 'reading/ilium'],
+                         sorted(_names(search('content:soup'))))
+        self.assertEqual([], _names(search('tags:lentils')))
+
+    def test_walk_twice_reindexes(self):
+        self._walk()
+        self.assertEqual(4, len(search('')))
+
+
+class TestSqliteIndexerUntypedMeta(TestCaseWithWalker):
+    YAWT_EXTENSIONS = ['yawtext.indexer.YawtIndexer']
+    YAWT_INDEXER_IFC = 'yawtext.sqlite'
+    files = {
+        'content/cooking/dal.txt':
+            _post('2007-06-02 00:00:00', 'lentils,soup', 'dal'),
+        'content/cooking/madras.txt':
+            _post('2007-07-03 00:00:00', 'curry', 'madras curry'),
+    }
+
+    def test_datetime_and_string_meta_are_indexed(self):
+        self.assertEqual(['cooking/madras', 'cooking/dal'],
+                         _names(search('cooking', 'create_time', True)))
+        self.assertEqual(['cooking/dal'], _names(search('create_time:200706')))
+        self.assertEqual(['cooking/dal'], _names(search('tags:soup')))
@@ -1,10 +1,13 @@
 #pylint: skip-file
+import os
+
+from mock import patch
+
 from yawtext.test import fake_tweepy
 from yawtext.twitter import post_twitter
 from flask_testing import TestCase
 from yawt.utils import save_file, remove_file
 from yawt import create_app
-import yawtext
 
 twittercred = """
 consumer_key: "CONSUMER_KEY"
@@ -21,8 +24,9 @@ class TestTwitter(TestCase):
         return create_app('/tmp/blah', config=self)
 
     def setUp(self):
-        self.old_tweepy = yawtext.twitter.tweepy
-        yawtext.twitter.tweepy = fake_tweepy
+        patcher = patch('yawtext.twitter.tweepy', fake_tweepy)
+        patcher.start()
+        self.addCleanup(patcher.stop)
         fake_tweepy.clear()
         save_file('/tmp/twittercred.yml', twittercred)
 
@@ -39,6 +43,17 @@ class TestTwitter(TestCase):
         self.assertEquals('http://www.twitter.com/desmondrivet/status/12345',
                           metadata['twitterpost'])
 
+    def test_api_reused_until_credentials_change(self):
+        post_twitter('first message')
+        post_twitter('second message')
+        self.assertEquals(1, len(fake_tweepy.oauths))
+
+        save_file('/tmp/twittercred.yml',
+                  twittercred.replace('ACCESS_TOKEN', 'NEW_TOKEN'))
+        os.utime('/tmp/twittercred.yml', (1, 1))
+        post_twitter('third message')
+        self.assertEquals(2, len(fake_tweepy.oauths))
+        self.assertEquals('NEW_TOKEN', fake_tweepy.oauths[1].access_token)
+
     def tearDown(self):
         remove_file('/tmp/twittercred.yml')
-        yawtext.twitter.tweepy = self.old_tweepy
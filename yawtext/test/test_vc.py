@@ -1,7 +1,11 @@
 #pylint: skip-file
 import unittest
+
+from mock import Mock
+
+import yawt.utils
 import yawtext
-from yawt.utils import ChangedFiles
+from yawt.utils import ChangedFiles, ChangeQueue, merge_changes
 
 
 class TestChangedFiles(unittest.TestCase):
@@ -45,3 +49,59 @@ class TestChangedFiles(unittest.TestCase):
         self.assertEquals(contents.deleted, [])
         self.assertEquals(contents.renamed, {'the_content/file3': 'the_content/file4'})
 
+
+class TestMergeChanges(unittest.TestCase):
+    def test_single_change_passed_through(self):
+        changed = ChangedFiles(added=['file1'], renamed={'file2': 'file3'})
+        self.assertTrue(merge_changes([changed]) is changed)
+
+    def test_add_then_modify_is_add(self):
+        merged = merge_changes([ChangedFiles(added=['file1']),
+                                ChangedFiles(modified=['file1'])])
+        self.assertEqual(ChangedFiles(added=['file1']), merged)
+
+    def test_add_then_delete_cancels_out(self):
+        merged = merge_changes([ChangedFiles(added=['file1', 'file2']),
+                                ChangedFiles(modified=['file1']),
+                                ChangedFiles(deleted=['file1'])])
+        self.assertEqual(ChangedFiles(added=['file2']), merged)
+
+    def test_modify_then_delete_is_delete(self):
+        merged = merge_changes([ChangedFiles(modified=['file1']),
+                                ChangedFiles(deleted=['file1'])])
+        self.assertEqual(ChangedFiles(deleted=['file1']), merged)
+
+    def test_delete_then_add_is_modify(self):
+        merged = merge_changes([ChangedFiles(deleted=['file1']),
+                                ChangedFiles(added=['file1'])])
+        self.assertEqual(ChangedFiles(modified=['file1']), merged)
+
+    def test_renames_are_normalized(self):
+        merged = merge_changes([ChangedFiles(added=['file1']),
+                                ChangedFiles(renamed={'file1': 'file2',
+                                                      'file3': 'file4'})])
+        self.assertEqual(ChangedFiles(added=['file2', 'file4'],
+                                      deleted=['file3']), merged)
+
+
+class TestChangeQueue(unittest.TestCase):
+    def setUp(self):
+        self.old_call_plugins = yawt.utils.call_plugins
+        yawt.utils.call_plugins = Mock()
+
+    def test_flush_dispatches_net_change_once(self):
+        queue = ChangeQueue()
+        queue.push(ChangedFiles(added=['file1']))
+        queue.push(ChangedFiles(added=['file2']))
+        queue.push(ChangedFiles(deleted=['file1']))
+        queue.flush()
+        yawt.utils.call_plugins.assert_called_once_with(
+            'on_files_changed', ChangedFiles(added=['file2']))
+
+    def test_flush_does_nothing_when_empty(self):
+        queue = ChangeQueue()
+        queue.flush()
+        self.assertFalse(yawt.utils.call_plugins.called)
+
+    def tearDown(self):
+        yawt.utils.call_plugins = self.old_call_plugins
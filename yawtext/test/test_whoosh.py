@@ -12,7 +12,7 @@ from whoosh.query.qcore import Every
 from yawt.article import Article, ArticleInfo
 from yawt.utils import cfg
 from yawtext.indexer import init_index, add_article, commit,\
-    remove_article, search, search_page
+    remove_article, search, search_page, generation
 from yawtext.test import TestCaseWithIndex
 from yawtext.whoosh import _schema, _field_values, BadFieldType
 
@@ -95,6 +95,16 @@ class TestWhooshIndexing(TestCaseWithIndex):
             self.assertEquals(1, len(results))
             self.assertIn('cooking/indian/madras', results[0]['article_info_json'])
 
+    def test_commit_bumps_generation(self):
+        _create_index()
+        before = generation()
+        add_article(_article('cooking/indian/madras',
+                             [u'spicy', u'curry'],
+                             'this is an awesome article'))
+        self.assertEquals(before, generation())
+        commit()
+        self.assertTrue(generation() > before)
+
     def test_add_article_indexes_article_info(self):
         _create_index()
 
@@ -176,6 +186,52 @@ class TestWhooshIndexing(TestCaseWithIndex):
         self.assertEquals(1, len(articles))
         self.assertEquals(2, total)
 
+    def test_search_page_has_no_snippets_unless_content_stored(self):
+        _create_index()
+        add_article(_article('cooking/indian/madras',
+                             [u'spicy', u'curry'],
+                             'this is an awesome article'))
+        commit()
+
+        articles, total = search_page('content:awesome', None,
+                                      page=1, pagelen=10)
+        self.assertEquals(1, total)
+        self.assertFalse(hasattr(articles[0], 'snippet'))
+
+
+class TestWhooshSnippets(TestCaseWithIndex):
+    walkOnSetup = False
+    files = FILES
+    YAWT_INDEXER_WHOOSH_FIELDS = {'content': TEXT(stored=True, chars=True)}
+
+    def test_search_page_highlights_content_snippets(self):
+        _create_index()
+        add_article(_article('cooking/indian/madras',
+                             [u'spicy', u'curry'],
+                             'this is an awesome <b>curry</b> article'))
+        add_article(_article('reading/scifi/clarke',
+                             [u'monolith', u'alien'],
+                             'this is a crappy article'))
+        commit()
+
+        articles, total = search_page('content:awesome', None,
+                                      page=1, pagelen=10)
+        self.assertEquals(1, total)
+        self.assertIn('<mark class="match term0">awesome</mark>',
+                      articles[0].snippet)
+        self.assertIn('&lt;b&gt;curry', articles[0].snippet)
+
+    def test_search_page_without_content_terms_has_no_snippets(self):
+        _create_index()
+        add_article(_article('cooking/indian/madras',
+                             [u'spicy', u'curry'],
+                             'this is an awesome article'))
+        commit()
+
+        articles, total = search_page('tags:spicy', None, page=1, pagelen=10)
+        self.assertEquals(1, total)
+        self.assertFalse(hasattr(articles[0], 'snippet'))
+
 
 class TestWhooshIndexingBadConfig(TestCaseWithIndex):
     walkOnSetup = False
@@ -0,0 +1,156 @@
+#pylint: skip-file
+from __future__ import absolute_import
+
+import os
+import shutil
+import threading
+
+import jsonpickle
+
+from flask import g
+from mock import patch
+from whoosh.fields import IDLIST, DATETIME
+from whoosh.index import open_dir
+
+from yawt.utils import ChangedFiles, call_plugins
+from yawtext.indexer import search, search_page, generation
+from yawtext.test import TestCaseWithWalker
+from yawtext import whooshshards
+from yawtext.whooshshards import _shard_dir, _shard_for, _shards_for, \
+    _query, roots
+
+
+def _post(create_time, content):
+    return ('create_time: {0}'.format(create_time), content)
+
+
+class TestWhooshShards(TestCaseWithWalker):
+    YAWT_META_TYPES = {'create_time': 'iso8601'}
+    YAWT_EXTENSIONS = ['yawtext.categories.YawtCategories',
+                       'yawtext.indexer.YawtIndexer']
+    YAWT_INDEXER_IFC = 'yawtext.whooshshards'
+    YAWT_INDEXER_SHARDS = ['cooking', 'reading']
+    YAWT_INDEXER_WHOOSH_INFO_FIELDS = {'categories': IDLIST(),
+                                       'create_time': DATETIME(sortable=True)}
+    WHOOSH_INDEX_ROOT = '/tmp/whoosh/shards'
+    files = {
+        'content/entry.txt': _post('2007-06-01T00:00:00', 'soup entry'),
+        'content/cooking/dal.txt': _post('2007-06-02T00:00:00', 'soup'),
+        'content/cooking/indian/madras.txt':
+            _post('2007-06-03T00:00:00', 'madras soup'),
+        'content/reading/hyperion.txt':
+            _post('2007-06-04T00:00:00', 'hyperion soup'),
+        'content/reading/dune.txt': _post('2007-06-05T00:00:00', 'dune'),
+    }
+
+    def _shard_names(self, shard):
+        with open_dir(_shard_dir(shard)).searcher() as searcher:
+            return sorted(jsonpickle.decode(f['article_info_json']).fullname
+                          for f in searcher.documents())
+
+    def test_roots_default_to_plugin_bases(self):
+        self.app.config['YAWT_INDEXER_SHARDS'] = None
+        self.app.config['YAWT_CATEGORY_BASE'] = ['', 'cooking']
+        self.app.config['YAWT_ARCHIVE_BASE'] = ['reading/']
+        self.assertEqual(['cooking', 'reading'], roots())
+
+    def test_articles_go_to_the_shard_for_their_root(self):
+        self.assertEqual('cooking', _shard_for('cooking/indian/madras'))
+        self.assertEqual(None, _shard_for('entry'))
+        self.assertEqual(None, _shard_for('cookingtips'))
+
+    def test_walk_indexes_each_shard(self):
+        self.assertEqual(['cooking/dal', 'cooking/indian/madras'],
+                         self._shard_names('cooking'))
+        self.assertEqual(['reading/dune', 'reading/hyperion'],
+                         self._shard_names('reading'))
+        self.assertEqual(['entry'], self._shard_names(None))
+
+    def test_category_queries_only_search_their_shards(self):
+        self.assertEqual(['cooking'],
+                         _shards_for(_query('content:soup AND cooking/indian')))
+        self.assertEqual(['cooking', 'reading', None],
+                         _shards_for(_query('content:soup')))
+        with patch.object(whooshshards, '_searcher',
+                          wraps=whooshshards._searcher) as searcher:
+            infos = search('content:soup AND cooking', 'create_time')
+            self.assertEqual([_shard_dir('cooking')],
+                             [c[0][0] for c in searcher.call_args_list])
+        self.assertEqual(['cooking/dal', 'cooking/indian/madras'],
+                         [info.fullname for info in infos])
+
+    def test_search_merges_shards_in_sort_order(self):
+        infos = search('content:soup', 'create_time', reverse=True)
+        self.assertEqual(['reading/hyperion', 'cooking/indian/madras',
+                          'cooking/dal', 'entry'],
+                         [info.fullname for info in infos])
+
+    def test_search_page_pages_across_shards(self):
+        pages = [search_page('', 'create_time', page, 2, reverse=True)
+                 for page in [1, 2, 3, 4]]
+        self.assertEqual([5, 5, 5, 5], [total for _, total in pages])
+        self.assertEqual([['reading/dune', 'reading/hyperion'],
+                          ['cooking/indian/madras', 'cooking/dal'],
+                          ['entry'],
+                          ['entry']],
+                         [[info.fullname for info in infos]
+                          for infos, _ in pages])
+
+    def test_files_changed_updates_shards(self):
+        gen = generation()
+        self.site.save_file('content/reading/ilium.txt',
+                            'create_time: 2007-06-06T00:00:00\n\nilium soup')
+        self.site.delete_file('content/cooking/dal.txt')
+        call_plugins('on_files_changed',
+                     ChangedFiles(added=['content/reading/ilium.txt'],
+                                  deleted=['content/cooking/dal.txt']))
+        self.assertNotEqual(gen, generation())
+        self.assertEqual(['cooking/indian/madras'],
+                         self._shard_names('cooking'))
+        self.assertEqual(['reading/dune', 'reading/hyperion',
+                          'reading/ilium'],
+                         self._shard_names('reading'))
+
+    def test_generation_only_opens_shards_which_changed(self):
+        generation()
+        with patch('yawtext.whoosh.open_dir', wraps=open_dir) as opened:
+            gen = generation()
+            self.assertEqual(0, opened.call_count)
+            call_plugins('on_files_changed',
+                         ChangedFiles(deleted=['content/cooking/dal.txt']))
+            self.assertNotEqual(gen, generation())
+            self.assertEqual([_shard_dir('cooking')],
+                             [c[0][0] for c in opened.call_args_list])
+
+    def test_commit_writes_shards_in_worker_processes(self):
+        self.app.config['YAWT_INDEXER_SHARD_WORKERS'] = 2
+        self._walk()
+        self.assertEqual(['cooking/dal', 'cooking/indian/madras'],
+                         self._shard_names('cooking'))
+        self.assertEqual(5, len(search('')))
+
+    def test_full_batch_written_before_commit(self):
+        self.app.config['YAWT_INDEXER_SHARD_BATCH'] = 2
+        whooshshards.remove_article('reading/dune')
+        self.assertEqual(['reading/dune', 'reading/hyperion'],
+                         self._shard_names('reading'))
+        whooshshards.remove_article('reading/hyperion')
+        self.assertEqual([], self._shard_names('reading'))
+        self.assertEqual([], g.whoosh_shard_ops['reading'])
+
+    def test_threads_have_their_own_searchers(self):
+        path = _shard_dir('cooking')
+        searcher = whooshshards._searcher(path)
+        self.assertIs(searcher, whooshshards._searcher(path))
+        others = []
+        thread = threading.Thread(
+            target=lambda: others.append(whooshshards._searcher(path)))
+        thread.start()
+        thread.join()
+        self.assertIsNot(searcher, others[0])
+        self.assertEqual(2, searcher.doc_count())
+
+    def tearDown(self):
+        super(TestWhooshShards, self).tearDown()
+        if os.path.exists(self.app.config['WHOOSH_INDEX_ROOT']):
+            shutil.rmtree(self.app.config['WHOOSH_INDEX_ROOT'])
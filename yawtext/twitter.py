@@ -1,16 +1,23 @@
 """Module for posting to twitter"""
 import os
 
-import tweepy
 import yaml
 
-from yawt.utils import cfg, load_file
+from yawt.utils import cfg, load_file, lazy_import, cached_for_file
+
+tweepy = lazy_import('tweepy')
 
 
 def _get_twitter_api():
+    """Return the API client for our credentials, which is reused (along with
+    its connections) until the credentials file changes"""
     credfile = cfg('YAWT_MICROPOST_TWITTER_CREDENTIALS_FILE')
     cfgfile = os.path.expanduser(credfile)
-    cfgobj = yaml.load(load_file(cfgfile))
+    return cached_for_file(cfgfile, _build_twitter_api)
+
+
+def _build_twitter_api(cfgfile):
+    cfgobj = yaml.safe_load(load_file(cfgfile))
     consumer_key = cfgobj['consumer_key']
     consumer_secret = cfgobj['consumer_secret']
     access_token = cfgobj['access_token']
@@ -3,10 +3,11 @@ modified_time and author information
 """
 import os
 
+import jsonpickle
 from flask import current_app
 
-from yawt.utils import save_file, cfg
-from yawtext import Plugin
+from yawt.utils import save_file, cfg, abs_state_folder, call_plugins
+from yawtext import Plugin, load_summary
 
 
 class YawtVersionControl(Plugin):
@@ -19,6 +20,67 @@ class YawtVersionControl(Plugin):
     def init_app(self, app):
         app.config.setdefault('YAWT_VERSION_CONTROL_IFC', 'yawtext.git')
         app.config.setdefault('YAWT_VERSION_CONTROL_GIT_EXE', '/usr/bin/git')
+        app.config.setdefault('YAWT_VERSION_CONTROL_TIMES', False)
+        app.config.setdefault('YAWT_VERSION_CONTROL_TIMES_FILE', 'vctimes')
+
+    def file_metadata(self, filename):
+        """Return the create_time, modified_time and author of filename, as
+        recorded in the repo history, or None if we don't know them (in which
+        case the times come from the file itself).  Only active when
+        YAWT_VERSION_CONTROL_TIMES is set.
+
+        The times for every file come out of a single pass over the history,
+        made by the walk and cached in the state folder, and kept up to date
+        by on_files_changed.  Fetching an article never looks at the history
+        itself, so until there has been a walk, the file times are used."""
+        if not cfg('YAWT_VERSION_CONTROL_TIMES'):
+            return None
+        times = load_summary(cfg('YAWT_VERSION_CONTROL_TIMES_FILE'))
+        if times is None:
+            return None
+        repofile = os.path.relpath(filename, current_app.yawt_root_dir)
+        entry = times['files'].get(repofile)
+        if entry is None:
+            return None
+        return {'create_time': entry[0],
+                'modified_time': entry[1],
+                'author': entry[2]}
+
+    def on_pre_walk(self):
+        """Rebuild the file times from scratch"""
+        if cfg('YAWT_VERSION_CONTROL_TIMES'):
+            self._build_times()
+
+    def on_files_changed(self, changed):
+        """Bring the file times up to date with the commits made since we last
+        looked.  List this plugin ahead of the ones which index articles, so
+        that they see the new times."""
+        if not cfg('YAWT_VERSION_CONTROL_TIMES'):
+            return
+        times = load_summary(cfg('YAWT_VERSION_CONTROL_TIMES_FILE'))
+        if times is None or not times['head']:
+            self._build_times()
+            return
+        try:
+            log = vc_log(times['head'])
+        except Exception:  # pylint: disable=broad-except
+            # e.g. the history got rewritten under us
+            self._build_times()
+            return
+        times = {'head': times['head'], 'files': dict(times['files'])}
+        _apply_log(times, log)
+        _save_times(times)
+
+    @staticmethod
+    def _build_times():
+        times = {'head': None, 'files': {}}
+        try:
+            log = vc_log()
+        except Exception:  # pylint: disable=broad-except
+            # e.g. a new site, without any commits yet
+            log = []
+        _apply_log(times, log)
+        _save_times(times)
 
     def on_new_site(self, files):
         """When a new site is created, we'll save a gitignore file so we can
@@ -28,6 +90,26 @@ class YawtVersionControl(Plugin):
         save_file(filename, '_state')
 
 
+def _apply_log(times, log):
+    files = times['files']
+    for commit, ctime, author, changes in log:
+        for status, path in changes:
+            if status == 'D':
+                files.pop(path, None)
+            elif path in files:
+                files[path] = [files[path][0], ctime, files[path][2]]
+            else:
+                files[path] = [ctime, ctime, author]
+        times['head'] = commit
+
+
+def _save_times(times):
+    relpath = cfg('YAWT_VERSION_CONTROL_TIMES_FILE')
+    save_file(os.path.join(abs_state_folder(), relpath),
+              jsonpickle.encode(times))
+    call_plugins('on_summary_saved', relpath, times)
+
+
 # VC API STARTS HERE
 
 def post_merge(repo_path, app=None):
@@ -40,6 +122,26 @@ def post_commit(repo_path, app=None):
     return _run_vc_func('post_commit', repo_path, app)
 
 
+def post_update(repo_path, old, new, app=None):
+    """Process the changes between commit old and commit new"""
+    return _run_vc_func('post_update', repo_path, old, new, app)
+
+
+def post_receive(repo_path, old, new, app=None):
+    """Run this as your post receive vc hook, for each updated ref"""
+    return _run_vc_func('post_receive', repo_path, old, new, app)
+
+
+def vc_log(since=None):
+    """Return the history of your repo, oldest commit first"""
+    return _run_vc_func('vc_log', since)
+
+
+def vc_head():
+    """Return the id of the current commit"""
+    return _run_vc_func('vc_head')
+
+
 def vc_ignore_file():
     """Return ignore file for your vc"""
     return _run_vc_func('vc_ignore_file')
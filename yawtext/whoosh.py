@@ -1,8 +1,15 @@
+import os
+
 import jsonpickle
 from datetime import datetime
-from flask import current_app
-from whoosh.fields import STORED, KEYWORD, IDLIST, ID, DATETIME
+from flask import current_app, g, Markup
+from whoosh.fields import STORED, KEYWORD, IDLIST, ID, DATETIME, TEXT
+from whoosh.analysis import Token
+from whoosh.highlight import BasicFragmentScorer, HtmlFormatter, \
+    PinpointFragmenter, SCORE, top_fragments
+from whoosh.index import open_dir, exists_in
 from whoosh.qparser import QueryParser
+from whoosh.reading import TermNotFound
 from whoosh.query.qcore import Every
 
 from yawt.utils import cfg, ReprMixin
@@ -18,7 +25,7 @@ def init_index(clear=False):
 def add_article(article):
     """Add article to whoosh index"""
     doc = _field_values(article)
-    _whoosh().writer.add_document(**doc)
+    _writer().add_document(**doc)
 
 
 def search(query_str, sortedby=None, reverse=False):
@@ -33,28 +40,67 @@ def search(query_str, sortedby=None, reverse=False):
 
 def search_page(query_str, sortedby, page, pagelen, reverse=False):
     """Search the _whoosh index using the supplied query string Return a tuple
-    of article infos, and the length of the total result
+    of article infos, and the length of the total result.  Where the query
+    matched the snippet field, and that field is stored, each info carries a
+    highlighted snippet.  Content isn't stored by default; to get snippets,
+    set YAWT_INDEXER_WHOOSH_FIELDS = {'content': TEXT(stored=True, chars=True)}
+    and walk the site again to rebuild the index.
     """
     searcher = _whoosh().searcher
     results = searcher.search_page(_query(query_str),
                                    page, pagelen,
                                    sortedby=sortedby,
                                    reverse=reverse)
-    return [_decode(r) for r in results], len(results)
+    snippet = _snippet_func(results.results)
+    return [_decode(r, snippet) for r in results], len(results)
 
 
 def remove_article(fname):
     """Remove th article at fullname from whoosh index"""
-    _whoosh().writer.delete_by_term('fullname', fname)
+    _writer().delete_by_term('fullname', fname)
 
 
 def commit():
     """Commit the whoosh index changes"""
-    _whoosh().writer.commit()
+    _writer().commit()
+    g.pop('whoosh_flushed_writer', None)
+
+
+def flush():
+    """Commit the changes made so far, so that the writer can let go of what
+    it has buffered, and carry on with a fresh writer"""
+    _writer().commit()
+    g.whoosh_flushed_writer = open_dir(cfg('WHOOSH_INDEX_ROOT')).writer()
+
+
+def generation():
+    """Return the generation of the whoosh index, which goes up with each
+    commit"""
+    return _latest_generation(cfg('WHOOSH_INDEX_ROOT'))
 
 # END API
 
 
+_GENERATIONS = {}
+
+
+def _latest_generation(path):
+    """Return the generation of the index at path, or -1 if there isn't one.
+    This is asked for on every search, and opening the index to find out
+    isn't cheap, so the answer is kept until the folder changes (each commit
+    writes a new TOC file into it)."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+    cached = _GENERATIONS.get(path)
+    if cached is None or cached[0] != mtime:
+        gen = open_dir(path).latest_generation() if exists_in(path) else -1
+        cached = (mtime, gen)
+        _GENERATIONS[path] = cached
+    return cached[1]
+
+
 def _query(query_str):
     if query_str:
         qparser = QueryParser('categories', schema=_schema())
@@ -63,15 +109,74 @@ def _query(query_str):
         return Every()
 
 
-def _decode(result):
-    return jsonpickle.decode(result['article_info_json'])
+def _decode(result, snippet=None):
+    info = jsonpickle.decode(result['article_info_json'])
+    if snippet:
+        text = snippet(result)
+        if text:
+            info.snippet = Markup(text)
+    return info
+
+
+def _snippet_func(results):
+    """Return a function making a highlighted snippet from the stored
+    snippet field of a hit in results, or None if there's nothing to
+    highlight"""
+    field_name = cfg('YAWT_INDEXER_WHOOSH_SNIPPET_FIELD')
+    field = results.searcher.schema[field_name] \
+        if field_name in results.searcher.schema else None
+    if field is None or not field.stored:
+        return None
+    words = set(field.from_bytes(term[1]) for term in
+                results.query_terms(expand=True, fieldname=field_name))
+    if not words:
+        return None
+    top = cfg('YAWT_INDEXER_WHOOSH_SNIPPET_FRAGMENTS')
+    if not field.supports('characters'):
+        return lambda hit: hit.highlights(field_name, top=top)
+    return lambda hit: _pinpoint_snippet(hit, field_name, words, top)
+
+
+def _pinpoint_snippet(hit, field_name, words, top):
+    """Highlight the words in the stored field of hit, going by the character
+    offsets stored in the index rather than analyzing the text again"""
+    searcher = hit.searcher
+    to_bytes = searcher.schema[field_name].to_bytes
+    tokens = []
+    for word in words:
+        try:
+            postings = searcher.postings(field_name, to_bytes(word))
+        except TermNotFound:
+            continue
+        postings.skip_to(hit.docnum)
+        if postings.is_active() and postings.id() == hit.docnum:
+            for pos, startchar, endchar in postings.value_as('characters'):
+                tokens.append(Token(text=word, pos=pos, startchar=startchar,
+                                    endchar=endchar, matched=True))
+    if not tokens:
+        return ''
+    tokens.sort(key=lambda t: t.startchar)
+    fragmenter = PinpointFragmenter(autotrim=True)
+    fragments = top_fragments(fragmenter.fragment_matches(hit[field_name],
+                                                          tokens),
+                              top, BasicFragmentScorer(), SCORE)
+    return HtmlFormatter(tagname='mark').format(fragments)
+
+
+def _content_fields():
+    """The YAWT_INDEXER_WHOOSH_FIELDS, by default just the (unstored)
+    content"""
+    fields = cfg('YAWT_INDEXER_WHOOSH_FIELDS')
+    if fields is None:
+        return {'content': TEXT()}
+    return fields
 
 
 def _schema():
     """returns whoosh schema for yawt articles"""
     fields = {}
     fields.update(cfg('YAWT_INDEXER_WHOOSH_INFO_FIELDS'))
-    fields.update(cfg('YAWT_INDEXER_WHOOSH_FIELDS'))
+    fields.update(_content_fields())
     fields['article_info_json'] = STORED()
     fields['fullname'] = ID()  # add (or override) whatever is in config
     return fields
@@ -79,7 +184,7 @@ def _schema():
 
 def _field_values(article):
     values = {}
-    _set_values(article, cfg('YAWT_INDEXER_WHOOSH_FIELDS'), values)
+    _set_values(article, _content_fields(), values)
     _set_values(article.info, cfg('YAWT_INDEXER_WHOOSH_INFO_FIELDS'), values)
     article.info.indexed = True
     values['fullname'] = article.info.fullname
@@ -98,7 +203,7 @@ def _set_values(obj, fields, values):
 def _value(field_value, field_type):
     fvt = type(field_value)
     ftt = type(field_type)
-    if fvt is list:
+    if fvt in (list, tuple):
         if field_type in [KEYWORD, IDLIST] or \
            ftt in [KEYWORD, IDLIST]:
             return ' '.join(field_value)
@@ -112,6 +217,10 @@ def _value(field_value, field_type):
         return field_value
 
 
+def _writer():
+    return g.get('whoosh_flushed_writer') or _whoosh().writer
+
+
 def _whoosh():
     return current_app.extension_info[0]['flask_whoosh.Whoosh']
 
@@ -0,0 +1,257 @@
+"""A YAWT indexer backend keeping one whoosh index per root
+
+The plain yawtext.whoosh backend keeps the whole site in one index.  This
+backend splits it into shards, one per root folder, plus a default shard for
+articles which aren't under any of the roots.  Select it with::
+
+    YAWT_INDEXER_IFC = 'yawtext.whooshshards'
+
+The roots are YAWT_INDEXER_SHARDS, or if that isn't set, all the roots in
+YAWT_CATEGORY_BASE, YAWT_TAGGING_BASE and YAWT_ARCHIVE_BASE.  The shards
+live in folders under WHOOSH_INDEX_ROOT.
+
+Index changes are queued up per shard, and on commit (or flush) the shards
+are written in parallel, by up to YAWT_INDEXER_SHARD_WORKERS processes.  A
+shard with YAWT_INDEXER_SHARD_BATCH changes queued up is written straight
+away, so that a big walk doesn't hold the whole site in memory.
+
+Queries restricted to a category (e.g. 'content:curry AND cooking') are only
+run against the shards which can hold articles in that category.  Others
+are run against every shard, and the results merged, by the sort field if
+there is one, otherwise by score.  Scores are worked out per shard, so
+merging by score is only approximate.  Each thread keeps its own searchers,
+refreshing them when the shards change.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app, g
+from whoosh.fields import Schema
+from whoosh.index import create_in, exists_in, open_dir
+from whoosh.query import And, Term
+
+from yawt.utils import cfg
+# pylint: disable=unused-import
+from yawtext.whoosh import _decode, _field_values, _latest_generation, \
+    _query, _schema, _snippet_func, BadFieldType
+
+
+_SEARCHERS = threading.local()
+
+
+# API IMPLEMENTATION
+
+def init_index(clear=False):
+    """Create the shard indexes, optionally clearing them"""
+    schema = Schema(**_schema())
+    for shard in _shards():
+        path = _shard_dir(shard)
+        if clear or not exists_in(path):
+            if not os.path.exists(path):
+                os.makedirs(path)
+            _close_searcher(path)
+            create_in(path, schema)
+    g.pop('whoosh_shard_ops', None)
+
+
+def add_article(article):
+    """Queue article up to be added to its shard"""
+    doc = _field_values(article)
+    _queue(_shard_for(article.info.fullname), ('add', doc))
+
+
+def remove_article(fname):
+    """Queue the article at fullname up to be removed from its shard"""
+    _queue(_shard_for(fname), ('remove', fname))
+
+
+def commit():
+    """Write the queued changes to the shards"""
+    ops = g.pop('whoosh_shard_ops', {})
+    work = [(_shard_dir(shard), shard_ops)
+            for shard, shard_ops in ops.items() if shard_ops]
+    workers = min(cfg('YAWT_INDEXER_SHARD_WORKERS') or os.cpu_count() or 1,
+                  len(work))
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            list(executor.map(_apply_ops, *zip(*work)))
+    else:
+        for path, shard_ops in work:
+            _apply_ops(path, shard_ops)
+
+
+def flush():
+    """Write what's been queued up so far, to free up memory"""
+    commit()
+
+
+def search(query_str, sortedby=None, reverse=False):
+    """Search the shards, returning all results"""
+    infos, _ = _search(query_str, sortedby, reverse, None, None)
+    return infos
+
+
+def search_page(query_str, sortedby, page, pagelen, reverse=False):
+    """Search the shards, returning a page of article infos along with the
+    total number of results"""
+    return _search(query_str, sortedby, reverse, page, pagelen)
+
+
+def generation():
+    """Return the generations of the shards, which go up with each
+    commit"""
+    return tuple(_latest_generation(_shard_dir(shard)) for shard in _shards())
+
+# END API
+
+
+def roots():
+    """Return the roots the site is sharded by"""
+    shard_roots = cfg('YAWT_INDEXER_SHARDS')
+    if shard_roots is None:
+        shard_roots = set()
+        for key in ['YAWT_CATEGORY_BASE', 'YAWT_TAGGING_BASE',
+                    'YAWT_ARCHIVE_BASE']:
+            shard_roots.update(current_app.config.get(key) or [])
+    return sorted(root.strip('/') for root in shard_roots if root.strip('/'))
+
+
+def _shards():
+    # None is the default shard
+    return roots() + [None]
+
+
+def _shard_for(fullname):
+    """Return the root of the shard which holds fullname (None for the
+    default shard)"""
+    best = None
+    for root in roots():
+        if fullname.startswith(root + '/') and \
+           (best is None or len(root) > len(best)):
+            best = root
+    return best
+
+
+def _shard_dir(shard):
+    name = 'default' if shard is None else 'shard-' + shard.replace('/', '+')
+    return os.path.join(cfg('WHOOSH_INDEX_ROOT'), name)
+
+
+def _queue(shard, operation):
+    """Queue operation up for shard, writing the shard if enough have
+    been queued up"""
+    if 'whoosh_shard_ops' not in g:
+        g.whoosh_shard_ops = {}
+    ops = g.whoosh_shard_ops.setdefault(shard, [])
+    ops.append(operation)
+    batch = cfg('YAWT_INDEXER_SHARD_BATCH')
+    if batch and len(ops) >= batch:
+        _apply_ops(_shard_dir(shard), ops)
+        del ops[:]
+
+
+def _apply_ops(path, ops):
+    """Apply the add and remove operations to the index at path.  Runs in a
+    worker process, so it mustn't need the app."""
+    writer = open_dir(path).writer()
+    for operation, arg in ops:
+        if operation == 'add':
+            writer.add_document(**arg)
+        else:
+            writer.delete_by_term('fullname', arg)
+    writer.commit()
+
+
+def _thread_searchers():
+    searchers = getattr(_SEARCHERS, 'searchers', None)
+    if searchers is None:
+        searchers = _SEARCHERS.searchers = {}
+    return searchers
+
+
+def _searcher(path):
+    """Return this thread's searcher for the index at path, brought up to
+    date"""
+    searchers = _thread_searchers()
+    old = searchers.get(path)
+    if old is None:
+        searcher = open_dir(path).searcher()
+    else:
+        searcher = old.refresh()
+        if searcher is not old:
+            old.close()
+    searchers[path] = searcher
+    return searcher
+
+
+def _close_searcher(path):
+    searcher = _thread_searchers().pop(path, None)
+    if searcher is not None:
+        searcher.close()
+
+
+def _query_category(query):
+    """Return the category query is restricted to, or None"""
+    subqueries = query.subqueries if isinstance(query, And) else [query]
+    for subquery in subqueries:
+        if isinstance(subquery, Term) and subquery.fieldname == 'categories':
+            return subquery.text
+    return None
+
+
+def _under(category, root):
+    return category == root or category.startswith(root + '/')
+
+
+def _shards_for(query):
+    """Return the shards which can hold results for query"""
+    category = _query_category(query)
+    if not category:
+        return _shards()
+    shard_roots = roots()
+    shards = [root for root in shard_roots
+              if _under(category, root) or _under(root, category)]
+    if not any(_under(category, root) for root in shard_roots):
+        # some of the category's articles are in the default shard
+        shards.append(None)
+    return shards
+
+
+def _sort_keys(searcher, results, sortedby):
+    """Return the keys to merge the results by, and whether the best results
+    have the highest keys"""
+    reader = searcher.reader()
+    if sortedby and reader.has_column(sortedby):
+        column = reader.column_reader(sortedby)
+        return [column[hit.docnum] for hit in results], False
+    return [hit.score for hit in results], True
+
+
+def _search(query_str, sortedby, reverse, page, pagelen):
+    query = _query(query_str)
+    limit = page * pagelen if page else None
+    hits = []
+    total = 0
+    highest_first = False
+    for shard_index, shard in enumerate(_shards_for(query)):
+        path = _shard_dir(shard)
+        if not exists_in(path):
+            continue
+        searcher = _searcher(path)
+        results = searcher.search(query, limit=limit, sortedby=sortedby,
+                                  reverse=reverse)
+        total += len(results)
+        keys, highest_first = _sort_keys(searcher, results, sortedby)
+        snippet = _snippet_func(results)
+        for rank, (hit, key) in enumerate(zip(results, keys)):
+            hits.append((key, shard_index, rank, hit, snippet))
+
+    # ties are left in shard, then rank, order
+    hits.sort(key=lambda h: (h[1], h[2]))
+    hits.sort(key=lambda h: h[0], reverse=reverse != highest_first)
+    if page:
+        pagecount = max(1, (total + pagelen - 1) // pagelen)
+        start = (min(page, pagecount) - 1) * pagelen
+        hits = hits[start:start + pagelen]
+    return [_decode(hit, snippet) for _, _, _, hit, snippet in hits], total